@@ -0,0 +1,325 @@
+"""
+Benchmark de ponta a ponta do pipeline, sem rede e só com CPU.
+
+Gera datasets sintéticos (pastas de detecção YOLO, pastas de classificação
+de imagens e CSVs largos), registra cada um com o register_dataset.py e
+treina com o train.py duas vezes (cache de datasets frio e quente), usando
+um servidor MLflow local: store SQLite e artefatos em disco, num diretório
+de trabalho descartável. Os modelos são mínimos (YOLO 'n' criado do zero a
+partir do .yaml, Random Forest com poucas árvores).
+
+A vazão de cada etapa sai do timeline.json das runs e pode ser comparada
+com uma linha de base salva antes (ex: na máquina de CI):
+
+    python benchmarks/pipeline_benchmark.py --save-baseline benchmarks/pipeline_baseline.json
+    python benchmarks/pipeline_benchmark.py --baseline benchmarks/pipeline_baseline.json --fail-on-regression
+
+Os cenários de imagens precisam do ultralytics (e do torch) instalados;
+sem eles, são pulados.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+SCENARIOS = ('tabular', 'detection', 'classification')
+DATASET_EXPERIMENT = "Benchmark_Datasets"
+TRAIN_EXPERIMENT = "Benchmark_Pipeline"
+# Etapas cuja vazão é medida em MB/s do dataset registrado
+BYTES_STAGES = ('pack', 'upload', 'dataset_download', 'dataset_unzip')
+# Etapas mais curtas que isto variam demais entre execuções para medir vazão ou comparar
+MIN_SECONDS = 0.1
+
+
+def benchmark_env(work_dir):
+    """Variáveis que apontam o tracking, os artefatos e os caches para o diretório de trabalho."""
+    env = dict(os.environ)
+    env.pop("MLFLOW_SERVER_URI", None)
+    env.update({
+        "MLFLOW_TRACKING_URI": f"sqlite:///{os.path.join(work_dir, 'mlflow.db')}",
+        "MLFLOW_ARTIFACT_ROOT": f"file://{os.path.join(work_dir, 'artifacts')}",
+        "MLFLOW_OFFLINE_DIR": os.path.join(work_dir, "offline"),
+        "MLFLOW_DATASET_CACHE_DIR": os.path.join(work_dir, "dataset_cache"),
+        "MLFLOW_TRACKING_MODE": "online",
+        "YOLO_OFFLINE": "true",
+    })
+    return env
+
+
+def _random_image(rng, size, boxes=()):
+    from PIL import Image, ImageDraw
+
+    image = Image.fromarray(rng.integers(0, 255, (size, size, 3), dtype=np.uint8))
+    draw = ImageDraw.Draw(image)
+    for x0, y0, x1, y1, color in boxes:
+        draw.rectangle([x0 * size, y0 * size, x1 * size, y1 * size], fill=color)
+    return image
+
+
+def generate_detection(root, num_images, image_size, num_classes, seed=0):
+    """Pasta no formato YOLO (train/val/test com images/ e labels/) e data.yaml."""
+    rng = np.random.default_rng(seed)
+    splits = {'train': num_images, 'val': max(num_images // 4, 1), 'test': max(num_images // 4, 1)}
+    for split, count in splits.items():
+        os.makedirs(os.path.join(root, split, "images"), exist_ok=True)
+        os.makedirs(os.path.join(root, split, "labels"), exist_ok=True)
+        for i in range(count):
+            boxes, lines = [], []
+            for _ in range(rng.integers(1, 4)):
+                cls = int(rng.integers(num_classes))
+                w, h = rng.uniform(0.1, 0.4, 2)
+                cx, cy = rng.uniform(w / 2, 1 - w / 2), rng.uniform(h / 2, 1 - h / 2)
+                boxes.append((cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2, (60 * cls % 255, 120, 200)))
+                lines.append(f"{cls} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}")
+            _random_image(rng, image_size, boxes).save(os.path.join(root, split, "images", f"{i:06d}.jpg"), quality=90)
+            with open(os.path.join(root, split, "labels", f"{i:06d}.txt"), "w") as f:
+                f.write("\n".join(lines) + "\n")
+    with open(os.path.join(root, "data.yaml"), "w") as f:
+        yaml.safe_dump({
+            'train': 'train/images', 'val': 'val/images', 'test': 'test/images',
+            'nc': num_classes, 'names': [f"classe_{c}" for c in range(num_classes)],
+        }, f)
+
+
+def generate_classification(root, num_images, image_size, num_classes, seed=0):
+    """Pasta de classificação (<split>/<classe>/*.jpg)."""
+    rng = np.random.default_rng(seed)
+    for split, count in {'train': num_images, 'val': max(num_images // 4, num_classes)}.items():
+        for c in range(num_classes):
+            class_dir = os.path.join(root, split, f"classe_{c}")
+            os.makedirs(class_dir, exist_ok=True)
+            for i in range(max(count // num_classes, 1)):
+                box = [(0.2, 0.2, 0.8, 0.8, (80 * c % 255, 40 * c % 255, 160))]
+                _random_image(rng, image_size, box).save(os.path.join(class_dir, f"{i:06d}.jpg"), quality=90)
+
+
+def generate_tabular(root, num_rows, num_columns, num_classes, seed=0, chunk_rows=50000):
+    """CSV largo: colunas numéricas, uma categórica e o alvo (dependente das primeiras colunas)."""
+    os.makedirs(root, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    path = os.path.join(root, "dados.csv")
+    header = [f"f{j}" for j in range(num_columns)] + ["categoria", "alvo"]
+    with open(path, "w") as f:
+        f.write(",".join(header) + "\n")
+        for start in range(0, num_rows, chunk_rows):
+            n = min(chunk_rows, num_rows - start)
+            X = rng.normal(size=(n, num_columns)).astype(np.float32)
+            category = rng.choice(["a", "b", "c", "d"], n)
+            y = (np.digitize(X[:, 0] + 0.5 * X[:, 1], np.linspace(-1, 1, num_classes - 1))).astype(int)
+            rows = np.column_stack([np.char.mod("%.5f", X), category, y.astype(str)])
+            f.write("\n".join(",".join(row) for row in rows) + "\n")
+
+
+def _model_yaml(work_dir, name):
+    """Copia o .yaml de arquitetura do ultralytics (modelo do zero, sem baixar pesos)."""
+    import ultralytics
+
+    source = os.path.join(os.path.dirname(ultralytics.__file__), "cfg", "models", "v8", name.replace("v8n", "v8"))
+    target = os.path.join(work_dir, name)
+    shutil.copy(source, target)
+    return target
+
+
+def prepare_scenario(scenario, work_dir, args):
+    """Gera o dataset e retorna (pasta, trainer_type, data_config sem o run_id, params)."""
+    name = f"bench_{scenario}"
+    root = os.path.join(work_dir, "datasets", name)
+    if scenario == 'tabular':
+        generate_tabular(root, args.rows, args.columns, args.classes)
+        return root, 'generic_classification', {
+            'data_file_relative_path': f"{name}/dados.csv", 'target_column': 'alvo',
+        }, {'model_name': 'rf', 'seed': 0, 'n_estimators': args.trees, 'max_depth': 8}
+
+    params = {'image_size': args.train_image_size, 'epochs': 1, 'batch_size': args.batch_size, 'seed': 0}
+    if scenario == 'detection':
+        generate_detection(root, args.images, args.image_size, args.classes)
+        params['model_name'] = _model_yaml(work_dir, "yolov8n.yaml")
+        return root, 'detection', {'data_yaml_relative_path': f"{name}/data.yaml"}, params
+
+    generate_classification(root, args.images, args.image_size, args.classes)
+    params['model_name'] = _model_yaml(work_dir, "yolov8n-cls.yaml")
+    return root, 'image_classification', {'data_root_relative_path': name}, params
+
+
+def run_script(arguments, env, log_path):
+    """Roda um script do projeto num processo novo. Retorna o tempo total (s)."""
+    start = time.perf_counter()
+    with open(log_path, "a") as log_file:
+        proc = subprocess.run([sys.executable, *arguments], cwd=REPO_ROOT, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    if proc.returncode != 0:
+        raise RuntimeError(f"'{' '.join(arguments)}' falhou (código {proc.returncode}); veja {log_path}")
+    return time.perf_counter() - start
+
+
+def latest_run(client, experiment_name, run_name):
+    experiment = client.get_experiment_by_name(experiment_name)
+    runs = client.search_runs(
+        [experiment.experiment_id], filter_string=f"attributes.run_name = '{run_name}'",
+        order_by=["attributes.start_time DESC"], max_results=1
+    )
+    return runs[0]
+
+
+def stage_results(client, run, dataset_mb, rows=None):
+    """Segundos de cada etapa do timeline.json e a vazão (MB/s ou linhas/s) das etapas de dados."""
+    timeline_path = client.download_artifacts(run.info.run_id, "timeline.json", tempfile.mkdtemp(prefix="bench_"))
+    with open(timeline_path, "r") as f:
+        stages = json.load(f)["stages"]
+    results = {}
+    for record in stages:
+        key = f"{record['stage']}_seconds"
+        results[key] = results.get(key, 0) + record["wall_seconds"]
+    for stage in BYTES_STAGES:
+        if results.get(f"{stage}_seconds", 0) >= MIN_SECONDS:
+            results[f"{stage}_mb_per_s"] = dataset_mb / results[f"{stage}_seconds"]
+    if rows and results.get("data_read_seconds", 0) >= MIN_SECONDS:
+        results["data_read_rows_per_s"] = rows / results["data_read_seconds"]
+    return results
+
+
+def run_scenario(scenario, work_dir, env, args, client):
+    log_path = os.path.join(work_dir, f"{scenario}.log")
+    start = time.perf_counter()
+    root, trainer_type, data_config, params = prepare_scenario(scenario, work_dir, args)
+    results = {"generate_seconds": time.perf_counter() - start}
+    dataset_mb = sum(os.path.getsize(os.path.join(r, n)) for r, _, files in os.walk(root) for n in files) / (1024 ** 2)
+    results["dataset_mb"] = dataset_mb
+
+    # 1. Registro do dataset (compactado num .zip e enviado ao store de artefatos)
+    run_name = f"bench_{scenario}"
+    results["register_total_seconds"] = run_script([
+        "register_dataset.py", "--local_path", root, "--run_name", run_name, "--artifact_path", "dataset",
+        "--upload_mode", "pack", "--experiment_name", DATASET_EXPERIMENT,
+    ], env, log_path)
+    dataset_run = latest_run(client, DATASET_EXPERIMENT, run_name)
+    results.update({f"register_{k}": v for k, v in stage_results(client, dataset_run, dataset_mb).items()})
+
+    # 2. Treino com o cache de datasets frio e depois quente
+    config = {
+        'experiment_name': TRAIN_EXPERIMENT,
+        'run_name': f"bench_{scenario}_train",
+        'trainer_type': trainer_type,
+        'data': dict(data_config, dataset_run_id=dataset_run.info.run_id,
+                     dataset_artifact_path=f"dataset/{os.path.basename(root)}.zip"),
+        'params': params,
+        'upload_workers': 4,
+    }
+    config_path = os.path.join(work_dir, f"{scenario}.yaml")
+    with open(config_path, "w") as f:
+        yaml.safe_dump(config, f)
+    rows = args.rows if scenario == 'tabular' else None
+    for phase in ("cold", "warm"):
+        results[f"train_{phase}_total_seconds"] = run_script(["train.py", "--config", config_path, "--force"], env, log_path)
+        train_run = latest_run(client, TRAIN_EXPERIMENT, config['run_name'])
+        results.update({f"train_{phase}_{k}": v for k, v in stage_results(client, train_run, dataset_mb, rows).items()})
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compara cada medida com a linha de base. Tempos (`_seconds`) pioram se
+    subirem mais que `tolerance`; vazões (`_per_s`) se caírem na mesma proporção.
+    Tempos abaixo de MIN_SECONDS nas duas execuções e a geração dos dados
+    sintéticos (não é parte do pipeline) são ignorados.
+    Retorna a lista de regressões.
+    """
+    regressions = []
+    print(f"\nComparação com a linha de base (tolerância de {tolerance:.0%}):")
+    for scenario, metrics in results.items():
+        for key, value in sorted(metrics.items()):
+            base = (baseline.get(scenario) or {}).get(key)
+            if not base or key.startswith("generate") or not (key.endswith("_seconds") or key.endswith("_per_s")):
+                continue
+            if key.endswith("_seconds") and max(base, value) < MIN_SECONDS:
+                continue
+            change = value / base - 1
+            lower_is_better = key.endswith("_seconds")
+            worse = change > tolerance if lower_is_better else change < -tolerance / (1 + tolerance)
+            marker = "  <- REGRESSÃO" if worse else ""
+            print(f"  {scenario:<15} {key:<45} {base:>10.3f} -> {value:>10.3f} ({change:+.0%}){marker}")
+            if worse:
+                regressions.append((scenario, key, base, value))
+    return regressions
+
+
+def print_results(results):
+    for scenario, metrics in results.items():
+        print(f"\n{scenario}:")
+        for key, value in sorted(metrics.items()):
+            print(f"  {key:<45} {value:>10.3f}")
+
+
+def main(args):
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pipeline_benchmark_")
+    os.makedirs(work_dir, exist_ok=True)
+    env = benchmark_env(work_dir)
+    print(f"Diretório de trabalho: {work_dir}")
+
+    from mlflow.tracking import MlflowClient
+    client = MlflowClient(env["MLFLOW_TRACKING_URI"])
+
+    results = {}
+    for scenario in args.scenarios:
+        if scenario != 'tabular':
+            try:
+                import ultralytics  # noqa: F401
+            except ImportError:
+                print(f"Cenário '{scenario}' pulado: ultralytics não está instalado.")
+                continue
+        print(f"Cenário '{scenario}'...")
+        # Se falhar, o diretório (com os logs) fica para investigação.
+        results[scenario] = run_scenario(scenario, work_dir, env, args, client)
+    if not args.keep and not args.work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results(results)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResultados salvos em {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Linha de base salva em {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} medidas pioraram além da tolerância.")
+            if args.fail_on_regression:
+                sys.exit(1)
+        else:
+            print("\nNenhuma regressão.")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline (registro, download, extração, leitura, treino e logging).")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--images", type=int, default=200, help="Imagens de treino dos cenários de imagens.")
+    parser.add_argument("--image-size", type=int, default=320, help="Lado das imagens geradas (px).")
+    parser.add_argument("--train-image-size", type=int, default=64, help="image_size usado no treino.")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=200000, help="Linhas do CSV.")
+    parser.add_argument("--columns", type=int, default=100, help="Colunas numéricas do CSV.")
+    parser.add_argument("--classes", type=int, default=3)
+    parser.add_argument("--trees", type=int, default=10, help="Árvores do Random Forest.")
+    parser.add_argument("--work-dir", help="Diretório de trabalho (mantido). Padrão: temporário, apagado no fim.")
+    parser.add_argument("--keep", action="store_true", help="Mantém o diretório temporário (logs, store e artefatos).")
+    parser.add_argument("--output", default="pipeline_benchmark.json", help="Arquivo JSON com os resultados.")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar.")
+    parser.add_argument("--save-baseline", help="Salva os resultados como nova linha de base.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Piora relativa aceita antes de acusar regressão.")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Sai com código 1 se houver regressão.")
+    args = parser.parse_args()
+
+    main(args)
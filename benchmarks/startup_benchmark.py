@@ -0,0 +1,126 @@
+"""
+Mede o custo de inicialização do train.py.
+
+Modo import (padrão): em interpretadores novos, mede o tempo de `import train`
++ carregar cada trainer registrado, comparando com o import antigo de todos
+os trainers de uma vez.
+
+Modo config (--config): roda a config num processo novo e mede o tempo desde
+o início do processo até o começo da primeira época (trainers com callbacks)
+ou até o fim da run (demais trainers).
+
+Exemplos:
+    python benchmarks/startup_benchmark.py --repeats 5
+    python benchmarks/startup_benchmark.py --config configs/config_deteccao_servidor.yaml
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+IMPORT_SNIPPET = """
+import time, sys
+start = time.perf_counter()
+import train
+from trainers import registry
+for trainer_type in sys.argv[1:]:
+    registry.load_trainer(trainer_type)
+print(time.perf_counter() - start)
+"""
+
+
+def time_import(trainer_types, repeats):
+    """Mediana (s) do import em `repeats` interpretadores novos; None se falhar."""
+    samples = []
+    for _ in range(repeats):
+        proc = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET, *trainer_types],
+            cwd=REPO_ROOT, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            error = (proc.stderr.strip().splitlines() or ["erro desconhecido"])[-1]
+            print(f"  {'+'.join(trainer_types)}: indisponível ({error})")
+            return None
+        samples.append(float(proc.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def run_import_benchmark(repeats):
+    from trainers import registry
+
+    results = {}
+    for trainer_type in registry.TRAINERS:
+        results[trainer_type] = time_import([trainer_type], repeats)
+    results["todos (import antigo)"] = time_import(list(registry.TRAINERS), repeats)
+
+    print(f"\nTempo de import (mediana de {repeats} processos):")
+    for name, seconds in results.items():
+        value = f"{seconds:.2f}s" if seconds is not None else "-"
+        print(f"  {name:<28} {value}")
+    return results
+
+
+def child_main(config_path, output_path, process_start):
+    """Executado no processo filho: roda a config e grava os tempos medidos."""
+    import yaml
+    import train
+
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+
+    timings = {"import_seconds": time.time() - process_start, "first_epoch_seconds": None}
+
+    def on_train_epoch_start(trainer):
+        if timings["first_epoch_seconds"] is None:
+            timings["first_epoch_seconds"] = time.time() - process_start
+
+    train.run_experiment(config, extra_callbacks={"on_train_epoch_start": [on_train_epoch_start]})
+    timings["total_seconds"] = time.time() - process_start
+
+    with open(output_path, "w") as f:
+        json.dump(timings, f)
+
+
+def run_config_benchmark(config_path, output_path):
+    process_start = time.time()
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", config_path, output_path, str(process_start)],
+        cwd=REPO_ROOT
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"A run de benchmark falhou (código {proc.returncode}).")
+    with open(output_path, "r") as f:
+        timings = json.load(f)
+
+    print(f"\nInicialização de '{config_path}':")
+    print(f"  imports:                {timings['import_seconds']:.2f}s")
+    if timings["first_epoch_seconds"] is not None:
+        print(f"  até a primeira época:   {timings['first_epoch_seconds']:.2f}s")
+    print(f"  run completa:           {timings['total_seconds']:.2f}s")
+    return timings
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child_main(sys.argv[2], sys.argv[3], float(sys.argv[4]))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Mede o tempo de inicialização do train.py.")
+    parser.add_argument("--config", help="Config a executar para medir o tempo até a primeira época.")
+    parser.add_argument("--repeats", type=int, default=3, help="Processos por medição no modo import.")
+    parser.add_argument("--output", default="startup_benchmark.json", help="Arquivo JSON com os resultados.")
+    args = parser.parse_args()
+
+    if args.config:
+        results = run_config_benchmark(args.config, os.path.abspath(args.output))
+    else:
+        results = run_import_benchmark(args.repeats)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    print(f"\nResultados salvos em {args.output}")
@@ -0,0 +1,253 @@
+import mlflow
+import yaml
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from mlflow.tracking import MlflowClient
+from trainers import registry
+from utils import evaluation, fingerprint, offline_sync, tabular, tracking
+
+# Valores padrão da seção `evaluation` (a linha de comando tem prioridade).
+EVALUATION_DEFAULTS = {
+    'batch_size': None,        # padrão: 32 imagens ou 4096 linhas
+    'workers': 4,              # threads de decodificação das imagens
+    'prefetch_batches': 2,     # lotes decodificados à frente da inferência
+    'device': 'cpu',
+    'split': None,             # padrão: 'test' ou, se não houver, 'val'
+    'conf': 0.001,             # confiança mínima das caixas (para o mAP)
+    'iou': 0.7,                # NMS
+    'conf_threshold': 0.25,    # confiança das caixas contadas em Precision/Recall
+    'weights_artifact': None,  # padrão: o best.pt de "Resultados do Treino"
+}
+WEIGHTS_ARTIFACT_DIR = "Resultados do Treino"
+
+
+def find_artifact(client, run_id, file_name, path=None):
+    """Caminho do primeiro artefato chamado `file_name` dentro de `path` (recursivo), ou None."""
+    for info in client.list_artifacts(run_id, path):
+        if info.is_dir:
+            found = find_artifact(client, run_id, file_name, info.path)
+            if found:
+                return found
+        elif os.path.basename(info.path) == file_name:
+            return info.path
+    return None
+
+
+def load_training_run(client, run_id, temp_dir):
+    """
+    A run de treino e a sua config. Runs criadas com `reuse: link` apontam
+    para a run que de fato treinou o modelo.
+    """
+    run = client.get_run(run_id)
+    reused_from = run.data.tags.get(fingerprint.REUSED_RUN_TAG)
+    if reused_from:
+        print(f"A run {run_id} reaproveitou a run {reused_from}; avaliando o modelo dela.")
+        run = client.get_run(reused_from)
+    config_path = client.download_artifacts(run.info.run_id, "config.yaml", temp_dir)
+    with open(config_path, "r") as f:
+        return run, yaml.safe_load(f)
+
+
+def run_inference(samples, load_fn, infer_fn, options):
+    """
+    Inferência em lotes com a decodificação/pré-processamento num pool de
+    threads, alguns lotes à frente: a CPU decodifica o próximo lote enquanto
+    o modelo processa o atual. `infer_fn(entradas)` retorna uma saída por entrada.
+    Retorna ([(amostra, saída)], métricas de vazão e latência).
+    """
+    outputs, batch_seconds, batch_sizes, decode_wait = [], [], [], 0.0
+    start = time.perf_counter()
+    for batch, waited in evaluation.prefetch_batches(
+        samples, load_fn, options['batch_size'], options['workers'], options['prefetch_batches']
+    ):
+        decode_wait += waited
+        batch_start = time.perf_counter()
+        predictions = infer_fn([decoded for _, decoded in batch])
+        batch_seconds.append(time.perf_counter() - batch_start)
+        batch_sizes.append(len(batch))
+        outputs.extend(zip([sample for sample, _ in batch], predictions))
+    metrics = evaluation.latency_metrics(batch_seconds, batch_sizes, time.perf_counter() - start)
+    metrics["eval_decode_wait_seconds"] = decode_wait
+    return outputs, metrics
+
+
+def load_yolo_model(client, run_id, options, temp_dir):
+    from ultralytics import YOLO
+    from ultralytics.utils import SETTINGS
+
+    weights_artifact = options['weights_artifact'] or find_artifact(client, run_id, "best.pt", WEIGHTS_ARTIFACT_DIR)
+    if not weights_artifact:
+        raise FileNotFoundError(
+            f"A run {run_id} não tem um best.pt em '{WEIGHTS_ARTIFACT_DIR}'. Indique o artefato em 'evaluation.weights_artifact'."
+        )
+    print(f"Baixando os pesos '{weights_artifact}'...")
+    weights_path = client.download_artifacts(run_id, weights_artifact, temp_dir)
+    SETTINGS.update({'mlflow': False})
+    return YOLO(weights_path)
+
+
+def evaluate_image_classification(trainer, client, run, train_config, data_config, options, temp_dir):
+    data_root = trainer.get_data_path(data_config, temp_dir)
+    samples = evaluation.classification_samples(data_root, options['split'])
+    model = load_yolo_model(client, run.info.run_id, options, temp_dir)
+    image_size = train_config['params'].get('image_size', 224)
+    print(f"Avaliando {len(samples)} imagens (lotes de {options['batch_size']}, {options['workers']} threads de decodificação)...")
+
+    def infer(images):
+        results = model.predict(images, imgsz=image_size, batch=len(images), device=options['device'], verbose=False)
+        return [(r.probs.top1, list(r.probs.top5)) for r in results]
+
+    outputs, metrics = run_inference(
+        samples, lambda sample: evaluation.decode_image(sample[0], image_size), infer, options
+    )
+    names = model.names
+    metrics["top1_accuracy"] = float(np.mean([names[top1] == label for (_, label), (top1, _) in outputs]))
+    metrics["top5_accuracy"] = float(np.mean([label in [names[i] for i in top5] for (_, label), (_, top5) in outputs]))
+    return metrics
+
+
+def evaluate_detection(trainer, client, run, train_config, data_config, options, temp_dir):
+    data_yaml_path = trainer.get_data_yaml_path(data_config, temp_dir)
+    samples = evaluation.detection_samples(data_yaml_path, options['split'])
+    model = load_yolo_model(client, run.info.run_id, options, temp_dir)
+    image_size = train_config['params'].get('image_size') or 640
+    print(f"Avaliando {len(samples)} imagens (lotes de {options['batch_size']}, {options['workers']} threads de decodificação)...")
+
+    def infer(images):
+        results = model.predict(
+            images, imgsz=image_size, batch=len(images), device=options['device'],
+            conf=options['conf'], iou=options['iou'], verbose=False
+        )
+        return [(r.boxes.xyxyn.cpu().numpy(), r.boxes.cls.cpu().numpy().astype(int), r.boxes.conf.cpu().numpy()) for r in results]
+
+    outputs, metrics = run_inference(
+        samples, lambda sample: evaluation.decode_image(sample[0], image_size, fit=True), infer, options
+    )
+    all_hits, all_conf, all_cls, all_gt = [], [], [], []
+    for (_, label_path), (boxes, classes, conf) in outputs:
+        gt_cls, gt_boxes = evaluation.read_yolo_labels(label_path)
+        all_hits.append(evaluation.match_detections(boxes, classes, conf, gt_boxes, gt_cls))
+        all_conf.append(conf)
+        all_cls.append(classes)
+        all_gt.append(gt_cls)
+    metrics.update(evaluation.detection_metrics(
+        np.concatenate(all_hits), np.concatenate(all_conf), np.concatenate(all_cls), np.concatenate(all_gt),
+        conf_threshold=options['conf_threshold']
+    ))
+    return metrics
+
+
+def load_sklearn_model(client, run):
+    """O estimador registrado pela run (flavor sklearn ou pyfunc com o arquivo joblib)."""
+    models = client.search_logged_models(
+        [run.info.experiment_id], filter_string=f"source_run_id = '{run.info.run_id}'"
+    )
+    if not models:
+        raise FileNotFoundError(f"A run {run.info.run_id} não tem um modelo registrado.")
+    model_uri = models[0].model_uri
+    print(f"Carregando o modelo {model_uri}...")
+    pyfunc_model = mlflow.pyfunc.load_model(model_uri)
+    if 'sklearn' in pyfunc_model.metadata.flavors:
+        return mlflow.sklearn.load_model(model_uri)
+    return pyfunc_model.unwrap_python_model().model
+
+
+def evaluate_tabular(trainer, client, run, train_config, data_config, options, temp_dir):
+    if data_config is train_config['data']:
+        print("AVISO: avaliando na tabela de treino; passe um dataset separado em 'data' para uma avaliação honesta.")
+    data_path, zip_member = trainer.get_data_path(data_config, temp_dir)
+    df = trainer.read_dataset(data_path, zip_member, data_config)
+    encoding_path = client.download_artifacts(run.info.run_id, "feature_encoding.json", temp_dir)
+    with open(encoding_path, "r") as f:
+        encoding = yaml.safe_load(f)
+
+    # A "decodificação" da tabela é a codificação das features, feita uma vez;
+    # a inferência roda em lotes de linhas.
+    X = tabular.encode_features(df, encoding["features"], encoding["categories"])
+    y = df[data_config['target_column']].to_numpy()
+    del df
+    model = load_sklearn_model(client, run)
+    print(f"Avaliando {len(X)} linhas (lotes de {options['batch_size']})...")
+
+    batch_seconds, batch_sizes, probas = [], [], []
+    start = time.perf_counter()
+    for offset in range(0, len(X), options['batch_size']):
+        batch_start = time.perf_counter()
+        probas.append(model.predict_proba(X[offset:offset + options['batch_size']]))
+        batch_seconds.append(time.perf_counter() - batch_start)
+        batch_sizes.append(len(probas[-1]))
+    metrics = evaluation.latency_metrics(batch_seconds, batch_sizes, time.perf_counter() - start, unit="rows")
+
+    proba = np.concatenate(probas)
+    # RandomForest.predict é a classe de maior probabilidade
+    preds = model.classes_[np.argmax(proba, axis=1)]
+    metrics.update(trainer.classification_scores(y, preds, proba, model.classes_))
+    return metrics
+
+
+EVALUATORS = {
+    'detection': (evaluate_detection, 32),
+    'image_classification': (evaluate_image_classification, 32),
+    'generic_classification': (evaluate_tabular, 4096),
+}
+
+
+def main(args):
+    config = {}
+    if args.config:
+        with open(args.config, "r") as f:
+            config = yaml.safe_load(f) or {}
+    options = dict(EVALUATION_DEFAULTS, **(config.get('evaluation') or {}))
+    for key in ('batch_size', 'workers', 'device', 'split'):
+        if getattr(args, key) is not None:
+            options[key] = getattr(args, key)
+
+    # A run avaliada está no servidor; a run de avaliação fica junto dela.
+    mlflow.set_tracking_uri(tracking.server_uri())
+    client = MlflowClient()
+
+    temp_dir = tempfile.mkdtemp(prefix="mlflow_eval_")
+    try:
+        run, train_config = load_training_run(client, args.run_id, temp_dir)
+        trainer_type = train_config['trainer_type']
+        if trainer_type not in EVALUATORS:
+            raise ValueError(f"Avaliação não suportada para trainer_type '{trainer_type}'.")
+        evaluate_fn, default_batch_size = EVALUATORS[trainer_type]
+        options['batch_size'] = options['batch_size'] or default_batch_size
+        trainer = registry.load_trainer(trainer_type)
+        data_config = config.get('data') or train_config['data']
+
+        run_name = options.get('run_name') or f"eval_{run.info.run_name}"
+        tags = {offline_sync.PARENT_RUN_TAG: run.info.run_id, "evaluated_run_id": run.info.run_id}
+        with mlflow.start_run(experiment_id=run.info.experiment_id, run_name=run_name, tags=tags) as eval_run:
+            print(f"Avaliando a run '{run.info.run_name}' ({run.info.run_id}) na run filha '{run_name}'...")
+            mlflow.log_params({f"eval_{key}": value for key, value in options.items() if value is not None})
+            mlflow.log_dict({"data": data_config, "dataset": fingerprint.dataset_identity(data_config)}, "evaluation_data.json")
+
+            metrics = evaluate_fn(trainer, client, run, train_config, data_config, options, temp_dir)
+            mlflow.log_metrics(metrics)
+            for name, value in metrics.items():
+                print(f"  {name}: {value:.4f}" if isinstance(value, float) else f"  {name}: {value}")
+            print(f"Avaliação concluída (Run ID: {eval_run.info.run_id}).")
+            return eval_run.info.run_id
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Avalia o modelo de uma run de treino num dataset e registra o resultado numa run filha."
+    )
+    parser.add_argument("--run-id", required=True, help="Run de treino cujo modelo será avaliado.")
+    parser.add_argument("--config", help="YAML com 'data' (dataset de avaliação) e 'evaluation' (opções).")
+    parser.add_argument("--batch-size", type=int, help="Imagens (ou linhas) por lote de inferência.")
+    parser.add_argument("--workers", type=int, help="Threads de decodificação das imagens.")
+    parser.add_argument("--device", help="Dispositivo da inferência (padrão: cpu).")
+    parser.add_argument("--split", help="Split do dataset de imagens (padrão: test ou val).")
+    args = parser.parse_args()
+
+    main(args)
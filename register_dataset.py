@@ -1,48 +1,65 @@
 import mlflow
 import argparse
 import os
+import shutil
+from utils import dataset_upload, dataset_manifest, tracking, instrumentation
 
-mlflow.set_tracking_uri("http://172.100.11.45:5000") 
+# Datasets são sempre registrados direto no servidor: as runs de treino (e os
+# manifestos de versões incrementais) referenciam o run_id registrado aqui.
+mlflow.set_tracking_uri(tracking.server_uri())
 
 def main(args):
+    # Tempo, CPU e bytes enviados por etapa, registrados na run ao final.
+    with instrumentation.recording() as timeline:
+        run_id = register(args)
+    if run_id is not None:
+        timeline.log(run_id)
+
+
+def register(args):
+    """Registra o dataset numa run do servidor. Retorna o run_id (None se a run não foi criada)."""
     # 1. Validar se o caminho local existe
     if not os.path.exists(args.local_path):
         print(f"Erro: Caminho local não encontrado: {args.local_path}")
         print("Por favor, verifique o caminho e tente novamente.")
-        return
+        return None
 
     experiment_name = args.experiment_name
-    
-    # 2. Verificar se o experimento já existe
-    experiment = mlflow.get_experiment_by_name(experiment_name)
-    
-    if experiment is None:
-        # 3. Se NÃO existe, criamos com um caminho de artefato legível
-        print(f"Experimento '{experiment_name}' não encontrado. Criando um novo...")
-        
-        # Construímos o caminho: s3://<bucket_name>/<experiment_name>
-        artifact_location = f"s3://mlflow/{experiment_name}"
-        
-        try:
-            mlflow.create_experiment(experiment_name, artifact_location=artifact_location)
-            print(f"Novo experimento criado com local de artefato: {artifact_location}")
-        except mlflow.exceptions.MlflowException as e:
-            print(f"Erro ao criar experimento (pode já existir): {e}")
-            pass
-    
-    elif experiment.lifecycle_stage == 'deleted':
-        # 4. SE EXISTIR, MAS ESTIVER DELETADO (Proteção)
-        print(f"ERRO: O experimento '{experiment_name}' existe, mas está na lixeira.")
-        print("Por favor, acesse a UI do MLflow e 'Delete Permanentemente' para recriá-lo.")
-        return
 
-    # 5. Definir o experimento
-    mlflow.set_experiment(experiment_name)
+    # 2. Garantir que o experimento existe e está ativo (criando se necessário)
+    with instrumentation.stage("experiment_lookup"):
+        experiment_id = tracking.prepare_experiment(experiment_name)
+    if experiment_id is None:
+        return None
+
+    # 3. Definir o experimento
+    mlflow.set_experiment(experiment_id=experiment_id)
+
+    # 6. Nos modos resumíveis, verificar se há um registro interrompido para retomar
+    manifest = None
+    resume_run_id = None
+    if args.upload_mode != 'single':
+        manifest = dataset_upload.UploadManifest(dataset_upload.UploadManifest.path_for(
+            args.local_path, args.run_name, args.artifact_path, experiment_name, args.upload_mode
+        ))
+        resume_run_id = manifest.run_id
+        if resume_run_id:
+            try:
+                mlflow.get_run(resume_run_id)
+                print(f"Retomando registro interrompido (Run ID: {resume_run_id})...")
+            except mlflow.exceptions.MlflowException:
+                print(f"A run {resume_run_id} do registro anterior não existe mais. Começando do zero.")
+                manifest.remove()
+                manifest = dataset_upload.UploadManifest(manifest.path)
+                resume_run_id = None
 
     # 3. Iniciar a run do MLflow
-    with mlflow.start_run(run_name=args.run_name) as run:
+    run_kwargs = {"run_id": resume_run_id} if resume_run_id else {"run_name": args.run_name}
+    with mlflow.start_run(**run_kwargs) as run:
         run_id = run.info.run_id
         print(f"Iniciando run '{args.run_name}' (ID: {run_id}) no experimento '{args.experiment_name}'...")
+        if manifest is not None and not resume_run_id:
+            manifest.start(run_id)
 
         # 4. Logar parâmetros e descrição
         # Isso é ótimo para rastrear metadados
@@ -56,13 +73,25 @@ def main(args):
         print(f"Fazendo upload do dataset de '{args.local_path}' para o artifact path '{args.artifact_path}'...")
         
         try:
-            mlflow.log_artifact(
-                local_path=args.local_path,
-                artifact_path=args.artifact_path
-            )
+            with instrumentation.stage("upload"):
+                if args.upload_mode == 'single':
+                    mlflow.log_artifact(
+                        local_path=args.local_path,
+                        artifact_path=args.artifact_path
+                    )
+                else:
+                    stats = upload_resumable(args, run_id, manifest)
+                    mlflow.log_metrics(stats)
         except Exception as e:
             print(f"Erro durante o upload do artefato: {e}")
-            return
+            if manifest is not None:
+                print("O progresso foi salvo. Execute o mesmo comando novamente para retomar o upload.")
+            mlflow.end_run(status="FAILED")
+            return run_id
+
+        if manifest is not None:
+            manifest.remove()
+            shutil.rmtree(pack_dir(manifest), ignore_errors=True)
 
         # 6. Sucesso!
         print("\n--- SUCESSO! ---")
@@ -71,7 +100,80 @@ def main(args):
         print(f"\nUse este ID de Run no seu arquivo .yaml de treino:")
         print(f"=====================================")
         print(f"  dataset_run_id: \"{run_id}\"")
+        if args.upload_mode == 'pack':
+            zip_name = os.path.basename(os.path.abspath(args.local_path)) + ".zip"
+            print(f"  dataset_artifact_path: \"{args.artifact_path}/{zip_name}\"")
+        elif args.upload_mode == 'walk':
+            print(f"  dataset_artifact_path: \"{args.artifact_path}\"")
+        elif args.upload_mode == 'manifest':
+            print("  (os caminhos relativos da config partem da raiz de --local_path)")
         print(f"=====================================")
+    return run_id
+
+
+def pack_dir(manifest):
+    return manifest.path[:-len(".jsonl")]
+
+
+def upload_resumable(args, run_id, manifest):
+    """
+    Envia o dataset nos modos 'walk' (arquivo por arquivo, em paralelo),
+    'pack' (um .zip da pasta) ou 'manifest' (só o que mudou em relação à
+    versão pai). O progresso fica salvo no manifesto local.
+    """
+    if args.chunk_size_mb:
+        dataset_upload.enable_multipart(args.chunk_size_mb)
+
+    if args.upload_mode == 'manifest':
+        return upload_manifest_version(args, run_id, manifest)
+
+    source_path = args.local_path
+    if args.upload_mode == 'pack' and os.path.isdir(args.local_path):
+        zip_name = os.path.basename(os.path.abspath(args.local_path)) + ".zip"
+        source_path = os.path.join(pack_dir(manifest), zip_name)
+        if os.path.exists(source_path):
+            print(f"Reaproveitando o .zip gerado anteriormente: {source_path}")
+        else:
+            print(f"Compactando '{args.local_path}' em {source_path}...")
+            with instrumentation.stage("pack"):
+                dataset_upload.pack_folder(args.local_path, source_path)
+
+    files = dataset_upload.list_files(source_path)
+    print(f"Enviando {len(files)} arquivo(s) com até {args.upload_workers} uploads simultâneos...")
+    return dataset_upload.upload_files(run_id, files, args.artifact_path, manifest, workers=args.upload_workers)
+
+
+def upload_manifest_version(args, run_id, manifest):
+    """
+    Registra uma versão incremental: calcula o hash de cada arquivo, envia só
+    os conteúdos que a versão pai não tem e salva o manifesto da versão completa.
+    """
+    files = dataset_upload.list_files(args.local_path)
+    print(f"Calculando o hash de {len(files)} arquivos...")
+    with instrumentation.stage("hash"):
+        hashes = dataset_manifest.hash_files(files, workers=args.upload_workers)
+
+    parent_manifest = None
+    if args.parent_run_id:
+        print(f"Comparando com a versão pai (Run ID: {args.parent_run_id})...")
+        parent_manifest = dataset_manifest.load_manifest(args.parent_run_id)
+        mlflow.set_tag("dataset_parent_run_id", args.parent_run_id)
+
+    version, to_upload = dataset_manifest.plan_version(
+        hashes, run_id, args.artifact_path, parent_manifest, args.parent_run_id
+    )
+    print(f"{len(to_upload)} de {len(files)} arquivos são novos ou mudaram; os demais são reaproveitados.")
+
+    pending = set(to_upload)
+    new_files = [f for f in files if f[1].replace(os.sep, "/") in pending]
+    stats = dataset_upload.upload_files(run_id, new_files, args.artifact_path, manifest, workers=args.upload_workers)
+
+    # O manifesto só é gravado depois que todos os arquivos novos foram enviados,
+    # então uma versão com manifesto está sempre completa.
+    mlflow.log_dict(version, dataset_manifest.MANIFEST_ARTIFACT)
+    mlflow.set_tag(dataset_manifest.FORMAT_TAG, "manifest")
+    stats.update(dataset_manifest.manifest_stats(version, to_upload))
+    return stats
 
 
 if __name__ == '__main__':
@@ -111,5 +213,35 @@ if __name__ == '__main__':
         help="O nome do experimento no MLflow para agrupar os datasets. O padrão é 'Datasets'."
     )
 
+    parser.add_argument(
+        "--upload_mode",
+        choices=["single", "walk", "pack", "manifest"],
+        default="single",
+        help="Como enviar o dataset:\n"
+             "  single:   uma única chamada log_artifact (comportamento original).\n"
+             "  walk:     arquivo por arquivo, em paralelo e resumível (a pasta fica descompactada no MLflow).\n"
+             "  pack:     compacta a pasta num .zip e envia de forma resumível.\n"
+             "  manifest: como 'walk', mas envia só os arquivos que mudaram em relação a --parent_run_id."
+    )
+
+    parser.add_argument(
+        "--parent_run_id",
+        help="Run ID da versão anterior do dataset (registrada com --upload_mode manifest).\n"
+             "Arquivos com o mesmo conteúdo não são enviados de novo."
+    )
+
+    parser.add_argument(
+        "--upload_workers",
+        type=int,
+        default=8,
+        help="Número máximo de uploads simultâneos nos modos 'walk' e 'pack'. O padrão é 8."
+    )
+
+    parser.add_argument(
+        "--chunk_size_mb",
+        type=float,
+        help="Ativa o upload multipart do MLflow com partes deste tamanho (requer o proxy de artefatos do servidor)."
+    )
+
     args = parser.parse_args()
     main(args)
\ No newline at end of file
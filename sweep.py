@@ -0,0 +1,139 @@
+import mlflow
+import yaml
+import argparse
+import multiprocessing
+from mlflow.tracking import MlflowClient
+import train
+from utils import hpo, metric_stream, tracking, offline_sync
+
+
+def run_trial(config, parent_run_id, pruner_settings, metric, force=False):
+    """
+    Executa um trial num processo próprio (com diretório temporário e run filha
+    próprios). Retorna o run_id do trial.
+    """
+    callbacks = None
+    if pruner_settings is not None:
+        state, lock, min_epochs, reduction_factor, mode = pruner_settings
+        pruner = hpo.AshaPruner(state, lock, min_epochs=min_epochs, reduction_factor=reduction_factor, mode=mode)
+
+        def on_prune(epoch, value):
+            mlflow.set_tags({hpo.PRUNED_TAG: "true", "sweep_pruned_epoch": epoch})
+
+        callbacks = hpo.pruning_callbacks(pruner, metric, on_prune=on_prune)
+
+    run_tags = {"mlflow.parentRunId": parent_run_id, "sweep_parent_run_id": parent_run_id}
+    return train.run_experiment(config, run_tags=run_tags, extra_callbacks=callbacks, force=force)
+
+
+def collect_results(trials, async_results, metric):
+    client = MlflowClient()
+    metric_key = metric_stream.sanitize_metric_name(metric)
+    rows = []
+    for (index, trial_params, _), async_result in zip(trials, async_results):
+        row = {"trial": index, "params": trial_params, "run_id": None, "value": None, "status": "failed"}
+        try:
+            row["run_id"] = async_result.get()
+        except Exception as e:
+            print(f"Trial {index} falhou: {e}")
+        if row["run_id"]:
+            run = client.get_run(row["run_id"])
+            row["value"] = run.data.metrics.get(metric_key)
+            row["status"] = "pruned" if run.data.tags.get(hpo.PRUNED_TAG) == "true" else "completed"
+        rows.append(row)
+    return rows
+
+
+def main(config_path, force=False):
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+
+    if 'sweep' not in config:
+        raise ValueError("A config não tem a seção 'sweep' com o espaço de busca.")
+    sweep = config['sweep']
+    metric = sweep['metric']
+    mode = sweep.get('mode', 'max')
+    max_concurrent = sweep.get('max_concurrent', 1)
+
+    # 1. Expandir o espaço de busca em trials
+    combos = hpo.expand_search_space(
+        sweep['parameters'],
+        search=sweep.get('search', 'random'),
+        num_trials=sweep.get('num_trials', 10),
+        seed=sweep.get('seed', 0)
+    )
+    trials = [(i, params, hpo.trial_config(config, params, i)) for i, params in enumerate(combos)]
+    print(f"Busca de hiperparâmetros: {len(trials)} trials, até {max_concurrent} simultâneos.")
+
+    tracking_mode = tracking.configure(config)
+    experiment_id = tracking.prepare_experiment(config['experiment_name'])
+    if experiment_id is None:
+        return
+
+    with tracking.start_run(config['experiment_name'], experiment_id, run_name=f"{config['run_name']}_sweep") as parent_run:
+        parent_run_id = parent_run.info.run_id
+        mlflow.log_dict(sweep, "sweep.yaml")
+        mlflow.log_params({
+            "sweep_metric": metric,
+            "sweep_mode": mode,
+            "sweep_trials": len(trials),
+            "sweep_max_concurrent": max_concurrent,
+        })
+
+        # 2. Agendar os trials num pool de processos. "spawn" evita herdar o
+        #    estado do torch/CUDA do processo pai; cada processo roda 1 trial.
+        context = multiprocessing.get_context("spawn")
+        with context.Manager() as manager:
+            pruning = sweep.get('pruning')
+            pruner_settings = None
+            if pruning and pruning.get('scheduler', 'asha') == 'asha':
+                pruner_settings = (
+                    manager.dict(), manager.Lock(),
+                    pruning.get('min_epochs', 1), pruning.get('reduction_factor', 3), mode
+                )
+
+            with context.Pool(processes=max_concurrent, maxtasksperchild=1) as pool:
+                async_results = [
+                    pool.apply_async(run_trial, (trial, parent_run_id, pruner_settings, metric, force))
+                    for _, _, trial in trials
+                ]
+                pool.close()
+                pool.join()
+
+            rows = collect_results(trials, async_results, metric)
+
+        # 3. Registrar o resultado da busca na run pai
+        mlflow.log_dict({"trials": rows}, "sweep_results.json")
+        counts = {status: sum(1 for r in rows if r["status"] == status) for status in ("completed", "pruned", "failed")}
+        mlflow.log_metrics({f"sweep_trials_{status}": n for status, n in counts.items()})
+
+        scored = [r for r in rows if r["value"] is not None]
+        if not scored:
+            print("Nenhum trial produziu a métrica da busca.")
+        else:
+            report_best(scored, counts, metric, mode)
+
+    # As runs filhas são enviadas junto com a run pai, agora finalizada.
+    offline_sync.maybe_start_background_sync(config, tracking_mode)
+
+
+def report_best(scored, counts, metric, mode):
+    best = max(scored, key=lambda r: r["value"]) if mode == 'max' else min(scored, key=lambda r: r["value"])
+    mlflow.set_tag("sweep_best_run_id", best["run_id"])
+    mlflow.log_metric(f"best_{metric_stream.sanitize_metric_name(metric)}", best["value"])
+    mlflow.log_dict(best["params"], "best_params.yaml")
+
+    print("\n--- BUSCA CONCLUÍDA ---")
+    print(f"Trials: {counts['completed']} completos, {counts['pruned']} interrompidos, {counts['failed']} com erro.")
+    print(f"Melhor trial: {best['trial']} ({metric} = {best['value']:.4f}, Run ID: {best['run_id']})")
+    print(f"Hiperparâmetros: {best['params']}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Executa uma busca de hiperparâmetros a partir da seção 'sweep' da config."
+    )
+    parser.add_argument("--config", required=True, help="Caminho para o arquivo de configuração YAML.")
+    parser.add_argument("--force", action="store_true", help="Treina os trials mesmo se já houver runs idênticas.")
+    args = parser.parse_args()
+
+    main(args.config, force=args.force)
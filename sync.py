@@ -0,0 +1,18 @@
+import argparse
+from utils import offline_sync
+
+
+def main(args):
+    sent, deferred, failed = offline_sync.sync_all(workers=args.workers)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Envia ao servidor MLflow as runs gravadas no modo offline (tracking: {mode: offline})."
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Envios de artefatos em paralelo por run.")
+    args = parser.parse_args()
+
+    main(args)
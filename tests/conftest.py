@@ -0,0 +1,43 @@
+# tests/conftest.py
+import os
+import sys
+import pytest
+
+# Os módulos do projeto (train.py, utils/, trainers/) são importados a partir da raiz.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def mlflow_store_dir(tmp_path_factory):
+    # Um único banco por sessão: criar o esquema do MLflow leva alguns segundos.
+    return tmp_path_factory.mktemp("mlflow_store")
+
+
+@pytest.fixture
+def mlflow_store(mlflow_store_dir, tmp_path, monkeypatch):
+    """
+    "Servidor" MLflow local (SQLite + artefatos em disco) no lugar do servidor
+    central, com o diário offline e o cache de datasets em pastas do teste.
+    Retorna o tracking URI.
+    """
+    import mlflow
+    from utils import dataset_cache
+
+    uri = f"sqlite:///{mlflow_store_dir / 'mlflow.db'}"
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", uri)
+    monkeypatch.setenv("MLFLOW_ARTIFACT_ROOT", f"file://{mlflow_store_dir / 'artifacts'}")
+    monkeypatch.setenv("MLFLOW_OFFLINE_DIR", str(tmp_path / "offline"))
+    monkeypatch.setenv("MLFLOW_DATASET_CACHE_DIR", str(tmp_path / "dataset_cache"))
+    monkeypatch.delenv("MLFLOW_SERVER_URI", raising=False)
+    monkeypatch.delenv("MLFLOW_TRACKING_MODE", raising=False)
+    monkeypatch.chdir(tmp_path)
+    mlflow.set_tracking_uri(uri)
+    dataset_cache._CACHES.clear()
+    dataset_cache.release_pins()
+    yield uri
+    while mlflow.active_run() is not None:
+        mlflow.end_run()
+    # O modo offline define MLFLOW_SERVER_URI direto em os.environ.
+    os.environ.pop("MLFLOW_SERVER_URI", None)
+    dataset_cache._CACHES.clear()
+    dataset_cache.release_pins()
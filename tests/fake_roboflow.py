@@ -0,0 +1,69 @@
+# tests/fake_roboflow.py
+import os
+import shutil
+import types
+import yaml
+
+
+class LocalRoboflow:
+    """
+    Cliente falso com a interface do SDK do Roboflow: serve as exportações de
+    uma pasta local (<raiz>/<workspace>/<projeto>/<versão>/<formato>/), sem
+    rede. A raiz vem de `root` ou de MLFLOW_ROBOFLOW_LOCAL_DIR; fora do pytest,
+    use MLFLOW_ROBOFLOW_CLIENT=fake_roboflow:LocalRoboflow com tests/ no PYTHONPATH.
+    Como o SDK, grava no data.yaml os caminhos absolutos do download.
+    """
+
+    downloads = 0
+
+    def __init__(self, api_key=None, root=None):
+        self.root = root or os.environ["MLFLOW_ROBOFLOW_LOCAL_DIR"]
+        self.path = []
+
+    def _child(self, name):
+        child = type(self)(root=self.root)
+        child.path = self.path + [str(name)]
+        return child
+
+    def workspace(self, name):
+        return self._child(name)
+
+    def project(self, name):
+        return self._child(name)
+
+    def version(self, number):
+        return self._child(number)
+
+    def download(self, model_format, location=None, overwrite=False):
+        source = os.path.join(self.root, *self.path, model_format)
+        if not os.path.isdir(source):
+            raise FileNotFoundError(f"Exportação não encontrada: {source}")
+        type(self).downloads += 1
+        shutil.copytree(source, location, dirs_exist_ok=overwrite)
+        data_yaml_path = os.path.join(location, "data.yaml")
+        with open(data_yaml_path, "r") as f:
+            content = yaml.safe_load(f)
+        for key in ("train", "val", "test"):
+            if isinstance(content.get(key), str):
+                content[key] = os.path.join(os.path.abspath(location), content[key])
+        with open(data_yaml_path, "w") as f:
+            yaml.safe_dump(content, f)
+        return types.SimpleNamespace(location=location)
+
+
+def make_export(root, workspace="ws", project="pecas", version=3, model_format="yolov8", num_images=3):
+    """Cria uma exportação YOLO mínima no formato servido pelo LocalRoboflow."""
+    export_dir = os.path.join(root, workspace, project, str(version), model_format)
+    for split in ("train", "valid", "test"):
+        for sub in ("images", "labels"):
+            os.makedirs(os.path.join(export_dir, split, sub), exist_ok=True)
+        for i in range(num_images):
+            with open(os.path.join(export_dir, split, "images", f"{i}.jpg"), "wb") as f:
+                f.write(os.urandom(256))
+            with open(os.path.join(export_dir, split, "labels", f"{i}.txt"), "w") as f:
+                f.write("0 0.5 0.5 0.2 0.2\n")
+    with open(os.path.join(export_dir, "data.yaml"), "w") as f:
+        yaml.safe_dump({
+            "train": "train/images", "val": "valid/images", "test": "test/images", "nc": 1, "names": ["peca"],
+        }, f)
+    return export_dir
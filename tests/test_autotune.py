@@ -0,0 +1,21 @@
+# tests/test_autotune.py
+from utils import autotune
+
+
+def test_budget_comes_from_the_config_before_free_memory(monkeypatch):
+    monkeypatch.setattr(autotune, "available_memory_mb", lambda: 10000.0)
+    settings = autotune.tune_settings({'autotune': True})
+    assert autotune.configured_memory_gb({}, settings) is None
+    assert autotune.memory_budget_mb({}, settings) == 8000.0
+    config = {'resources': {'memory_gb': 4}}
+    assert autotune.memory_budget_mb(config, settings) == 4096.0
+    assert autotune.configured_memory_gb(config, dict(settings, memory_gb=2)) == 2.0
+
+
+def test_cached_result_is_reused_only_if_it_still_fits():
+    entry = {"best": {"batch_size": 16, "peak_memory_mb": 3000.0}, "rows": []}
+    cache = {"chave": entry}
+    assert autotune.cached_result(cache, "chave", 6000.0) is entry
+    # Menos memória livre do que na medição: mede de novo.
+    assert autotune.cached_result(cache, "chave", 2500.0) is None
+    assert autotune.cached_result(cache, "outra", 6000.0) is None
@@ -0,0 +1,150 @@
+# tests/test_dataset_upload.py
+import argparse
+import os
+import zipfile
+import pytest
+from utils import dataset_upload
+
+
+class FlakyClient:
+    """Cliente falso do MLflow: registra os envios e falha no n-ésimo."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.sent = []
+
+    def log_artifact(self, run_id, local_path, artifact_path=None):
+        if self.fail_on is not None and len(self.sent) + 1 == self.fail_on:
+            self.fail_on = None
+            raise ConnectionError("conexão perdida")
+        self.sent.append((run_id, os.path.basename(local_path), artifact_path))
+
+
+def make_dataset(root, num_dirs=3, files_per_dir=4):
+    for d in range(num_dirs):
+        os.makedirs(os.path.join(root, f"pasta_{d}"), exist_ok=True)
+        for i in range(files_per_dir):
+            with open(os.path.join(root, f"pasta_{d}", f"{i}.txt"), "w") as f:
+                f.write(f"{d}-{i}\n" * (i + 1))
+    return root
+
+
+def test_manifest_survives_reload_and_truncated_line(tmp_path):
+    path = str(tmp_path / "estado" / "upload.jsonl")
+    manifest = dataset_upload.UploadManifest(path)
+    manifest.start("run123")
+    manifest.mark_done("a.txt", 10, 1.5)
+    manifest.mark_done("b.txt", 20, 2.5)
+    # Interrupção no meio de uma escrita: a última linha fica incompleta.
+    with open(path, "a") as f:
+        f.write('{"done": "c.txt", "si')
+
+    reloaded = dataset_upload.UploadManifest(path)
+    assert reloaded.run_id == "run123"
+    assert reloaded.is_done("a.txt", 10, 1.5)
+    assert reloaded.is_done("b.txt", 20, 2.5)
+    assert not reloaded.is_done("c.txt", 30, 3.5)
+    # Um arquivo alterado depois do envio é enviado de novo.
+    assert not reloaded.is_done("a.txt", 11, 1.5)
+
+    reloaded.remove()
+    assert not os.path.exists(path)
+
+
+def test_manifest_path_depends_on_every_argument(tmp_path):
+    base = ("dados", "run", "dataset", "Datasets", "walk")
+    path = dataset_upload.UploadManifest.path_for(*base, state_dir=str(tmp_path))
+    assert path == dataset_upload.UploadManifest.path_for(*base, state_dir=str(tmp_path))
+    for i in range(len(base)):
+        changed = list(base)
+        changed[i] += "_outro"
+        assert dataset_upload.UploadManifest.path_for(*changed, state_dir=str(tmp_path)) != path
+
+
+def test_upload_resumes_only_pending_files(tmp_path):
+    root = make_dataset(str(tmp_path / "dados"))
+    files = dataset_upload.list_files(root)
+    manifest_path = str(tmp_path / "upload.jsonl")
+    manifest = dataset_upload.UploadManifest(manifest_path)
+    manifest.start("run123")
+
+    client = FlakyClient(fail_on=5)
+    with pytest.raises(ConnectionError):
+        dataset_upload.upload_files("run123", files, "dataset", manifest, workers=1, client=client)
+    # Os envios já agendados terminam; só o que falhou fica pendente.
+    first_batch = list(client.sent)
+    assert len(first_batch) == len(files) - 1
+
+    # Nova execução (novo processo): o manifesto em disco diz o que falta.
+    client = FlakyClient()
+    stats = dataset_upload.upload_files(
+        "run123", files, "dataset", dataset_upload.UploadManifest(manifest_path), workers=4, client=client
+    )
+    assert stats["upload_files"] == 1
+    assert client.sent[0][1:] == ("0.txt", "dataset/pasta_1")
+    sent = first_batch + client.sent
+    assert len(sent) == len(files)
+    expected = {("run123", os.path.basename(rel), "dataset/" + os.path.dirname(rel)) for _, rel, _, _ in files}
+    assert set(sent) == expected
+
+
+def test_pack_folder_keeps_folder_at_zip_root(tmp_path):
+    root = make_dataset(str(tmp_path / "meu_dataset"), num_dirs=2, files_per_dir=2)
+    archive = dataset_upload.pack_folder(root, str(tmp_path / "saida" / "meu_dataset.zip"))
+    assert not os.path.exists(archive + ".partial")
+    with zipfile.ZipFile(archive) as zip_ref:
+        names = sorted(zip_ref.namelist())
+    assert names == [f"meu_dataset/pasta_{d}/{i}.txt" for d in range(2) for i in range(2)]
+
+
+def register_args(local_path, mode):
+    return argparse.Namespace(
+        local_path=local_path, run_name="dataset_teste", artifact_path="dataset", description="teste",
+        experiment_name="Datasets", upload_mode=mode, parent_run_id=None, upload_workers=2, chunk_size_mb=None,
+    )
+
+
+@pytest.mark.parametrize("mode", ["walk", "pack"])
+def test_register_dataset_against_local_store(mlflow_store, tmp_path, monkeypatch, mode):
+    import register_dataset
+    from mlflow.tracking import MlflowClient
+
+    monkeypatch.setattr(dataset_upload, "DEFAULT_STATE_DIR", str(tmp_path / "uploads"))
+    root = make_dataset(str(tmp_path / "meu_dataset"))
+    run_id = register_dataset.register(register_args(root, mode))
+
+    client = MlflowClient(mlflow_store)
+    run = client.get_run(run_id)
+    assert run.info.status == "FINISHED"
+    assert run.data.metrics["upload_files"] == (12 if mode == "walk" else 1)
+    if mode == "walk":
+        listed = {a.path for a in client.list_artifacts(run_id, "dataset/pasta_0")}
+        assert listed == {f"dataset/pasta_0/{i}.txt" for i in range(4)}
+    else:
+        assert [a.path for a in client.list_artifacts(run_id, "dataset")] == ["dataset/meu_dataset.zip"]
+    # O manifesto de progresso é apagado ao fim de um registro completo.
+    assert not os.listdir(tmp_path / "uploads")
+
+
+def test_register_dataset_resumes_interrupted_run(mlflow_store, tmp_path, monkeypatch):
+    import register_dataset
+    from mlflow.tracking import MlflowClient
+
+    monkeypatch.setattr(dataset_upload, "DEFAULT_STATE_DIR", str(tmp_path / "uploads"))
+    root = make_dataset(str(tmp_path / "meu_dataset"))
+    real_upload = dataset_upload.upload_files
+
+    def interrupted_upload(run_id, files, artifact_path, manifest, workers=8, client=None):
+        real_upload(run_id, files[:5], artifact_path, manifest, workers=1)
+        raise ConnectionError("conexão perdida")
+
+    monkeypatch.setattr(dataset_upload, "upload_files", interrupted_upload)
+    first_run_id = register_dataset.register(register_args(root, "walk"))
+    assert MlflowClient(mlflow_store).get_run(first_run_id).info.status == "FAILED"
+
+    monkeypatch.setattr(dataset_upload, "upload_files", real_upload)
+    run_id = register_dataset.register(register_args(root, "walk"))
+    assert run_id == first_run_id
+    run = MlflowClient(mlflow_store).get_run(run_id)
+    assert run.info.status == "FINISHED"
+    assert run.data.metrics["upload_files"] == 7
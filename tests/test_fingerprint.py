@@ -0,0 +1,24 @@
+# tests/test_fingerprint.py
+from mlflow.tracking import MlflowClient
+from utils import fingerprint, hpo
+
+
+def finished_run(client, experiment_id, value, start_time, tags=None):
+    tags = dict(tags or {}, **{fingerprint.FINGERPRINT_TAG: value})
+    run = client.create_run(experiment_id, start_time=start_time, tags=tags)
+    client.set_terminated(run.info.run_id)
+    return run.info.run_id
+
+
+def test_pruned_trials_are_not_reused(mlflow_store, tmp_path):
+    client = MlflowClient(mlflow_store)
+    experiment_id = client.create_experiment(f"fingerprint_{tmp_path.name}")
+
+    # O trial interrompido é o mais recente, mas a run completa é a reaproveitada.
+    complete_id = finished_run(client, experiment_id, "abc", 1000)
+    finished_run(client, experiment_id, "abc", 2000, {hpo.PRUNED_TAG: "true"})
+    assert fingerprint.find_finished_run(experiment_id, "abc", client).info.run_id == complete_id
+
+    finished_run(client, experiment_id, "so_podados", 3000, {hpo.PRUNED_TAG: "true"})
+    assert fingerprint.find_finished_run(experiment_id, "so_podados", client) is None
+    assert fingerprint.find_finished_run(experiment_id, "outra", client) is None
@@ -0,0 +1,58 @@
+# tests/test_instrumentation.py
+import os
+import pytest
+from utils import instrumentation
+
+
+def test_repeated_stages_are_summed():
+    with instrumentation.recording() as timeline:
+        for _ in range(2):
+            with instrumentation.stage("etapa"):
+                sum(range(10000))
+    metrics = timeline.metrics()
+    assert [r["stage"] for r in timeline.stages] == ["etapa", "etapa"]
+    assert metrics["stage_etapa_wall_seconds"] == pytest.approx(sum(r["wall_seconds"] for r in timeline.stages))
+    assert metrics["stage_etapa_process_peak_rss_mb"] == max(r["process_peak_rss_mb"] for r in timeline.stages)
+
+
+def test_stage_outside_recording_is_a_no_op():
+    with instrumentation.stage("etapa"):
+        pass
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/net/dev"), reason="requer /proc (Linux)")
+def test_network_counters_are_named_as_host_wide():
+    with instrumentation.recording() as timeline:
+        with instrumentation.stage("etapa"):
+            pass
+    record = timeline.stages[0]
+    assert "host_net_recv_mb" in record and "host_net_sent_mb" in record
+    assert not any(key.startswith("net_") for key in record)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="requer /proc (Linux)")
+def test_stage_rss_is_measured_at_entry_and_exit():
+    with instrumentation.recording() as timeline:
+        with instrumentation.stage("aloca"):
+            block = bytearray(64 * 1024 ** 2)
+            block[::4096] = b"x" * len(block[::4096])
+        del block
+        with instrumentation.stage("leve"):
+            pass
+    aloca, leve = timeline.stages
+    assert aloca["rss_end_mb"] - aloca["rss_start_mb"] > 50
+    # A etapa leve mede a própria memória; o pico do processo continua o da anterior.
+    assert leve["rss_end_mb"] < aloca["rss_end_mb"] - 50
+    # (o kernel atualiza o ru_maxrss com alguma defasagem, daí a folga)
+    assert leve["process_peak_rss_mb"] > aloca["rss_end_mb"] - 5
+
+
+def test_works_without_the_resource_module(monkeypatch):
+    # Windows: sem o módulo resource.
+    monkeypatch.setattr(instrumentation, "resource", None)
+    assert instrumentation.peak_rss_mb() is None
+    with instrumentation.recording() as timeline:
+        with instrumentation.stage("etapa"):
+            pass
+    assert "process_peak_rss_mb" not in timeline.stages[0]
+    assert timeline.metrics()["stage_etapa_cpu_seconds"] >= 0
@@ -0,0 +1,31 @@
+# tests/test_model_logging.py
+import warnings
+import mlflow
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from utils import model_logging
+
+
+@pytest.mark.parametrize("model_format", ["cloudpickle", "joblib"])
+def test_logged_model_takes_the_fit_matrix(mlflow_store, tmp_path, model_format):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 4)).astype(np.float32)
+    y = (X[:, 0] > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=3, random_state=0).fit(X, y)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        with mlflow.start_run():
+            metrics = model_logging.log_sklearn_model(
+                model, "modelo", X, {'format': model_format, 'example_rows': 2}, str(tmp_path)
+            )
+            model_uri = f"runs:/{mlflow.active_run().info.run_id}/modelo"
+    assert metrics["model_log_seconds"] > 0
+    # Assinatura e exemplo no mesmo formato do fit: sem o aviso de nomes de colunas do sklearn.
+    assert not [w for w in caught if "feature names" in str(w.message)]
+
+    loaded = mlflow.pyfunc.load_model(model_uri)
+    inputs = loaded.metadata.get_input_schema().inputs
+    assert inputs[0].type == np.dtype(np.float32) and inputs[0].shape == (-1, 4)
+    assert list(loaded.predict(X[:10])) == list(model.predict(X[:10]))
@@ -0,0 +1,99 @@
+# tests/test_offline_sync.py
+import json
+import os
+import mlflow
+from mlflow.tracking import MlflowClient
+from utils import offline_sync, tracking
+
+
+def record_offline_runs(experiment_name, tmp_path):
+    """Grava no diário local uma run pai (com métricas e artefato) e uma filha."""
+    assert tracking.configure({'tracking': {'mode': 'offline'}}) == 'offline'
+    experiment_id = tracking.prepare_experiment(experiment_name)
+    artifact = tmp_path / "resultado.txt"
+    artifact.write_text("ok\n")
+    with mlflow.start_run(experiment_id=experiment_id, run_name="pai") as parent:
+        mlflow.log_param("lr", "0.01")
+        for step in range(3):
+            mlflow.log_metric("loss", 1.0 / (step + 1), step=step)
+        mlflow.log_artifact(str(artifact), "saidas")
+        with mlflow.start_run(experiment_id=experiment_id, run_name="filha", nested=True) as child:
+            mlflow.log_param("fold", "1")
+    return parent.info.run_id, child.info.run_id
+
+
+def remote_runs(remote, experiment_name):
+    experiment = remote.get_experiment_by_name(experiment_name)
+    return remote.search_runs([experiment.experiment_id]) if experiment else []
+
+
+def test_sync_replays_runs_once(mlflow_store, tmp_path):
+    experiment_name = f"offline_{tmp_path.name}"
+    parent_id, child_id = record_offline_runs(experiment_name, tmp_path)
+    assert tracking.server_uri() == mlflow_store
+    remote = MlflowClient(mlflow_store)
+    assert remote_runs(remote, experiment_name) == []
+
+    assert offline_sync.sync_all(workers=2) == (2, 0, 0)
+    runs = {r.data.tags[tracking.OFFLINE_RUN_TAG]: r for r in remote_runs(remote, experiment_name)}
+    assert set(runs) == {parent_id, child_id}
+    parent = runs[parent_id]
+    assert parent.info.status == "FINISHED"
+    assert parent.data.params == {"lr": "0.01"}
+    assert [m.value for m in remote.get_metric_history(parent.info.run_id, "loss")] == [1.0, 0.5, 1.0 / 3]
+    assert [a.path for a in remote.list_artifacts(parent.info.run_id, "saidas")] == ["saidas/resultado.txt"]
+    # A filha aponta para a run pai do servidor, não para o ID do diário.
+    assert runs[child_id].data.tags[offline_sync.PARENT_RUN_TAG] == parent.info.run_id
+
+    # O ID do experimento do servidor fica no cache, separado do ID do diário.
+    with open(os.path.join(tracking.offline_dir(), "experiments.json")) as f:
+        cache = json.load(f)
+    assert cache[f"{mlflow_store}|{experiment_name}"]["id"] == parent.info.experiment_id
+
+    # Repetir o sync não envia nada.
+    assert offline_sync.sync_all() == (0, 0, 0)
+    assert len(remote_runs(remote, experiment_name)) == 2
+
+
+def test_sync_without_ledger_reuses_remote_runs(mlflow_store, tmp_path):
+    experiment_name = f"offline_{tmp_path.name}"
+    record_offline_runs(experiment_name, tmp_path)
+    assert offline_sync.sync_all() == (2, 0, 0)
+    remote = MlflowClient(mlflow_store)
+    first = {r.info.run_id for r in remote_runs(remote, experiment_name)}
+
+    # Ledger perdido: as runs do servidor são encontradas pela tag offline_run_id.
+    os.remove(os.path.join(tracking.offline_dir(), "sync_ledger.jsonl"))
+    assert offline_sync.sync_all() == (2, 0, 0)
+    runs = remote_runs(remote, experiment_name)
+    assert {r.info.run_id for r in runs} == first
+    parent = next(r for r in runs if r.info.run_name == "pai")
+    assert len(remote.get_metric_history(parent.info.run_id, "loss")) == 3
+
+
+def test_child_waits_for_unfinished_parent(mlflow_store, tmp_path):
+    experiment_name = f"offline_{tmp_path.name}"
+    tracking.configure({'tracking': {'mode': 'offline'}})
+    experiment_id = tracking.prepare_experiment(experiment_name)
+    parent = mlflow.start_run(experiment_id=experiment_id, run_name="pai")
+    with mlflow.start_run(experiment_id=experiment_id, run_name="filha", nested=True):
+        mlflow.log_param("fold", "1")
+
+    assert offline_sync.sync_all() == (0, 1, 0)
+    mlflow.end_run()
+    assert offline_sync.sync_all() == (2, 0, 0)
+    runs = remote_runs(MlflowClient(mlflow_store), experiment_name)
+    assert {r.info.run_name for r in runs} == {"pai", "filha"}
+    assert parent.info.run_id in {r.data.tags[tracking.OFFLINE_RUN_TAG] for r in runs}
+
+
+def test_sync_is_skipped_while_another_holds_the_lock(mlflow_store):
+    from utils.dataset_cache import FileLock
+
+    os.makedirs(tracking.offline_dir(), exist_ok=True)
+    lock = FileLock(os.path.join(tracking.offline_dir(), "sync.lock"), blocking=False)
+    assert lock.acquire()
+    try:
+        assert offline_sync.sync_all() == (0, 0, 0)
+    finally:
+        lock.release()
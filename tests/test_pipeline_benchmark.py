@@ -0,0 +1,95 @@
+# tests/test_pipeline_benchmark.py
+import argparse
+import importlib.util
+import json
+import os
+import pandas as pd
+import pytest
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_spec = importlib.util.spec_from_file_location(
+    "pipeline_benchmark", os.path.join(REPO_ROOT, "benchmarks", "pipeline_benchmark.py")
+)
+pipeline_benchmark = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(pipeline_benchmark)
+
+
+def test_generate_detection_layout(tmp_path):
+    pipeline_benchmark.generate_detection(str(tmp_path), num_images=8, image_size=32, num_classes=2)
+    with open(tmp_path / "data.yaml") as f:
+        data = yaml.safe_load(f)
+    assert data["nc"] == 2 and data["train"] == "train/images"
+    for split, count in {"train": 8, "val": 2, "test": 2}.items():
+        images = sorted(os.listdir(tmp_path / split / "images"))
+        labels = sorted(os.listdir(tmp_path / split / "labels"))
+        assert len(images) == count
+        assert [os.path.splitext(n)[0] for n in images] == [os.path.splitext(n)[0] for n in labels]
+    for name in os.listdir(tmp_path / "train" / "labels"):
+        for line in (tmp_path / "train" / "labels" / name).read_text().splitlines():
+            cls, *box = line.split()
+            assert int(cls) in (0, 1)
+            assert all(0 <= float(v) <= 1 for v in box)
+
+
+def test_generate_classification_layout(tmp_path):
+    pipeline_benchmark.generate_classification(str(tmp_path), num_images=12, image_size=32, num_classes=3)
+    for split in ("train", "val"):
+        assert sorted(os.listdir(tmp_path / split)) == ["classe_0", "classe_1", "classe_2"]
+    assert len(os.listdir(tmp_path / "train" / "classe_0")) == 4
+
+
+def test_generate_tabular_is_deterministic_across_chunks(tmp_path):
+    pipeline_benchmark.generate_tabular(str(tmp_path / "a"), num_rows=250, num_columns=5, num_classes=3, chunk_rows=100)
+    pipeline_benchmark.generate_tabular(str(tmp_path / "b"), num_rows=250, num_columns=5, num_classes=3, chunk_rows=100)
+    df = pd.read_csv(tmp_path / "a" / "dados.csv")
+    assert df.shape == (250, 7)
+    assert list(df.columns[-2:]) == ["categoria", "alvo"]
+    assert set(df["alvo"]) <= {0, 1, 2}
+    assert (tmp_path / "a" / "dados.csv").read_bytes() == (tmp_path / "b" / "dados.csv").read_bytes()
+
+
+def test_compare_flags_slower_stages_and_lower_throughput():
+    baseline = {"tabular": {
+        "train_cold_train_seconds": 10.0, "train_cold_data_read_rows_per_s": 1000.0,
+        "register_upload_seconds": 2.0, "generate_seconds": 1.0, "dataset_mb": 5.0, "fingerprint_seconds": 0.01,
+    }}
+    results = {"tabular": {
+        "train_cold_train_seconds": 14.0,          # +40%: regressão
+        "train_cold_data_read_rows_per_s": 700.0,  # -30%: regressão
+        "register_upload_seconds": 2.2,            # +10%: dentro da tolerância
+        "generate_seconds": 9.0,                   # geração dos dados: ignorada
+        "dataset_mb": 50.0,                        # não é tempo nem vazão
+        "fingerprint_seconds": 0.05,               # abaixo de MIN_SECONDS nas duas execuções
+    }}
+    regressions = pipeline_benchmark.compare(results, baseline, tolerance=0.25)
+    assert {key for _, key, _, _ in regressions} == {"train_cold_train_seconds", "train_cold_data_read_rows_per_s"}
+    # Melhorias e cenários sem linha de base não são regressões.
+    faster = {"tabular": {"train_cold_train_seconds": 5.0}, "detection": {"train_cold_train_seconds": 99.0}}
+    assert pipeline_benchmark.compare(faster, baseline, tolerance=0.25) == []
+
+
+def test_benchmark_env_points_everything_to_the_work_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("MLFLOW_SERVER_URI", "http://servidor:5000")
+    env = pipeline_benchmark.benchmark_env(str(tmp_path))
+    assert "MLFLOW_SERVER_URI" not in env
+    assert env["MLFLOW_TRACKING_URI"] == f"sqlite:///{tmp_path / 'mlflow.db'}"
+    for key in ("MLFLOW_OFFLINE_DIR", "MLFLOW_DATASET_CACHE_DIR"):
+        assert env[key].startswith(str(tmp_path))
+
+
+def test_tabular_scenario_end_to_end(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args = argparse.Namespace(
+        scenarios=["tabular"], rows=2000, columns=5, classes=3, trees=2, images=0, image_size=32,
+        train_image_size=32, batch_size=2, work_dir=str(tmp_path / "trabalho"), keep=False,
+        output=str(tmp_path / "resultado.json"), baseline=None, save_baseline=str(tmp_path / "base.json"),
+        tolerance=0.25, fail_on_regression=False,
+    )
+    results = pipeline_benchmark.main(args)
+    metrics = results["tabular"]
+    for key in ("register_total_seconds", "train_cold_total_seconds", "train_warm_total_seconds",
+                "train_cold_dataset_download_seconds"):
+        assert metrics[key] > 0
+    with open(tmp_path / "base.json") as f:
+        assert json.load(f) == results
@@ -0,0 +1,133 @@
+# tests/test_roboflow_export.py
+import os
+import shutil
+import mlflow
+import pytest
+import yaml
+from mlflow.tracking import MlflowClient
+from fake_roboflow import LocalRoboflow, make_export
+from utils import dataset_cache, roboflow_export
+
+
+@pytest.fixture
+def exports(tmp_path, monkeypatch):
+    """Pasta de exportações servida pelo cliente falso, com o contador de downloads zerado."""
+    root = str(tmp_path / "exportacoes")
+    make_export(root)
+    monkeypatch.setenv("MLFLOW_ROBOFLOW_LOCAL_DIR", root)
+    monkeypatch.setenv(roboflow_export.CLIENT_ENV_VAR, "fake_roboflow:LocalRoboflow")
+    monkeypatch.setattr(LocalRoboflow, "downloads", 0)
+    return root
+
+
+def data_config(tmp_path, **extra):
+    config = {
+        'roboflow_workspace': "ws", 'roboflow_project': "pecas", 'roboflow_version': 3,
+        'roboflow_api_key': "chave", 'roboflow_snapshot_experiment': f"Datasets_{tmp_path.name}",
+    }
+    config.update(extra)
+    return config
+
+
+def fetch(config, tmp_path, run_name="treino"):
+    """Chama get_data_yaml_path numa run e retorna (data.yaml, parâmetros, tags da run)."""
+    with mlflow.start_run(run_name=run_name) as run:
+        data_yaml_path = roboflow_export.get_data_yaml_path(config, str(tmp_path / "run_tmp"))
+    data = MlflowClient().get_run(run.info.run_id).data
+    return data_yaml_path, data.params, data.tags
+
+
+def assert_relative_and_complete(data_yaml_path):
+    with open(data_yaml_path) as f:
+        content = yaml.safe_load(f)
+    base_dir = os.path.dirname(data_yaml_path)
+    for key, split in (("train", "train"), ("val", "valid"), ("test", "test")):
+        assert content[key] == f"{split}/images"
+        assert len(os.listdir(os.path.join(base_dir, content[key]))) == 3
+
+
+def drop_local_cache():
+    """Simula outra máquina: sem a exportação no cache local."""
+    dataset_cache.release_pins()
+    dataset_cache._CACHES.clear()
+    shutil.rmtree(os.environ["MLFLOW_DATASET_CACHE_DIR"])
+
+
+def test_env_var_selects_the_client(exports):
+    assert roboflow_export.resolve_client_factory() is LocalRoboflow
+    assert roboflow_export.resolve_client_factory(dict) is dict
+
+
+def test_relativize_data_yaml(tmp_path):
+    base_dir = tmp_path / "exportacao"
+    base_dir.mkdir()
+    path = base_dir / "data.yaml"
+    outside = str(tmp_path / "outra" / "images")
+    path.write_text(yaml.safe_dump({
+        "train": str(base_dir / "train" / "images"), "val": "valid/images", "test": outside, "nc": 1,
+    }))
+    roboflow_export.relativize_data_yaml(str(path))
+    content = yaml.safe_load(path.read_text())
+    assert content == {"train": "train/images", "val": "valid/images", "test": outside, "nc": 1}
+    # Sem data.yaml, nada a fazer.
+    roboflow_export.relativize_data_yaml(str(tmp_path / "nao_existe" / "data.yaml"))
+
+
+def test_export_is_downloaded_once_per_machine(mlflow_store, exports, tmp_path):
+    config = data_config(tmp_path)
+    first_path, params, _ = fetch(config, tmp_path)
+    assert params["roboflow_source"] == "roboflow"
+    second_path, params, _ = fetch(config, tmp_path)
+    assert params["roboflow_source"] == "cache"
+    assert second_path == first_path
+    assert LocalRoboflow.downloads == 1
+    assert_relative_and_complete(second_path)
+
+    # Outra versão é outra entrada do cache.
+    make_export(exports, version=4)
+    other_path, params, _ = fetch(dict(config, roboflow_version=4), tmp_path)
+    assert params["roboflow_source"] == "roboflow" and other_path != first_path
+    assert LocalRoboflow.downloads == 2
+
+
+def test_damaged_cache_entry_is_downloaded_again(mlflow_store, exports, tmp_path):
+    config = data_config(tmp_path)
+    data_yaml_path, _, _ = fetch(config, tmp_path)
+    os.remove(os.path.join(os.path.dirname(data_yaml_path), "train", "images", "0.jpg"))
+    _, params, _ = fetch(config, tmp_path)
+    assert params["roboflow_source"] == "roboflow"
+    assert LocalRoboflow.downloads == 2
+
+
+def test_without_cache_downloads_to_the_run_dir(mlflow_store, exports, tmp_path):
+    data_yaml_path = roboflow_export.get_data_yaml_path(data_config(tmp_path, use_cache=False), str(tmp_path / "run_tmp"))
+    assert data_yaml_path == str(tmp_path / "run_tmp" / "roboflow" / "pecas-3" / "data.yaml")
+    assert_relative_and_complete(data_yaml_path)
+    assert not os.path.exists(os.environ["MLFLOW_DATASET_CACHE_DIR"])
+
+
+def test_snapshot_is_registered_and_restored(mlflow_store, exports, tmp_path):
+    config = data_config(tmp_path, roboflow_register=True)
+    _, params, tags = fetch(config, tmp_path)
+    assert params["roboflow_source"] == "roboflow"
+    snapshot_run_id = tags["roboflow_snapshot_run_id"]
+
+    key = roboflow_export.export_key(roboflow_export.export_identity(config))
+    snapshot = roboflow_export.find_snapshot(key, MlflowClient(), config['roboflow_snapshot_experiment'])
+    assert snapshot.info.run_id == snapshot_run_id
+    assert snapshot.data.params["roboflow_version"] == "3"
+    assert [a.path for a in MlflowClient().list_artifacts(snapshot_run_id, "dataset")] == ["dataset/pecas-3.zip"]
+
+    drop_local_cache()
+    data_yaml_path, params, tags = fetch(config, tmp_path)
+    assert params["roboflow_source"] == "snapshot"
+    assert tags["roboflow_snapshot_run_id"] == snapshot_run_id
+    assert LocalRoboflow.downloads == 1
+    assert_relative_and_complete(data_yaml_path)
+
+    # Sem roboflow_register, o snapshot não é consultado nem criado.
+    drop_local_cache()
+    _, params, tags = fetch(data_config(tmp_path), tmp_path)
+    assert params["roboflow_source"] == "roboflow"
+    assert "roboflow_snapshot_run_id" not in tags
+    assert LocalRoboflow.downloads == 2
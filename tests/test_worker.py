@@ -0,0 +1,110 @@
+# tests/test_worker.py
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import types
+import pytest
+from mlflow.tracking import MlflowClient
+
+
+@pytest.fixture
+def tabular_dataset_run(mlflow_store, tmp_path, monkeypatch):
+    """Dataset tabular (.zip) registrado no store local. Retorna o run_id."""
+    import register_dataset
+    from utils import dataset_upload
+
+    monkeypatch.setattr(dataset_upload, "DEFAULT_STATE_DIR", str(tmp_path / "uploads"))
+    root = tmp_path / "dados_tab"
+    root.mkdir()
+    lines = ["x1,x2,alvo"] + [f"{i % 7},{(i * 3) % 5},{i % 2}" for i in range(60)]
+    (root / "dados.csv").write_text("\n".join(lines) + "\n")
+    return register_dataset.register(argparse.Namespace(
+        local_path=str(root), run_name="dados_tab", artifact_path="dataset", description=None,
+        experiment_name="Datasets", upload_mode="pack", parent_run_id=None, upload_workers=1, chunk_size_mb=None,
+    ))
+
+
+def tabular_config(dataset_run_id, experiment_name):
+    return {
+        'experiment_name': experiment_name,
+        'run_name': "tabular",
+        'trainer_type': 'generic_classification',
+        'data': {
+            'dataset_run_id': dataset_run_id, 'dataset_artifact_path': "dataset/dados_tab.zip",
+            'data_file_relative_path': "dados_tab/dados.csv", 'target_column': "alvo",
+        },
+        'params': {'model_name': 'rf', 'seed': 0, 'n_estimators': 2, 'max_depth': 2},
+    }
+
+
+def _hold_memory(size_mb):
+    block = bytearray(size_mb * 1024 ** 2)
+    block[::4096] = b"x" * len(block[::4096])
+    time.sleep(60)
+
+
+def test_cache_stats_are_per_job_in_a_warm_process(mlflow_store, tabular_dataset_run, tmp_path):
+    import worker
+
+    config = dict(tabular_config(tabular_dataset_run, f"worker_{tmp_path.name}"), queue={'force': True})
+    client = MlflowClient(mlflow_store)
+    metrics = []
+    for job in ("job1.yaml", "job2.yaml"):
+        summary = worker.run_job(str(tmp_path / job), config, None, time.time(), "teste")
+        metrics.append(client.get_run(summary["run_id"]).data.metrics)
+
+    assert (metrics[0]["dataset_cache_misses"], metrics[0]["dataset_cache_hits"]) == (1, 0)
+    # O segundo job, no mesmo processo, só conta o próprio acesso ao cache.
+    assert (metrics[1]["dataset_cache_misses"], metrics[1]["dataset_cache_hits"]) == (0, 1)
+    assert metrics[1]["dataset_cache_bytes_downloaded"] == 0
+
+
+def test_identical_submissions_reuse_the_finished_run(mlflow_store, tabular_dataset_run, tmp_path):
+    import yaml
+    import worker
+
+    config_path = tmp_path / "tabular.yaml"
+    config = dict(tabular_config(tabular_dataset_run, f"worker_{tmp_path.name}"), resources={'cpus': 1})
+    config_path.write_text(yaml.safe_dump(config))
+    queue_dir = str(tmp_path / "fila")
+    names = [worker.submit(queue_dir, str(config_path)) for _ in range(2)]
+
+    run_ids = []
+    for name in names:
+        job_path = os.path.join(queue_dir, "pending", name)
+        job = worker.load_job(job_path)
+        summary = worker.run_job(job_path, job, None, job['queue']['submitted_at'], "teste")
+        run_ids.append(summary["run_id"])
+    # O horário de envio e a reserva de recursos não mudam a impressão digital.
+    assert run_ids[1] == run_ids[0]
+    experiment = MlflowClient(mlflow_store).get_experiment_by_name(config['experiment_name'])
+    assert len(MlflowClient(mlflow_store).search_runs([experiment.experiment_id])) == 1
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="requer /proc (Linux)")
+def test_job_above_its_memory_reservation_is_killed(tmp_path):
+    import worker
+
+    options = dict(worker.WORKER_DEFAULTS, cpus=1, memory_gb=1.0)
+    queue_worker = worker.Worker(str(tmp_path / "fila"), options)
+    context = multiprocessing.get_context("spawn")
+    queue_worker.results = context.Queue()
+    name = "guloso.yaml"
+    (tmp_path / "fila" / "running" / name).write_text("run_name: guloso\n")
+    process = context.Process(target=_hold_memory, args=(300,), daemon=True)
+    process.start()
+    # Reserva de 150 MB para um job que aloca 300 MB.
+    queue_worker.running[name] = (types.SimpleNamespace(process=process, job=name), [], 150 / 1024)
+    deadline = time.time() + 30
+    while process.is_alive() and time.time() < deadline:
+        queue_worker.enforce_memory()
+        process.join(0.5)
+    assert not process.is_alive()
+    queue_worker.collect()
+
+    assert not queue_worker.running
+    status_path = tmp_path / "fila" / "failed" / f"{name}.status.json"
+    with open(status_path) as f:
+        assert json.load(f)["error"].startswith("Memória acima da reserva")
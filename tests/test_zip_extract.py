@@ -0,0 +1,45 @@
+# tests/test_zip_extract.py
+import os
+import zipfile
+import pytest
+from utils import zip_extract
+
+
+def make_zip(path, n_dirs=200, files_per_dir=8):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+        for d in range(n_dirs):
+            for f in range(files_per_dir):
+                zip_ref.writestr(f"dataset/split/d{d:03d}/f{f}.txt", f"{d}-{f}")
+    return path
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_many_workers_share_new_directories(tmp_path, use_processes):
+    # Regressão: workers criando a mesma pasta nova ao mesmo tempo (FileExistsError).
+    archive = make_zip(tmp_path / "data.zip")
+    for attempt in range(5 if not use_processes else 1):
+        dest = tmp_path / f"out{attempt}"
+        stats = zip_extract.extract_members(str(archive), str(dest), workers=8, use_processes=use_processes)
+        assert stats["extract_files"] == 1600
+        assert (dest / "dataset/split/d123/f7.txt").read_text() == "123-7"
+
+
+def test_prefixes_extract_only_the_selected_subtree(tmp_path):
+    archive = tmp_path / "data.zip"
+    with zipfile.ZipFile(archive, "w") as zip_ref:
+        zip_ref.writestr("a/data.yaml", "nc: 1")
+        zip_ref.writestr("a/train/x.jpg", "x")
+        zip_ref.writestr("b/other.txt", "y")
+    dest = tmp_path / "out"
+    stats = zip_extract.extract_members(str(archive), str(dest), prefixes=["a"], workers=4)
+    assert stats["extract_files"] == 2
+    assert (dest / "a/train/x.jpg").exists()
+    assert not (dest / "b").exists()
+
+
+def test_unknown_prefix_raises(tmp_path):
+    archive = tmp_path / "data.zip"
+    with zipfile.ZipFile(archive, "w") as zip_ref:
+        zip_ref.writestr("a/data.yaml", "nc: 1")
+    with pytest.raises(FileNotFoundError):
+        zip_extract.extract_members(str(archive), str(tmp_path / "out"), prefixes=["missing"])
@@ -4,124 +4,276 @@ import argparse
 import os
 import shutil
 import tempfile
-from trainers import detection_trainer, generic_classification_trainer, image_classification_trainer
+from trainers import registry
+from utils import metric_stream, artifact_uploader, tracking, offline_sync, fingerprint, instrumentation
 
-mlflow.set_tracking_uri("http://172.100.11.45:5000")
+# Quantas vezes a run foi retomada com --resume.
+RESUME_COUNT_TAG = "resume_count"
 
-def main(config_path):
-    
+
+def start_metric_stream(config, run_id, trainer):
+    """
+    Cria o envio assíncrono das métricas por época (trainers com callbacks). Desative com
+    `stream_metrics: false` ou ajuste com `stream_metrics: {batch_interval, flush_interval}`.
+    Retorna (streamer, callbacks); ambos vazios quando o envio está desligado.
+    """
+    stream_config = config.get('stream_metrics', True)
+    if not stream_config or not trainer.SUPPORTS_CALLBACKS:
+        return None, None
+    if stream_config is True:
+        stream_config = {}
+
+    streamer = metric_stream.MetricStreamer(run_id, flush_interval=stream_config.get('flush_interval', 5.0))
+    callbacks = metric_stream.yolo_callbacks(streamer, batch_interval=stream_config.get('batch_interval'))
+    return streamer, callbacks
+
+
+def start_artifact_uploader(config, run_id, temp_dir, trainer):
+    """
+    Cria o envio concorrente de artefatos. Com `checkpoints: {upload: true}`,
+    os trainers YOLO também enviam weights/last.pt durante o treino.
+    Retorna (uploader, callbacks).
+    """
+    uploader = artifact_uploader.ArtifactUploader(run_id, workers=config.get('upload_workers', 4))
+    checkpoint_config = config.get('checkpoints') or {}
+    if not checkpoint_config.get('upload') or not trainer.SUPPORTS_CALLBACKS:
+        return uploader, {}
+    callbacks = artifact_uploader.checkpoint_callbacks(
+        uploader,
+        staging_dir=os.path.join(temp_dir, "checkpoint_snapshots"),
+        every_n_epochs=checkpoint_config.get('every_n_epochs', 1)
+    )
+    return uploader, callbacks
+
+
+def merge_callbacks(*callback_dicts):
+    merged = {}
+    for callbacks in callback_dicts:
+        for event, functions in (callbacks or {}).items():
+            merged.setdefault(event, []).extend(functions)
+    return merged
+
+
+def finish_artifact_uploads(uploader):
+    """Espera os envios pendentes e registra os tempos na run."""
+    summary = uploader.close()
+    mlflow.log_metrics(summary)
+    mlflow.log_dict({"uploads": uploader.timings}, "artifact_uploads.json")
+
+
+def reuse_previous_run(config, experiment_id, previous, run_tags=None):
+    """
+    A config (com o mesmo dataset, pesos e bibliotecas) já tem uma run
+    finalizada. Com `reuse: skip` (padrão) nada é criado e o run_id anterior
+    é retornado; com `reuse: link` é criada uma run leve, sem treino, que
+    aponta para a anterior e repete as suas métricas finais.
+    """
+    previous_id = previous.info.run_id
+    print(f"Já existe uma run finalizada idêntica: '{previous.info.run_name}' (Run ID: {previous_id}).")
+    print("Treino não executado. Use --force para treinar novamente.")
+
+    reuse = config.get('reuse', 'skip')
+    if reuse == 'skip':
+        return previous_id
+    if reuse != 'link':
+        raise ValueError(f"Valor de 'reuse' desconhecido: '{reuse}'. Use 'skip' ou 'link'.")
+
+    tags = dict(run_tags or {}, **{fingerprint.REUSED_RUN_TAG: previous_id})
+    with tracking.start_run(config['experiment_name'], experiment_id, run_name=config['run_name'], tags=tags) as run:
+        if 'params' in config:
+            mlflow.log_params(config['params'])
+        mlflow.log_dict(config, "config.yaml")
+        mlflow.log_metrics(previous.data.metrics)
+        print(f"Run '{config['run_name']}' criada apontando para os resultados de {previous_id}.")
+        return run.info.run_id
+
+
+def main(config_path, force=False):
+    # 1. Carregar a configuração
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+
+    run_experiment(config, force=force)
+
+
+def resume_experiment(run_id, config_path=None):
+    """
+    Retoma uma run interrompida (queda do processo, da máquina ou da spot
+    instance) a partir do último checkpoints/last.pt enviado para ela, na
+    mesma run do MLflow. A config é a config.yaml registrada na run; a de
+    `config_path`, se houver, só escolhe o servidor/modo de rastreamento.
+    Retorna o run_id, ou None se não há o que retomar.
+    """
+    local_config = {}
+    if config_path:
+        with open(config_path, "r") as f:
+            local_config = yaml.safe_load(f) or {}
+    tracking.configure(local_config)
+
+    client = mlflow.tracking.MlflowClient()
+    run = client.get_run(run_id)
+    if run.info.status == "FINISHED":
+        print(f"A run {run_id} já terminou; não há o que retomar.")
+        return None
+
+    config = yaml.safe_load(mlflow.artifacts.load_text(f"runs:/{run_id}/config.yaml"))
+    # Mantém o destino de rastreamento escolhido agora (a run vive nele).
+    if 'tracking' in local_config:
+        config['tracking'] = local_config['tracking']
+    trainer = registry.load_trainer(config['trainer_type'])
+    if not getattr(trainer, 'SUPPORTS_RESUME', False):
+        raise ValueError(f"O trainer '{config['trainer_type']}' não suporta retomada de treino.")
+    return run_experiment(config, resume_run_id=run_id)
+
+
+def download_checkpoint(run_id, dest_dir):
+    """Baixa o checkpoints/last.pt da run (enviado com `checkpoints: {upload: true}`)."""
+    try:
+        return mlflow.tracking.MlflowClient().download_artifacts(
+            run_id, f"{artifact_uploader.CHECKPOINT_ARTIFACT_PATH}/last.pt", dest_dir
+        )
+    except Exception as e:
+        raise RuntimeError(
+            f"A run {run_id} não tem checkpoint para retomar ({e}). "
+            "Treinos retomáveis precisam de `checkpoints: {upload: true}` na config."
+        ) from e
+
+
+def run_experiment(config, run_tags=None, extra_callbacks=None, force=False, resume_run_id=None):
+    """
+    Executa uma run completa a partir de uma config já carregada, num diretório
+    temporário próprio. `run_tags` são gravadas na run (ex: a run pai de uma
+    busca de hiperparâmetros) e `extra_callbacks` são repassados aos trainers YOLO.
+    Se uma run idêntica já terminou, o treino é pulado (veja reuse_previous_run),
+    a menos que `force` seja True. Com `resume_run_id`, continua essa run a partir
+    do seu último checkpoint (veja resume_experiment).
+    Retorna o run_id, ou None se a run não pôde ser iniciada.
+    """
+    # Só o trainer escolhido é importado (ex: detecção não carrega o sklearn).
+    trainer = registry.load_trainer(config['trainer_type'])
+
+    # Tempo, CPU, memória e bytes de cada etapa (inclusive dentro dos trainers),
+    # registrados na run ao final como métricas e timeline.json.
+    with instrumentation.recording() as timeline:
+        run_id, mode = _run_instrumented(config, trainer, run_tags, extra_callbacks, force, timeline, resume_run_id)
+
+    # Runs filhas (ex: trials de uma busca) são enviadas junto com a run pai.
+    if mode and not (run_tags or {}).get(offline_sync.PARENT_RUN_TAG):
+        offline_sync.maybe_start_background_sync(config, mode)
+    return run_id
+
+
+def run_trainer(config, trainer, run_id, temp_dir, extra_callbacks=None, resume_checkpoint=None):
+    """
+    Executa o trainer na run ativa, com as métricas por época e os checkpoints
+    enviados em segundo plano, e registra as métricas e artefatos finais.
+    """
+    streamer, stream_callbacks = start_metric_stream(config, run_id, trainer)
+    uploader, checkpoint_callbacks = start_artifact_uploader(config, run_id, temp_dir, trainer)
+    callbacks = merge_callbacks(stream_callbacks, checkpoint_callbacks, extra_callbacks)
+    try:
+        with instrumentation.stage("trainer"):
+            if resume_checkpoint:
+                outcome = trainer.run(config, temp_dir, callbacks, resume_checkpoint=resume_checkpoint)
+            else:
+                outcome = trainer.run(config, temp_dir, callbacks)
+        # Métricas finais e artefatos de saída (enviados em paralelo, em segundo plano)
+        with instrumentation.stage("log_outputs"):
+            trainer.log_outputs(config, outcome, uploader)
+    finally:
+        if streamer is not None:
+            streamer.close()
+        with instrumentation.stage("artifact_upload"):
+            finish_artifact_uploads(uploader)
+
+    print("Run finalizada com sucesso!")
+
+
+def _resume_run(config, trainer, run_id, extra_callbacks, temp_dir):
+    """
+    Reabre a run `run_id` e continua o treino do seu último checkpoint. Params,
+    config e fingerprint já foram registrados na primeira tentativa; as métricas
+    seguem a partir da época (e do batch) em que o treino parou.
+    """
+    with instrumentation.stage("checkpoint_download"):
+        checkpoint_path = download_checkpoint(run_id, os.path.join(temp_dir, "resume"))
+
+    with mlflow.start_run(run_id=run_id):
+        resume_count = int(mlflow.get_run(run_id).data.tags.get(RESUME_COUNT_TAG, 0)) + 1
+        mlflow.set_tag(RESUME_COUNT_TAG, resume_count)
+        print(f"Retomando a run '{config['run_name']}' (Run ID: {run_id}, retomada nº {resume_count})...")
+        run_trainer(config, trainer, run_id, temp_dir, extra_callbacks, resume_checkpoint=checkpoint_path)
+
+
+def _run_instrumented(config, trainer, run_tags, extra_callbacks, force, timeline, resume_run_id=None):
+    """Corpo do run_experiment, com as etapas medidas. Retorna (run_id, modo)."""
     temp_dir = tempfile.mkdtemp(prefix="mlflow_run_")
     print(f"Diretório de trabalho temporário isolado criado em: {temp_dir}")
+    run_id, mode = None, None
     
     try:
-        # 1. Carregar a configuração
-        with open(config_path, "r") as f:
-            config = yaml.safe_load(f)
-
-        # 2. Iniciar a run do MLflow
-        experiment_name = config['experiment_name']
-        
-        # 2. Verificar se o experimento já existe
-        experiment = mlflow.get_experiment_by_name(experiment_name)
-        
-        if experiment is None:
-            # 2. Se NÃO existe, criamos com um caminho de artefato legível
-            print(f"Experimento '{experiment_name}' não encontrado. Criando um novo...")
-            artifact_location = f"s3://mlflow/{experiment_name}"
-            try:
-                mlflow.create_experiment(experiment_name, artifact_location=artifact_location)
-                print(f"Novo experimento criado com local de artefato: {artifact_location}")
-            except mlflow.exceptions.MlflowException as e:
-                print(f"Erro ao criar experimento (pode já existir): {e}")
-                pass
-        
-        elif experiment.lifecycle_stage == 'deleted':
-            # 3. SE EXISTIR, MAS ESTIVER DELETADO
-            print(f"ERRO: O experimento '{experiment_name}' existe, mas está na lixeira.")
-            print("Por favor, acesse a UI do MLflow, vá para a aba 'Experiments',")
-            print("e 'Restaure' o experimento ou 'Delete Permanentemente' para recriá-lo.")
-            return
-        
-        # 4. Definir o experimento (agora sabemos que ele existe e está ativo)
-        mlflow.set_experiment(experiment_name)
-        with mlflow.start_run(run_name=config['run_name']) as run:
+        # 2. Iniciar a run do MLflow (no servidor ou, no modo offline, no diário local)
+        with instrumentation.stage("experiment_lookup"):
+            mode = tracking.configure(config)
+            experiment_name = config['experiment_name']
+            experiment_id = tracking.prepare_experiment(experiment_name)
+        if experiment_id is None:
+            return None, None
+
+        if resume_run_id is not None:
+            run_id = resume_run_id
+            _resume_run(config, trainer, run_id, extra_callbacks, temp_dir)
+            return run_id, mode
+
+        # Impressão digital da config + dataset + pesos + bibliotecas, para não
+        # gastar GPU repetindo uma run que já terminou
+        with instrumentation.stage("fingerprint"):
+            run_fingerprint, fingerprint_components = fingerprint.compute(config)
+            previous = None if force else fingerprint.find_finished_run(experiment_id, run_fingerprint)
+        if previous is not None:
+            return reuse_previous_run(config, experiment_id, previous, run_tags), mode
+        run_tags = dict(run_tags or {}, **{fingerprint.FINGERPRINT_TAG: run_fingerprint})
+
+        with tracking.start_run(experiment_name, experiment_id, run_name=config['run_name'], tags=run_tags) as run:
+            run_id = run.info.run_id
             
             print(f"Iniciando run '{config['run_name']}' no experimento '{config['experiment_name']}'...")
             if 'params' in config:
                 mlflow.log_params(config['params'])
             mlflow.log_dict(config, "config.yaml")
+            mlflow.log_dict(fingerprint_components, "fingerprint.json")
 
-            # 3. Selecionar e executar o trainer
-            if config['trainer_type'] == 'detection':
-                
-                results, data_yaml_path = detection_trainer.run(config, temp_dir)
-                
-                print(f"Logando artefato de entrada: {data_yaml_path}")
-                mlflow.log_artifact(data_yaml_path, "Configuracoes de Entrada")
-                
-                # Logar Métricas
-                if 'metrics_to_log' in config:
-                    metric_name_map = {
-                        'mAP_50': 'metrics/mAP50(B)', 'mAP_50_95': 'metrics/mAP50-95(B)',
-                        'Precision': 'metrics/precision(B)', 'Recall': 'metrics/recall(B)',
-                        'val_loss': 'val/box_loss', 'train_loss': 'train/box_loss',
-                        'F1-Score': 'metrics/f1(B)'
-                    }
-                    metrics_to_log = {}
-                    for metric_name in config['metrics_to_log']:
-                        source_name = metric_name_map.get(metric_name)
-                        if source_name:
-                            metrics_to_log[metric_name] = results.results_dict.get(source_name, 0)
-                    
-                    mlflow.log_metrics(metrics_to_log)
-
-                # Logar Artefatos de Saída
-                if 'output_artifacts_to_log' in config:
-                    print("Logando artefatos de saída do modelo...")
-                    for name, path in config['output_artifacts_to_log'].items():
-                        # results.save_dir agora é /tmp/mlflow_run.../yolo_results/run_name
-                        full_path = os.path.join(results.save_dir, path)
-                        if os.path.exists(full_path):
-                            mlflow.log_artifact(full_path, f"Resultados do Treino/{name}")
-
-            elif config['trainer_type'] == 'image_classification':
-                
-                results = image_classification_trainer.run(config, temp_dir)
-                
-                if 'metrics_to_log' in config:
-                    metric_name_map = {
-                        'train_loss': 'train/loss',
-                        'val_loss': 'val/loss',
-                        'top1_accuracy': 'metrics/accuracy_top1',
-                        'top5_accuracy': 'metrics/accuracy_top5'
-                    }
-                    metrics_to_log = {}
-                    for metric_name in config['metrics_to_log']:
-                        source_name = metric_name_map.get(metric_name)
-                        if source_name:
-                            metrics_to_log[metric_name] = results.results_dict.get(source_name, 0)
-                    
-                    mlflow.log_metrics(metrics_to_log)
-
-                if 'output_artifacts_to_log' in config:
-                    print("Logando artefatos de saída do modelo...")
-                    for name, path in config['output_artifacts_to_log'].items():
-                        full_path = os.path.join(results.save_dir, path)
-                        if os.path.exists(full_path):
-                            mlflow.log_artifact(full_path, f"Resultados do Treino/{name}")
-            
-            print("Run finalizada com sucesso!")
+            # 3. Executar o trainer (com as métricas por época sendo enviadas
+            #    em segundo plano enquanto o treino roda)
+            run_trainer(config, trainer, run_id, temp_dir, extra_callbacks)
+
+        return run_id, mode
 
     finally:
         if os.path.exists(temp_dir):
             print(f"Limpando diretório temporário: {temp_dir}")
-            shutil.rmtree(temp_dir)
+            with instrumentation.stage("cleanup"):
+                shutil.rmtree(temp_dir)
             print("Limpeza concluída. O servidor está limpo.")
+        # A limpeza acontece depois do fim da run: a linha do tempo é enviada por último.
+        if run_id is not None:
+            try:
+                timeline.log(run_id)
+            except Exception as e:
+                print(f"AVISO: não foi possível registrar a linha do tempo da run: {e}")
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument("--config", required=True, help="Caminho para o arquivo de configuração YAML.")
+    parser.add_argument("--config", help="Caminho para o arquivo de configuração YAML.")
+    parser.add_argument("--force", action="store_true", help="Treina mesmo se já houver uma run finalizada idêntica.")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Retoma a run interrompida a partir do seu último checkpoint (a --config, opcional, só define o rastreamento).")
     args = parser.parse_args()
+    if not args.config and not args.resume:
+        parser.error("informe --config ou --resume RUN_ID")
     
-    main(args.config)
\ No newline at end of file
+    if args.resume:
+        resume_experiment(args.resume, args.config)
+    else:
+        main(args.config, force=args.force)
\ No newline at end of file
@@ -1,24 +1,32 @@
 import mlflow
 import os
-import zipfile
-from roboflow import Roboflow
 from ultralytics import YOLO
 from ultralytics.utils import SETTINGS
+from trainers import yolo_common
+from utils import dataset_cache, roboflow_export, zip_extract, metric_stream, instrumentation
 
-def get_data_yaml_path(data_config, base_download_dir):
+# Nome na config (metrics_to_log) -> chave em results.results_dict
+METRIC_NAME_MAP = {
+    'mAP_50': 'metrics/mAP50(B)', 'mAP_50_95': 'metrics/mAP50-95(B)',
+    'Precision': 'metrics/precision(B)', 'Recall': 'metrics/recall(B)',
+    'val_loss': 'val/box_loss', 'train_loss': 'train/box_loss',
+    'F1-Score': 'metrics/f1(B)'
+}
+SUPPORTS_CALLBACKS = True
+SUPPORTS_RESUME = True
+# Tamanho de entrada padrão quando a config não define `image_size`.
+DEFAULT_IMAGE_SIZE = 640
+
+def get_data_yaml_path(data_config, base_download_dir, image_size=None):
     """
     Decide de onde carregar o dataset (Roboflow, Local ou Servidor MLflow)
-    e retorna o caminho para o data.yaml.
+    e retorna o caminho para o data.yaml. Com `image_size` e `predecode`,
+    datasets do servidor vêm com as imagens já decodificadas nesse tamanho.
     """
     
-    # Modo 1: Roboflow
+    # Modo 1: Roboflow (exportação em cache local; o SDK só é importado se for baixar)
     if 'roboflow_workspace' in data_config:
-        print(">>> Baixando o dataset do Roboflow...")
-        rf = Roboflow(api_key=data_config.get('roboflow_api_key'))
-        project = rf.workspace(data_config['roboflow_workspace']).project(data_config['roboflow_project'])
-        version = project.version(data_config['roboflow_version'])
-        dataset = version.download(data_config.get('download_format', 'yolov8'))
-        return dataset.location + "/data.yaml"
+        return roboflow_export.get_data_yaml_path(data_config, base_download_dir)
 
     elif 'local_data_yaml' in data_config:
         print(f">>> Usando dataset local em: {data_config['local_data_yaml']}")
@@ -26,29 +34,24 @@ def get_data_yaml_path(data_config, base_download_dir):
         
     elif 'dataset_run_id' in data_config:
         run_id = data_config['dataset_run_id']
-        artifact_zip_path = data_config['dataset_artifact_path']
         data_yaml_relative = data_config['data_yaml_relative_path']
         
         print(f">>> Baixando dataset do servidor MLflow (Run ID: {run_id})...")
         
         try:
-            downloaded_zip_file = mlflow.artifacts.download_artifacts(
-                run_id=run_id,
-                artifact_path=artifact_zip_path,
-                dst_path=base_download_dir
-            )
+            downloaded_zip_file = dataset_cache.download_dataset(data_config, base_download_dir)
         except Exception as e:
             print(f"Erro ao baixar artefato: {e}")
             raise
             
-        print(f"Dataset .zip baixado para: {downloaded_zip_file}")
+        print(f"Dataset .zip disponível em: {downloaded_zip_file}")
 
-        # 2. Descompactar o arquivo no mesmo diretório
-        unzip_dir = os.path.join(base_download_dir, "unzipped_data")
-        print(f"Descompactando para: {unzip_dir}...")
-        
-        with zipfile.ZipFile(downloaded_zip_file, 'r') as zip_ref:
-            zip_ref.extractall(unzip_dir)
+        # 2. Descompactar só a pasta do data.yaml (reaproveitando a extração do cache, se houver)
+        prefixes = zip_extract.required_prefixes(data_config, 'data_yaml_relative_path')
+        unzip_dir = dataset_cache.extract_dataset(downloaded_zip_file, data_config, base_download_dir, prefixes)
+        if image_size:
+            unzip_dir = dataset_cache.predecode_dataset(unzip_dir, data_config, prefixes, image_size, 'detection')
+        dataset_cache.log_cache_stats(data_config)
             
         print("Descompactação concluída.")
 
@@ -64,20 +67,31 @@ def get_data_yaml_path(data_config, base_download_dir):
     else:
         raise ValueError("Configuração de 'data' inválida.")
 
-def run(config, temp_dir):
+def run(config, temp_dir, callbacks=None, resume_checkpoint=None):
     """
     Executa o treinamento, traduzindo os parâmetros genéricos da config
-    para os nomes específicos que o YOLO espera.
+    para os nomes específicos que o YOLO espera. `callbacks` ({evento: [funções]})
+    são registrados no modelo, ex: para publicar métricas a cada época.
+    Com `resume_checkpoint` (um last.pt), continua o treino interrompido.
     """
     print("--- Executando o Trainer de Detecção (com Fontes de Dados Flexíveis) ---")
 
     data_config = config['data']
     params_config = config['params']
     
-    data_yaml_path = get_data_yaml_path(data_config, temp_dir)
+    data_yaml_path = get_data_yaml_path(data_config, temp_dir, params_config.get('image_size') or DEFAULT_IMAGE_SIZE)
     
+    project = os.path.join(temp_dir, "yolo_results")
+    model_path = params_config['model_name']
+    if resume_checkpoint:
+        done_epochs = yolo_common.prepare_resume(resume_checkpoint, data_yaml_path, project, config['run_name'])
+        print(f"Retomando o treino após a época {done_epochs} (checkpoint: {resume_checkpoint})...")
+        model_path = resume_checkpoint
+
     SETTINGS.update({'mlflow': False})
-    model = YOLO(params_config['model_name'])
+    with instrumentation.stage("model_load"):
+        model = YOLO(model_path)
+    metric_stream.add_callbacks(model, callbacks)
     
     yolo_params = {
         'imgsz': params_config.get('image_size'),
@@ -93,15 +107,36 @@ def run(config, temp_dir):
         'warmup_bias_lr': params_config.get('warmup_bias_lr'),
         'dropout': params_config.get('dropout'),
         'seed': params_config.get('seed'),
+        'cache': yolo_common.predecode_cache_mode(data_config),
     }
     yolo_params = {k: v for k, v in yolo_params.items() if v is not None}
+    if not resume_checkpoint:
+        yolo_params = yolo_common.apply_autotune(config, data_yaml_path, yolo_params, temp_dir)
 
     print(f"Iniciando treinamento com data: {data_yaml_path}")
-    results = model.train(
-        data=data_yaml_path,
-        project=os.path.join(temp_dir, "yolo_results"),
-        name=config['run_name'],
-        **yolo_params 
-    )
+    with instrumentation.stage("train"):
+        if resume_checkpoint:
+            # Os hiperparâmetros, a época e o otimizador vêm do checkpoint.
+            results = model.train(resume=True)
+        else:
+            results = model.train(
+                data=data_yaml_path,
+                project=project,
+                name=config['run_name'],
+                **yolo_params 
+            )
     
-    return results, data_yaml_path
\ No newline at end of file
+    return results, data_yaml_path
+
+
+def log_outputs(config, outcome, uploader):
+    """Registra o data.yaml usado, as métricas finais, os artefatos de saída e, com `export`, os modelos exportados."""
+    results, data_yaml_path = outcome
+
+    print(f"Logando artefato de entrada: {data_yaml_path}")
+    uploader.submit(data_yaml_path, "Configuracoes de Entrada")
+
+    yolo_common.log_mapped_metrics(config, results.results_dict, METRIC_NAME_MAP)
+    # Artefatos de saída (em paralelo, em segundo plano)
+    yolo_common.log_output_artifacts(config, results.save_dir, uploader)
+    yolo_common.export_and_benchmark(config, results.save_dir, uploader, DEFAULT_IMAGE_SIZE)
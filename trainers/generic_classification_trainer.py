@@ -1,109 +1,229 @@
 import mlflow
-import pandas as pd
 import os
-import zipfile
-from sklearn.model_selection import train_test_split
+import time
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+from utils import dataset_cache, zip_extract, tabular, cross_validation, model_logging, instrumentation
+
+# As métricas deste trainer são calculadas e registradas dentro do `run`.
+METRIC_NAME_MAP = {}
+SUPPORTS_CALLBACKS = False
+SUPPORTS_RESUME = False
 
 def get_data_path(data_config, base_download_dir):
     """
     Decide de onde carregar o dataset (Local ou Servidor MLflow)
-    e retorna o caminho para o arquivo .csv.
+    e retorna (caminho, membro). Quando o .csv está dentro de um .zip e
+    `stream_from_zip` está ativo (padrão), o caminho é o do .zip e `membro`
+    é o arquivo a ser lido direto dele; senão `membro` é None.
     """
     
     # Modo 1: Local (caminho direto)
     if 'path' in data_config:
         print(f">>> Usando dataset local em: {data_config['path']}")
-        return data_config['path']
+        return data_config['path'], None
         
     # Modo 2: Servidor MLflow (Dataset .csv ou .zip)
     elif 'dataset_run_id' in data_config:
         run_id = data_config['dataset_run_id']
-        artifact_path = data_config['dataset_artifact_path']
         
         print(f">>> Baixando dataset do servidor MLflow (Run ID: {run_id})...")
         
         try:
-            downloaded_file_path = mlflow.artifacts.download_artifacts(
-                run_id=run_id,
-                artifact_path=artifact_path,
-                dst_path=base_download_dir
-            )
+            downloaded_file_path = dataset_cache.download_dataset(data_config, base_download_dir)
         except Exception as e:
             print(f"Erro ao baixar artefato: {e}")
             raise
             
-        print(f"Artefato baixado para: {downloaded_file_path}")
+        print(f"Artefato disponível em: {downloaded_file_path}")
 
         if downloaded_file_path.endswith(".zip"):
-            unzip_dir = os.path.join(base_download_dir, "unzipped_data")
-            print(f"Descompactando para: {unzip_dir}...")
-            
-            with zipfile.ZipFile(downloaded_file_path, 'r') as zip_ref:
-                zip_ref.extractall(unzip_dir)
-            
-            print("Descompactação concluída.")
-            
             data_file_relative = data_config.get('data_file_relative_path')
             if not data_file_relative:
                 raise ValueError("Config 'data_file_relative_path' é necessária ao usar um .zip")
+
+            if data_config.get('stream_from_zip', True):
+                dataset_cache.log_cache_stats(data_config)
+                print(f"Lendo '{data_file_relative}' direto do .zip, sem descompactar.")
+                return downloaded_file_path, data_file_relative
+
+            unzip_dir = dataset_cache.extract_dataset(
+                downloaded_file_path, data_config, base_download_dir, [data_file_relative]
+            )
+            
+            print("Descompactação concluída.")
                 
             final_data_path = os.path.join(unzip_dir, data_file_relative)
         
         else:
             final_data_path = downloaded_file_path
 
+        dataset_cache.log_cache_stats(data_config)
+
         if not os.path.exists(final_data_path):
             raise FileNotFoundError(f"Arquivo de dados não encontrado em: {final_data_path}")
             
-        return final_data_path
+        return final_data_path, None
         
     else:
         raise ValueError("Configuração de 'data' inválida. Especifique 'path' ou 'dataset_run_id'.")
 
 
-def run(config, temp_dir):
+def read_dataset(data_path, zip_member=None, data_config=None):
+    """
+    Lê a tabela (.csv, .parquet ou .feather) do disco ou, em streaming, de
+    dentro do .zip, já com tipos compactos, e registra o tempo de carga e o
+    pico de memória.
+    """
+    data_config = data_config or {}
+    df, stats = tabular.timed_read(
+        data_path, zip_member,
+        compact=data_config.get('compact_dtypes', True),
+        chunksize=data_config.get('chunk_rows', 100000),
+        category_max_ratio=data_config.get('category_max_ratio', 0.5)
+    )
+    if zip_member is not None:
+        elapsed = max(stats["data_load_seconds"], 1e-9)
+        size_mb = zip_extract.member_size(data_path, zip_member) / (1024 ** 2)
+        print(f"Tabela lida do .zip: {size_mb:.1f} MB em {elapsed:.2f}s ({size_mb / elapsed:.1f} MB/s).")
+        stats.update({"csv_stream_seconds": elapsed, "csv_stream_mb_per_s": size_mb / elapsed})
+
+    print(
+        f"Tabela carregada: {stats['data_rows']} linhas x {stats['data_columns']} colunas, "
+        f"{stats['data_memory_mb']:.1f} MB em memória"
+        + (f" (pico de RSS: {stats['data_peak_rss_mb']:.0f} MB)." if 'data_peak_rss_mb' in stats else ".")
+    )
+    zip_extract.log_throughput(stats)
+    return df
+
+
+def classification_scores(y, preds, preds_proba, classes):
+    """Métricas de classificação a partir das predições e probabilidades."""
+    if preds_proba.shape[1] == 2:
+        preds_proba = preds_proba[:, 1]
+    return {
+        "Top-1 Accuracy": accuracy_score(y, preds),
+        "Precision": precision_score(y, preds, average="weighted", zero_division=0),
+        "Recall": recall_score(y, preds, average="weighted", zero_division=0),
+        "F1-Score": f1_score(y, preds, average="weighted", zero_division=0),
+        "ROC-AUC": roc_auc_score(y, preds_proba, multi_class='ovr', average="weighted", labels=classes)
+    }
+
+
+def score_model(model, X, y):
+    """Métricas de classificação do modelo em (X, y)."""
+    return classification_scores(y, model.predict(X), model.predict_proba(X), model.classes_)
+
+
+def select_hyperparams(config, base_hyperparams, X_train, y_train):
+    """
+    Com a seção `cv`, avalia os candidatos (ou só os hiperparâmetros de
+    `params`) por validação cruzada em paralelo no conjunto de treino,
+    registra as métricas por fold numa única escrita em lote e retorna os
+    hiperparâmetros do melhor candidato. Sem `cv`, retorna os de `params`.
+    """
+    cv_config = config.get('cv')
+    if not cv_config:
+        return base_hyperparams
+
+    candidates = [dict(base_hyperparams, **c) for c in (cv_config.get('candidates') or [{}])]
+    selection_metric = cv_config.get('metric', 'F1-Score')
+    start = time.perf_counter()
+    per_candidate = cross_validation.cross_validate(
+        # Cada fold já roda num processo próprio: as árvores usam 1 núcleo.
+        RandomForestClassifier(n_jobs=1), X_train, y_train, candidates, score_model,
+        folds=cv_config.get('folds', 5),
+        repeats=cv_config.get('repeats', 1),
+        seed=config['params']['seed'],
+        n_jobs=cv_config.get('n_jobs', -1)
+    )
+    elapsed = time.perf_counter() - start
+
+    metrics = cross_validation.cv_metrics(per_candidate)
+    cross_validation.log_cv_metrics(mlflow.active_run().info.run_id, metrics)
+
+    summaries = [cross_validation.summarize(fold_scores) for fold_scores in per_candidate]
+    best = max(range(len(candidates)), key=lambda i: summaries[i][selection_metric][0])
+    for i, summary in enumerate(summaries):
+        mean, std = summary[selection_metric]
+        marker = " <- melhor" if i == best else ""
+        print(f"  candidato {i} {candidates[i]}: {selection_metric} = {mean:.4f} ± {std:.4f}{marker}")
+    print(f"Validação cruzada concluída em {elapsed:.1f}s.")
+
+    mlflow.log_metric("cv_seconds", elapsed)
+    mlflow.set_tag("cv_best_candidate", best)
+    mlflow.log_dict({
+        "metric": selection_metric,
+        "best_candidate": best,
+        "candidates": [
+            {"hyperparams": candidates[i], "summary": {k: {"mean": m, "std": sd} for k, (m, sd) in summaries[i].items()}}
+            for i in range(len(candidates))
+        ],
+    }, "cv_results.json")
+    return candidates[best]
+
+
+def run(config, temp_dir, callbacks=None):
     """
     Executa um treinamento de classificação genérico.
-    Agora usa um temp_dir para isolamento.
+    Agora usa um temp_dir para isolamento. `callbacks` é ignorado (não há
+    laço de épocas no RandomForest).
     """
     print("--- Executando o Trainer de Classificação (Modo Seguro para Equipe) ---")
     
     # 1. Carregar dados (com a nova lógica)
-    data_path = get_data_path(config['data'], temp_dir) 
+    data_config = config['data']
+    p = config['params']
+    data_path, zip_member = get_data_path(data_config, temp_dir) 
     
-    target_col = config['data']['target_column']
-    df = pd.read_csv(data_path)
-    X = df.drop(columns=[target_col])
-    y = df[target_col]
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=config['params']['seed'])
+    target_col = data_config['target_column']
+    with instrumentation.stage("data_read"):
+        df = read_dataset(data_path, zip_member, data_config)
+
+    # Features num arquivo mapeado em memória, com as linhas já embaralhadas:
+    # treino e teste são fatias dele, sem cópias do DataFrame.
+    with instrumentation.stage("data_encode"):
+        X, y, feature_names, categories = tabular.to_memmap(
+            df, target_col, os.path.join(temp_dir, "features.npy"), seed=p['seed']
+        )
+    del df
+    X_train, X_test, y_train, y_test = tabular.split_views(X, y, test_size=p.get('test_size', 0.2))
+    mlflow.log_dict({"features": feature_names, "categories": categories}, "feature_encoding.json")
     
-    # 2. Treinamento do modelo
-    p = config['params']
+    # 2. Escolha dos hiperparâmetros (validação cruzada opcional) e treino final
     model_hyperparams = {"n_estimators": p['n_estimators'], "max_depth": p['max_depth'], "random_state": p['seed']}
-    model = RandomForestClassifier(**model_hyperparams)
-    model.fit(X_train, y_train)
+    with instrumentation.stage("cross_validation"):
+        model_hyperparams = select_hyperparams(config, model_hyperparams, X_train, y_train)
+    model = RandomForestClassifier(n_jobs=p.get('n_jobs', -1), **model_hyperparams)
+    start = time.perf_counter()
+    with instrumentation.stage("train"):
+        model.fit(X_train, y_train)
+    fit_metrics = {"train_fit_seconds": time.perf_counter() - start}
+    peak = tabular.peak_rss_mb()
+    if peak is not None:
+        fit_metrics["train_peak_rss_mb"] = peak
+    mlflow.log_metrics(fit_metrics)
     
-    # 3. Calcular predições para as métricas
-    preds = model.predict(X_test)
-    preds_proba = model.predict_proba(X_test)
-
-    # 4. Registrar métricas e modelo (isso pode ficar aqui, é simples)
+    # 3. Registrar métricas no conjunto de teste e o modelo
     print("Calculando e registrando métricas...")
-    
-    metrics_to_log = {
-        "Top-1 Accuracy": accuracy_score(y_test, preds),                   
-        "Precision": precision_score(y_test, preds, average="weighted"),   
-        "Recall": recall_score(y_test, preds, average="weighted"),         
-        "F1-Score": f1_score(y_test, preds, average="weighted"),           
-        "ROC-AUC": roc_auc_score(y_test, preds_proba, multi_class='ovr', average="weighted") 
-    }
+    with instrumentation.stage("evaluation"):
+        metrics_to_log = score_model(model, X_test, y_test)
 
     print(f"Métricas calculadas: {metrics_to_log}")
-    mlflow.log_metrics(metrics_to_log)
+    with instrumentation.stage("metric_logging"):
+        mlflow.log_metrics(metrics_to_log)
     
-    mlflow.sklearn.log_model(sk_model=model, name=p['model_name'], input_example=X_train)
+    # O modelo recebe as features codificadas (float32; categorias pelos
+    # códigos de feature_encoding.json).
+    with instrumentation.stage("model_logging"):
+        mlflow.log_metrics(model_logging.log_sklearn_model(
+            model, p['model_name'], X_train, config.get('model_logging'), temp_dir
+        ))
     
     print("Treinamento genérico concluído.")
-    return model
\ No newline at end of file
+    return model
+
+
+def log_outputs(config, model, uploader):
+    """Métricas e modelo já foram registrados no `run`; não há artefatos extras."""
+    return None
@@ -1,14 +1,29 @@
 # trainers/image_classification_trainer.py
 import mlflow
 import os
-import zipfile
 from ultralytics import YOLO
 from ultralytics.utils import SETTINGS
+from trainers import yolo_common
+from utils import dataset_cache, zip_extract, metric_stream, instrumentation
 
-def get_data_path(data_config, base_download_dir):
+# Nome na config (metrics_to_log) -> chave em results.results_dict
+METRIC_NAME_MAP = {
+    'train_loss': 'train/loss',
+    'val_loss': 'val/loss',
+    'top1_accuracy': 'metrics/accuracy_top1',
+    'top5_accuracy': 'metrics/accuracy_top5'
+}
+SUPPORTS_CALLBACKS = True
+SUPPORTS_RESUME = True
+# Tamanho de entrada padrão quando a config não define `image_size`.
+DEFAULT_IMAGE_SIZE = 224
+
+def get_data_path(data_config, base_download_dir, image_size=None):
     """
     Decide de onde carregar o dataset (Local ou Servidor MLflow)
     e retorna o caminho para a PASTA RAIZ do dataset (ex: /.../Bone-Break-Classification-2).
+    Com `image_size` e `predecode`, datasets do servidor vêm com as imagens
+    já decodificadas nesse tamanho.
     """
     
     # Modo 1: Local (caminho direto)
@@ -19,28 +34,23 @@ def get_data_path(data_config, base_download_dir):
     # Modo 2: Servidor MLflow (Dataset .zip)
     elif 'dataset_run_id' in data_config:
         run_id = data_config['dataset_run_id']
-        artifact_zip_path = data_config['dataset_artifact_path'] # Caminho para o .zip
         
         print(f">>> Baixando dataset de classificação do servidor (Run ID: {run_id})...")
         
         try:
-            downloaded_zip_file = mlflow.artifacts.download_artifacts(
-                run_id=run_id,
-                artifact_path=artifact_zip_path,
-                dst_path=base_download_dir
-            )
+            downloaded_zip_file = dataset_cache.download_dataset(data_config, base_download_dir)
         except Exception as e:
             print(f"Erro ao baixar artefato: {e}")
             raise
             
-        print(f"Dataset .zip baixado para: {downloaded_zip_file}")
+        print(f"Dataset .zip disponível em: {downloaded_zip_file}")
 
-        # Descompactar o arquivo no mesmo diretório
-        unzip_dir = os.path.join(base_download_dir, "unzipped_data")
-        print(f"Descompactando para: {unzip_dir}...")
-        
-        with zipfile.ZipFile(downloaded_zip_file, 'r') as zip_ref:
-            zip_ref.extractall(unzip_dir)
+        # Descompactar só a pasta raiz do dataset (reaproveitando a extração do cache, se houver)
+        prefixes = zip_extract.required_prefixes(data_config, 'data_root_relative_path', is_dir=True)
+        unzip_dir = dataset_cache.extract_dataset(downloaded_zip_file, data_config, base_download_dir, prefixes)
+        if image_size:
+            unzip_dir = dataset_cache.predecode_dataset(unzip_dir, data_config, prefixes, image_size, 'classification')
+        dataset_cache.log_cache_stats(data_config)
             
         print("Descompactação concluída.")
         
@@ -61,10 +71,12 @@ def get_data_path(data_config, base_download_dir):
         raise ValueError("Configuração de 'data' inválida. Especifique 'data_root_path' ou 'dataset_run_id'.")
 
 
-def run(config, temp_dir):
+def run(config, temp_dir, callbacks=None, resume_checkpoint=None):
     """
     Executa um treinamento de CLASSIFICAÇÃO DE IMAGENS genérico (YOLO-CLS).
-    Usa o temp_dir fornecido para isolamento.
+    Usa o temp_dir fornecido para isolamento. `callbacks` ({evento: [funções]})
+    são registrados no modelo, ex: para publicar métricas a cada época.
+    Com `resume_checkpoint` (um last.pt), continua o treino interrompido.
     """
     print("--- Executando o Trainer de Classificação de Imagens (Modo Seguro para Equipe) ---")
     
@@ -72,18 +84,25 @@ def run(config, temp_dir):
     params_config = config['params']
     
     # 1. Obter o caminho para a pasta raiz do dataset
-    data_root_path = get_data_path(data_config, temp_dir)
+    data_root_path = get_data_path(data_config, temp_dir, params_config.get('image_size', DEFAULT_IMAGE_SIZE))
 
-    # 3. Carregar o modelo de CLASSIFICAÇÃO
+    # 3. Carregar o modelo de CLASSIFICAÇÃO (ou o checkpoint a retomar)
+    project = os.path.join(temp_dir, "yolo_results")
     model_path = params_config['model_name'] 
+    if resume_checkpoint:
+        done_epochs = yolo_common.prepare_resume(resume_checkpoint, data_root_path, project, config['run_name'])
+        print(f"Retomando o treino após a época {done_epochs} (checkpoint: {resume_checkpoint})...")
+        model_path = resume_checkpoint
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"Modelo de classificação não encontrado no cache: {model_path}")
 
-    model = YOLO(model_path)
+    with instrumentation.stage("model_load"):
+        model = YOLO(model_path)
+    metric_stream.add_callbacks(model, callbacks)
     
     # 4. Carregar hiperparâmetros (YOLO-CLS usa os mesmos nomes do 'train')
     yolo_params = {
-        'imgsz': params_config.get('image_size', 224),
+        'imgsz': params_config.get('image_size', DEFAULT_IMAGE_SIZE),
         'batch': params_config.get('batch_size'),
         'epochs': params_config.get('epochs'),
         'optimizer': params_config.get('optimizer'),
@@ -96,18 +115,33 @@ def run(config, temp_dir):
         'warmup_bias_lr': params_config.get('warmup_bias_lr'),
         'dropout': params_config.get('dropout'),
         'seed': params_config.get('seed'),
+        'cache': yolo_common.predecode_cache_mode(data_config),
     }
     yolo_params = {k: v for k, v in yolo_params.items() if v is not None}
+    if not resume_checkpoint:
+        yolo_params = yolo_common.apply_autotune(config, data_root_path, yolo_params, temp_dir)
 
     print(f"Iniciando treinamento de CLASSIFICAÇÃO com data em: {data_root_path}")
     
     # 5. Chamar o 'train'. O YOLO-CLS entende a estrutura de pastas.
-    results = model.train(
-        data=data_root_path,
-        project=os.path.join(temp_dir, "yolo_results"), 
-        name=config['run_name'],                         
-        **yolo_params 
-    )
+    with instrumentation.stage("train"):
+        if resume_checkpoint:
+            # Os hiperparâmetros, a época e o otimizador vêm do checkpoint.
+            results = model.train(resume=True)
+        else:
+            results = model.train(
+                data=data_root_path,
+                project=project, 
+                name=config['run_name'],                         
+                **yolo_params 
+            )
     
     # 6. Retornar os resultados. 
-    return results
\ No newline at end of file
+    return results
+
+
+def log_outputs(config, results, uploader):
+    """Registra as métricas finais, os artefatos de saída e, com `export`, os modelos exportados."""
+    yolo_common.log_mapped_metrics(config, results.results_dict, METRIC_NAME_MAP)
+    yolo_common.log_output_artifacts(config, results.save_dir, uploader)
+    yolo_common.export_and_benchmark(config, results.save_dir, uploader, DEFAULT_IMAGE_SIZE)
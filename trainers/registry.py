@@ -0,0 +1,26 @@
+# trainers/registry.py
+import importlib
+
+# Cada trainer é um módulo importado só quando o seu `trainer_type` é usado,
+# para que uma run de detecção não pague o import do sklearn (e vice-versa).
+#
+# Contrato de um trainer:
+#   run(config, temp_dir, callbacks=None) -> resultado do treino
+#     (com SUPPORTS_RESUME, também `resume_checkpoint=None`: o last.pt a retomar)
+#   log_outputs(config, outcome, uploader) -> registra métricas finais e artefatos
+#   METRIC_NAME_MAP: nome na config (metrics_to_log) -> nome da métrica no resultado
+#   SUPPORTS_CALLBACKS: se aceita callbacks do Ultralytics (métricas por época, checkpoints)
+#   SUPPORTS_RESUME: se continua um treino interrompido a partir de `resume_checkpoint` (train.py --resume)
+TRAINERS = {
+    'detection': 'trainers.detection_trainer',
+    'image_classification': 'trainers.image_classification_trainer',
+    'generic_classification': 'trainers.generic_classification_trainer',
+}
+
+
+def load_trainer(trainer_type):
+    """Importa e retorna o módulo do trainer registrado para `trainer_type`."""
+    if trainer_type not in TRAINERS:
+        available = ", ".join(sorted(TRAINERS))
+        raise ValueError(f"trainer_type '{trainer_type}' desconhecido. Disponíveis: {available}")
+    return importlib.import_module(TRAINERS[trainer_type])
@@ -0,0 +1,149 @@
+# trainers/yolo_common.py
+import mlflow
+import os
+import time
+from utils import cpu_benchmark, instrumentation
+
+
+def predecode_cache_mode(data_config):
+    """
+    `cache` do Ultralytics para datasets com `predecode`: 'disk' faz o YOLO-CLS
+    ler os .npy da visão pré-decodificada (a detecção já os lê quando existem).
+    """
+    if data_config.get('predecode') and 'dataset_run_id' in data_config and data_config.get('use_cache', True):
+        return 'disk'
+    return None
+
+
+@instrumentation.stage("autotune")
+def apply_autotune(config, data, yolo_params, temp_dir):
+    """
+    Com `autotune` na config, troca o lote e os workers do dataloader pelos
+    mais rápidos medidos nesta máquina (e ajusta as threads do torch).
+    Veja utils/autotune.py. Sem `autotune`, retorna `yolo_params` como está.
+    """
+    if not config.get('autotune'):
+        return yolo_params
+    from utils import autotune
+
+    probe_args = {k: v for k, v in yolo_params.items() if k not in ('batch', 'workers', 'epochs')}
+    return dict(yolo_params, **autotune.tune(config, data, probe_args, temp_dir))
+
+
+def prepare_resume(checkpoint_path, data, project, name):
+    """
+    Prepara o last.pt de uma run interrompida para ser retomado neste
+    diretório temporário. O Ultralytics retoma com os `train_args` gravados no
+    checkpoint (épocas, otimizador, lr...), mas eles apontam para o dataset e a
+    pasta de resultados da execução anterior, que já foram apagados.
+    Retorna o número de épocas já concluídas.
+    """
+    import torch
+
+    checkpoint = torch.load(checkpoint_path, map_location="cpu", weights_only=False)
+    # Ao fim do treino o Ultralytics remove o otimizador e marca a época como -1.
+    if checkpoint.get("epoch", -1) < 0 or checkpoint.get("optimizer") is None:
+        raise ValueError(f"O checkpoint {checkpoint_path} é de um treino já concluído; não há o que retomar.")
+    train_args = dict(checkpoint.get("train_args") or {})
+    train_args.update(data=data, project=project, name=name, exist_ok=True)
+    if "save_dir" in train_args:
+        train_args["save_dir"] = os.path.join(project, name)
+    checkpoint["train_args"] = train_args
+    torch.save(checkpoint, checkpoint_path)
+    return checkpoint["epoch"] + 1
+
+
+def log_mapped_metrics(config, results_dict, metric_name_map):
+    """Registra as métricas de `metrics_to_log`, traduzidas pelo mapa do trainer."""
+    if 'metrics_to_log' not in config:
+        return
+    metrics_to_log = {}
+    for metric_name in config['metrics_to_log']:
+        source_name = metric_name_map.get(metric_name)
+        if source_name:
+            metrics_to_log[metric_name] = results_dict.get(source_name, 0)
+
+    with instrumentation.stage("metric_logging"):
+        mlflow.log_metrics(metrics_to_log)
+
+
+def log_output_artifacts(config, save_dir, uploader):
+    """Agenda o envio dos artefatos de saída listados em `output_artifacts_to_log`."""
+    if 'output_artifacts_to_log' in config:
+        print("Logando artefatos de saída do modelo...")
+        for name, path in config['output_artifacts_to_log'].items():
+            # save_dir é /tmp/mlflow_run.../yolo_results/run_name
+            full_path = os.path.join(save_dir, path)
+            if os.path.exists(full_path):
+                uploader.submit(full_path, f"Resultados do Treino/{name}")
+
+
+@instrumentation.stage("export_benchmark")
+def export_and_benchmark(config, save_dir, uploader, default_image_size):
+    """
+    Etapa opcional pós-treino (seção `export`): exporta weights/best.pt para
+    ONNX/TorchScript (e, com `int8`, um ONNX quantizado), mede cada formato
+    na CPU por tamanho de lote e número de threads e registra os arquivos,
+    as métricas e a tabela de latência. O tamanho de entrada é o
+    `export.image_size`, o `image_size` do treino ou `default_image_size`
+    (o padrão do trainer). Falhas aqui não derrubam a run.
+    """
+    export_config = config.get('export')
+    if not export_config:
+        return
+    best_path = os.path.join(save_dir, "weights", "best.pt")
+    if not os.path.exists(best_path):
+        print(f"AVISO: {best_path} não encontrado; exportação ignorada.")
+        return
+
+    from ultralytics import YOLO
+
+    image_size = export_config.get('image_size') or (config.get('params') or {}).get('image_size') or default_image_size
+    batch_sizes = export_config.get('batch_sizes', [1])
+    threads = export_config.get('threads') or sorted({1, os.cpu_count() or 1})
+    metrics, exported = {}, {}
+    for model_format in export_config.get('formats', ['onnx', 'torchscript']):
+        print(f"Exportando {best_path} para {model_format}...")
+        start = time.perf_counter()
+        try:
+            exported[model_format] = YOLO(best_path).export(
+                format=model_format, imgsz=image_size, device="cpu",
+                # ONNX com lote dinâmico para medir vários tamanhos de lote
+                **({"dynamic": True} if model_format == 'onnx' else {})
+            )
+        except Exception as e:
+            print(f"ERRO ao exportar para {model_format}: {e}")
+            continue
+        metrics[f"export_{model_format}_seconds"] = time.perf_counter() - start
+
+    if export_config.get('int8') and 'onnx' in exported:
+        try:
+            exported['onnx_int8'] = cpu_benchmark.quantize_onnx_int8(
+                exported['onnx'], os.path.splitext(exported['onnx'])[0] + "_int8.onnx"
+            )
+        except Exception as e:
+            print(f"ERRO na quantização int8: {e}")
+
+    rows = []
+    for model_format, path in exported.items():
+        metrics[f"export_{model_format}_mb"] = cpu_benchmark.file_size_mb(path)
+        uploader.submit(path, "Modelos Exportados")
+        print(f"Medindo {model_format} na CPU (lotes {batch_sizes}, threads {threads})...")
+        try:
+            runner = cpu_benchmark.RUNNERS[model_format](path)
+            format_rows = cpu_benchmark.benchmark(
+                runner, image_size, batch_sizes, threads,
+                warmup=export_config.get('warmup', 3), iterations=export_config.get('iterations', 20)
+            )
+        except Exception as e:
+            print(f"ERRO ao medir {model_format}: {e}")
+            continue
+        metrics.update(cpu_benchmark.benchmark_metrics(model_format, format_rows))
+        rows.extend(dict(row, format=model_format) for row in format_rows)
+
+    mlflow.log_metrics(metrics)
+    if rows:
+        table = cpu_benchmark.format_table(rows)
+        print(table)
+        mlflow.log_text(table, "export_benchmark.txt")
+        mlflow.log_dict({"image_size": image_size, "rows": rows}, "export_benchmark.json")
@@ -0,0 +1,126 @@
+# utils/artifact_uploader.py
+import os
+import time
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from mlflow.tracking import MlflowClient
+
+CHECKPOINT_ARTIFACT_PATH = "checkpoints"
+
+
+class ArtifactUploader:
+    """
+    Envia artefatos para uma run num pool de threads, com novas tentativas
+    em falhas transitórias e registro do tempo de cada arquivo.
+
+    Os envios começam assim que `submit` é chamado, inclusive durante o
+    treino; `close` espera os que ainda estiverem em andamento.
+    """
+
+    def __init__(self, run_id, workers=4, retries=3, backoff=2.0, client=None):
+        self.run_id = run_id
+        self.retries = retries
+        self.backoff = backoff
+        self.client = client or MlflowClient()
+        self.timings = []
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mlflow-artifact-upload")
+        self._inflight = set()
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def submit(self, local_path, artifact_path=None, skip_if_busy=False):
+        """
+        Agenda o envio de `local_path`. Com `skip_if_busy`, não agenda se um envio
+        para o mesmo destino ainda estiver em andamento (útil para checkpoints
+        periódicos: o próximo checkpoint substitui este).
+        """
+        destination = (artifact_path, os.path.basename(local_path))
+        with self._lock:
+            if skip_if_busy and destination in self._inflight:
+                return None
+            self._inflight.add(destination)
+        return self._executor.submit(self._upload, local_path, artifact_path, destination)
+
+    def submit_snapshot(self, local_path, artifact_path, staging_dir):
+        """
+        Copia o arquivo antes de agendar o envio, para que o treino possa
+        sobrescrevê-lo (ex: weights/last.pt) sem corromper o upload.
+        """
+        destination = (artifact_path, os.path.basename(local_path))
+        with self._lock:
+            if destination in self._inflight:
+                return None
+        os.makedirs(staging_dir, exist_ok=True)
+        snapshot_path = os.path.join(staging_dir, os.path.basename(local_path))
+        shutil.copy2(local_path, snapshot_path)
+        return self.submit(snapshot_path, artifact_path, skip_if_busy=True)
+
+    def _upload(self, local_path, artifact_path, destination):
+        size = os.path.getsize(local_path)
+        start = time.perf_counter()
+        attempts = 0
+        error = None
+        try:
+            while attempts <= self.retries:
+                attempts += 1
+                try:
+                    self.client.log_artifact(self.run_id, local_path, artifact_path)
+                    error = None
+                    break
+                except Exception as e:
+                    error = e
+                    if attempts <= self.retries:
+                        wait = self.backoff * (2 ** (attempts - 1))
+                        print(f"Aviso: falha ao enviar {local_path} ({e}). Nova tentativa em {wait:.0f}s...")
+                        time.sleep(wait)
+        finally:
+            with self._lock:
+                self._inflight.discard(destination)
+                self.timings.append({
+                    "file": local_path,
+                    "artifact_path": artifact_path,
+                    "bytes": size,
+                    "seconds": time.perf_counter() - start,
+                    "attempts": attempts,
+                    "ok": error is None,
+                })
+        if error is not None:
+            print(f"ERRO: não foi possível enviar {local_path} após {attempts} tentativas: {error}")
+
+    def close(self):
+        """Espera os envios pendentes e retorna o resumo dos tempos."""
+        wait_start = time.perf_counter()
+        self._executor.shutdown(wait=True)
+        wait_seconds = time.perf_counter() - wait_start
+
+        for t in self.timings:
+            status = "ok" if t["ok"] else "FALHOU"
+            print(f"  [{status}] {t['file']} -> {t['artifact_path']}: {t['bytes'] / (1024 ** 2):.1f} MB em {t['seconds']:.2f}s")
+        summary = {
+            "artifact_upload_files": len(self.timings),
+            "artifact_upload_failed": sum(1 for t in self.timings if not t["ok"]),
+            "artifact_upload_bytes": sum(t["bytes"] for t in self.timings),
+            "artifact_upload_total_seconds": sum(t["seconds"] for t in self.timings),
+            "artifact_upload_wall_seconds": time.perf_counter() - self._start,
+            "artifact_upload_wait_seconds": wait_seconds,
+        }
+        print(
+            f"Upload de artefatos: {summary['artifact_upload_files']} arquivos, "
+            f"espera final de {wait_seconds:.2f}s."
+        )
+        return summary
+
+
+def checkpoint_callbacks(uploader, staging_dir, every_n_epochs=1):
+    """
+    Callback do Ultralytics que envia weights/last.pt para `checkpoints/`
+    a cada `every_n_epochs` épocas, em segundo plano, enquanto o treino continua.
+    """
+    def on_model_save(trainer):
+        if (trainer.epoch + 1) % every_n_epochs != 0:
+            return
+        if trainer.last.exists():
+            uploader.submit_snapshot(str(trainer.last), CHECKPOINT_ARTIFACT_PATH, staging_dir)
+
+    return {"on_model_save": [on_model_save]}
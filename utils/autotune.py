@@ -0,0 +1,319 @@
+# utils/autotune.py
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import time
+import mlflow
+from utils import process_tree
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mlflow_autotune.json")
+DEFAULTS = {
+    "batch_sizes": [8, 16, 32, 64],
+    "workers": None,          # padrão: 0, 2, 4 e 8 (limitados às CPUs); só medidos com GPU
+    "threads": None,          # padrão: todas as CPUs e metade delas
+    "warmup_batches": 2,
+    "probe_batches": 6,
+    "probe_timeout": 300,
+    "memory_gb": None,        # padrão: resources.memory_gb da config ou memory_fraction da memória livre
+    "memory_fraction": 0.8,
+    "refresh": False,
+}
+MONITOR_INTERVAL = 0.1
+
+
+class _ProbeFinished(Exception):
+    """Interrompe o treino de medição depois dos batches medidos."""
+
+
+def tune_settings(config):
+    """As opções de `autotune` (true ou um dicionário) com os padrões, ou None se desligado."""
+    tune_config = config.get('autotune')
+    if not tune_config:
+        return None
+    if tune_config is True:
+        tune_config = {}
+    return dict(DEFAULTS, **tune_config)
+
+
+def available_cpus():
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+
+def available_memory_mb():
+    """MemAvailable do /proc/meminfo (memória que pode ser usada sem swap)."""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / (1024 ** 2)
+
+
+def configured_memory_gb(config, settings):
+    """O limite de memória fixado na config (`autotune.memory_gb` ou `resources.memory_gb`), ou None."""
+    if settings.get('memory_gb'):
+        return float(settings['memory_gb'])
+    reserved = (config.get('resources') or {}).get('memory_gb')
+    return float(reserved) if reserved else None
+
+
+def memory_budget_mb(config, settings):
+    configured = configured_memory_gb(config, settings)
+    if configured is not None:
+        return configured * 1024
+    return available_memory_mb() * settings['memory_fraction']
+
+
+def _probe_main(spec, results):
+    """Processo de medição: treina alguns batches com a combinação de `spec` e mede a vazão."""
+    import torch
+    from ultralytics import YOLO
+    from ultralytics.utils import SETTINGS
+
+    torch.set_num_threads(spec['threads'])
+    SETTINGS.update({'mlflow': False})
+    model = YOLO(spec['model'])
+    timestamps = []
+    needed = spec['warmup_batches'] + spec['probe_batches'] + 1
+
+    def on_train_batch_end(trainer):
+        timestamps.append(time.perf_counter())
+        if len(timestamps) >= needed:
+            raise _ProbeFinished()
+
+    model.add_callback("on_train_batch_end", on_train_batch_end)
+    try:
+        model.train(
+            data=spec['data'], epochs=1, val=False, plots=False, verbose=False, exist_ok=True,
+            project=spec['project'], name=spec['name'], batch=spec['batch_size'],
+            workers=spec['workers'], **spec['train_args']
+        )
+    except _ProbeFinished:
+        pass
+    # Só os batches depois do aquecimento (carga do modelo, primeiros lotes, caches do torch).
+    measured = timestamps[spec['warmup_batches']:]
+    if len(measured) < 2:
+        results.put({"error": "dataset pequeno demais para a medição"})
+        return
+    results.put({"images_per_second": spec['batch_size'] * (len(measured) - 1) / (measured[-1] - measured[0])})
+
+
+def probe(spec, budget_mb, timeout):
+    """
+    Mede uma combinação num processo próprio (as threads do torch e a memória
+    não vazam entre as medições). O processo é interrompido se passar de
+    `budget_mb` ou de `timeout` segundos. Retorna a linha da medição.
+    """
+    row = {"batch_size": spec['batch_size'], "workers": spec['workers'], "threads": spec['threads']}
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_probe_main, args=(spec, results))
+    start = time.perf_counter()
+    process.start()
+    peak_mb, error, outcome = 0.0, None, None
+    while outcome is None and error is None:
+        try:
+            outcome = results.get(timeout=MONITOR_INTERVAL)
+        except queue.Empty:
+            pass
+        peak_mb = max(peak_mb, process_tree.tree_rss_mb(process.pid))
+        if outcome is not None:
+            break
+        if peak_mb > budget_mb:
+            error = f"memória acima do limite ({peak_mb:.0f} MB > {budget_mb:.0f} MB)"
+        elif time.perf_counter() - start > timeout:
+            error = f"tempo limite de {timeout}s"
+        elif not process.is_alive():
+            try:
+                # O resultado pode ter chegado junto com o fim do processo.
+                outcome = results.get(timeout=1)
+            except queue.Empty:
+                error = f"o processo de medição terminou com código {process.exitcode}"
+    if error is not None:
+        process_tree.kill_tree(process.pid)
+    process.join()
+    results.close()
+
+    row.update(peak_memory_mb=peak_mb, seconds=time.perf_counter() - start)
+    if error is None:
+        error = outcome.get("error")
+    if error is not None:
+        row["error"] = error
+    else:
+        row["images_per_second"] = outcome["images_per_second"]
+    return row
+
+
+def _best(rows):
+    valid = [row for row in rows if "error" not in row]
+    return max(valid, key=lambda row: row["images_per_second"]) if valid else None
+
+
+def search(base_spec, settings, budget_mb, use_gpu):
+    """
+    Busca coordenada: primeiro o tamanho de lote (em ordem crescente, parando
+    quando a memória estoura ou a vazão cai), depois os workers do dataloader
+    e por fim as threads do torch, cada um com os melhores valores anteriores.
+    Retorna (melhor linha ou None, todas as linhas).
+    """
+    cpus = available_cpus()
+    threads = settings['threads'] or sorted({cpus, max(1, cpus // 2)}, reverse=True)
+    # Na CPU o Ultralytics força workers=0 (o tempo é dominado pela rede, não pelo dataloader).
+    workers = settings['workers'] or sorted({min(n, cpus) for n in (0, 2, 4, 8)})
+    if not use_gpu:
+        workers = [0]
+    current = {"batch_size": None, "workers": workers[-1], "threads": threads[0]}
+    rows = []
+
+    def measure(**overrides):
+        spec = dict(base_spec, **dict(current, **overrides))
+        spec['name'] = f"probe_{len(rows)}"
+        print(f"Autotune: lote {spec['batch_size']}, workers {spec['workers']}, threads {spec['threads']}...")
+        row = probe(spec, budget_mb, settings['probe_timeout'])
+        if "error" in row:
+            print(f"  -> {row['error']}")
+        else:
+            print(f"  -> {row['images_per_second']:.1f} imagens/s, pico de {row['peak_memory_mb']:.0f} MB")
+        rows.append(row)
+        return row
+
+    best = None
+    for batch_size in sorted(settings['batch_sizes']):
+        row = measure(batch_size=batch_size)
+        if "error" in row:
+            break
+        if best is not None and row["images_per_second"] < best["images_per_second"]:
+            break
+        best = row
+    if best is None:
+        return None, rows
+    current["batch_size"] = best["batch_size"]
+
+    for key, candidates in (("workers", workers), ("threads", threads)):
+        for value in candidates:
+            if value != current[key]:
+                measure(**{key: value})
+        best = _best([row for row in rows if row["batch_size"] == current["batch_size"]
+                      and all(row[k] == current[k] for k in ("workers", "threads") if k != key)])
+        current[key] = best[key]
+    return best, rows
+
+
+def _read_cache(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(path, cache):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def cached_result(cache, key, budget_mb):
+    """
+    A medição em cache, se a combinação escolhida ainda cabe em `budget_mb`.
+    Sem limite configurado, o limite vem da memória livre agora, que pode
+    ser menor que a da medição; nesse caso a medição é refeita.
+    """
+    cached = cache.get(key)
+    if cached is None or cached["best"]["peak_memory_mb"] > budget_mb:
+        return None
+    return cached
+
+
+def format_table(rows):
+    lines = [f"{'lote':>5} {'workers':>7} {'threads':>7} {'imagens/s':>10} {'pico (MB)':>10} {'tempo (s)':>9}"]
+    for row in rows:
+        prefix = f"{row['batch_size']:>5} {row['workers']:>7} {row['threads']:>7}"
+        if "error" in row:
+            lines.append(f"{prefix}  ERRO: {row['error']}")
+        else:
+            lines.append(f"{prefix} {row['images_per_second']:>10.1f} {row['peak_memory_mb']:>10.0f} {row['seconds']:>9.1f}")
+    return "\n".join(lines) + "\n"
+
+
+def tune(config, data, train_args, temp_dir):
+    """
+    Etapa opcional pré-treino (seção `autotune`): mede a vazão e o pico de
+    memória de alguns tamanhos de lote, workers do dataloader e threads do
+    torch nesta máquina e escolhe a combinação mais rápida que cabe na memória.
+    O resultado fica em cache por (máquina, modelo, dataset, parâmetros do treino).
+    As threads escolhidas já são aplicadas neste processo.
+
+    Retorna os parâmetros do YOLO a sobrescrever ({'batch', 'workers'}), ou {} sem autotune.
+    """
+    settings = tune_settings(config)
+    if settings is None:
+        return {}
+
+    import torch
+
+    use_gpu = torch.cuda.is_available()
+    budget_mb = memory_budget_mb(config, settings)
+    model_name = config['params']['model_name']
+    key_fields = {
+        "host": socket.gethostname(),
+        "cpus": available_cpus(),
+        "gpu": torch.cuda.get_device_name(0) if use_gpu else None,
+        "model": model_name,
+        "data": data,
+        "train_args": train_args,
+        # Só o limite configurado: a memória livre muda a cada run e invalidaria o cache.
+        "memory_gb": configured_memory_gb(config, settings),
+        "settings": {k: settings[k] for k in ("batch_sizes", "workers", "threads", "probe_batches")},
+    }
+    key = hashlib.sha256(json.dumps(key_fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+    cache_path = os.environ.get("MLFLOW_AUTOTUNE_CACHE", DEFAULT_CACHE_PATH)
+    cached = None if settings['refresh'] else cached_result(_read_cache(cache_path), key, budget_mb)
+
+    if cached is not None:
+        print(f"Autotune: usando a medição anterior desta máquina ({cache_path}).")
+        best, rows, source = cached["best"], cached["rows"], "cache"
+    else:
+        print(f"Autotune: medindo até {budget_mb:.0f} MB de memória ({'GPU' if use_gpu else 'CPU'})...")
+        base_spec = {
+            "model": model_name, "data": data, "train_args": train_args,
+            "project": os.path.join(temp_dir, "autotune"),
+            "warmup_batches": settings['warmup_batches'], "probe_batches": settings['probe_batches'],
+        }
+        best, rows = search(base_spec, settings, budget_mb, use_gpu)
+        source = "probe"
+        if best is not None:
+            cache = _read_cache(cache_path)
+            cache[key] = {"best": best, "rows": rows, "time": time.time()}
+            _write_cache(cache_path, cache)
+
+    table = format_table(rows)
+    print(table)
+    if mlflow.active_run() is not None:
+        mlflow.log_param("autotune_source", source)
+        mlflow.log_text(table, "autotune.txt")
+        mlflow.log_dict({"memory_budget_mb": budget_mb, "gpu": use_gpu, "best": best, "rows": rows}, "autotune.json")
+    if best is None:
+        print("AVISO: nenhuma combinação do autotune funcionou; usando os valores da config.")
+        return {}
+
+    torch.set_num_threads(best["threads"])
+    if mlflow.active_run() is not None:
+        mlflow.log_params({
+            "autotune_batch_size": best["batch_size"],
+            "autotune_workers": best["workers"],
+            "autotune_threads": best["threads"],
+        })
+        mlflow.log_metrics({
+            "autotune_images_per_second": best["images_per_second"],
+            "autotune_peak_memory_mb": best["peak_memory_mb"],
+        })
+    print(f"Autotune: lote {best['batch_size']}, workers {best['workers']}, threads {best['threads']}.")
+    return {"batch": best["batch_size"], "workers": best["workers"]}
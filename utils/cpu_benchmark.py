@@ -0,0 +1,116 @@
+# utils/cpu_benchmark.py
+import os
+import time
+import numpy as np
+
+
+def onnx_runner(model_path):
+    """runner(threads) -> função que roda um lote (array NCHW float32) numa sessão do onnxruntime."""
+    import onnxruntime as ort
+
+    def make(threads):
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        input_name = session.get_inputs()[0].name
+        return lambda batch: session.run(None, {input_name: batch})
+
+    return make
+
+
+def torchscript_runner(model_path):
+    """runner(threads) -> função que roda um lote no modelo TorchScript (torch.set_num_threads)."""
+    import torch
+
+    module = torch.jit.load(model_path, map_location="cpu").eval()
+
+    def make(threads):
+        torch.set_num_threads(threads)
+
+        def predict(batch):
+            with torch.inference_mode():
+                return module(torch.from_numpy(batch))
+
+        return predict
+
+    return make
+
+
+def quantize_onnx_int8(model_path, output_path):
+    """Quantização dinâmica int8 dos pesos (onnxruntime), sem dados de calibração."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    return output_path
+
+
+RUNNERS = {'onnx': onnx_runner, 'onnx_int8': onnx_runner, 'torchscript': torchscript_runner}
+
+
+def benchmark(runner, image_size, batch_sizes=(1,), threads=(1,), warmup=3, iterations=20, seed=0):
+    """
+    Mede a latência de cada combinação (threads, tamanho de lote) com
+    entradas aleatórias de 3 x image_size x image_size. Combinações que o
+    modelo não aceita (ex: lote fixo na exportação) ficam com o erro na linha.
+    Retorna uma linha por combinação.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for num_threads in threads:
+        predict = runner(num_threads)
+        for batch_size in batch_sizes:
+            row = {"threads": num_threads, "batch_size": batch_size}
+            batch = rng.random((batch_size, 3, image_size, image_size), dtype=np.float32)
+            try:
+                for _ in range(warmup):
+                    predict(batch)
+                seconds = []
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    predict(batch)
+                    seconds.append(time.perf_counter() - start)
+            except Exception as e:
+                row["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+                rows.append(row)
+                continue
+            latencies_ms = np.asarray(seconds) * 1000
+            row.update({
+                "latency_p50_ms": float(np.percentile(latencies_ms, 50)),
+                "latency_p95_ms": float(np.percentile(latencies_ms, 95)),
+                "images_per_second": batch_size * iterations / float(np.sum(seconds)),
+            })
+            rows.append(row)
+    return rows
+
+
+def benchmark_metrics(model_format, rows):
+    """Métricas `bench_<formato>_b<lote>_t<threads>_<medida>` das linhas medidas."""
+    metrics = {}
+    for row in rows:
+        if "error" in row:
+            continue
+        prefix = f"bench_{model_format}_b{row['batch_size']}_t{row['threads']}"
+        for key in ("latency_p50_ms", "latency_p95_ms", "images_per_second"):
+            metrics[f"{prefix}_{key}"] = row[key]
+    return metrics
+
+
+def format_table(rows):
+    """Tabela em texto (formato, threads, lote, p50, p95, imagens/s) para o artefato."""
+    lines = [f"{'formato':<12} {'threads':>7} {'lote':>5} {'p50 (ms)':>10} {'p95 (ms)':>10} {'imagens/s':>10}"]
+    for row in rows:
+        if "error" in row:
+            lines.append(f"{row['format']:<12} {row['threads']:>7} {row['batch_size']:>5}  ERRO: {row['error']}")
+        else:
+            lines.append(
+                f"{row['format']:<12} {row['threads']:>7} {row['batch_size']:>5} "
+                f"{row['latency_p50_ms']:>10.2f} {row['latency_p95_ms']:>10.2f} {row['images_per_second']:>10.1f}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def file_size_mb(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files) / (1024 ** 2)
+    return os.path.getsize(path) / (1024 ** 2)
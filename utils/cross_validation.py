@@ -0,0 +1,74 @@
+# utils/cross_validation.py
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from mlflow.entities import Metric
+from mlflow.tracking import MlflowClient
+from sklearn.base import clone
+from sklearn.model_selection import RepeatedStratifiedKFold
+from utils.metric_stream import MAX_BATCH_SIZE
+
+
+def _fit_and_score(estimator, params, X, y, train_idx, test_idx, score_fn):
+    model = clone(estimator).set_params(**params)
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    scores = score_fn(model, X[test_idx], y[test_idx])
+    scores["fit_seconds"] = time.perf_counter() - start
+    return scores
+
+
+def cross_validate(estimator, X, y, candidates, score_fn, folds=5, repeats=1, seed=None, n_jobs=-1):
+    """
+    Avalia cada conjunto de hiperparâmetros de `candidates` com k-fold
+    estratificado repetido. Todos os pares (candidato, fold) rodam num pool
+    de processos (joblib/loky); X é passado como np.memmap, então os
+    processos abrem o mesmo arquivo em vez de receber uma cópia serializada.
+
+    Retorna uma lista por candidato com os scores de cada fold.
+    """
+    splitter = RepeatedStratifiedKFold(n_splits=folds, n_repeats=repeats, random_state=seed)
+    splits = list(splitter.split(np.zeros(len(y)), y))
+    tasks = [(c, f) for c in range(len(candidates)) for f in range(len(splits))]
+    print(f"Validação cruzada: {len(candidates)} candidatos x {len(splits)} folds = {len(tasks)} treinos em paralelo.")
+
+    results = Parallel(n_jobs=n_jobs, backend="loky")(
+        delayed(_fit_and_score)(estimator, candidates[c], X, y, splits[f][0], splits[f][1], score_fn)
+        for c, f in tasks
+    )
+    per_candidate = [[None] * len(splits) for _ in candidates]
+    for (c, f), scores in zip(tasks, results):
+        per_candidate[c][f] = scores
+    return per_candidate
+
+
+def summarize(fold_scores):
+    """{métrica: (média, desvio padrão)} dos scores de um candidato."""
+    return {
+        name: (float(np.mean([s[name] for s in fold_scores])), float(np.std([s[name] for s in fold_scores])))
+        for name in fold_scores[0]
+    }
+
+
+def cv_metrics(per_candidate, prefix="cv"):
+    """
+    Métricas de cada fold (step = fold) e a média/desvio de cada candidato.
+    Com um só candidato os nomes são `cv_<métrica>`; com vários, `cv_c<i>_<métrica>`.
+    """
+    timestamp = int(time.time() * 1000)
+    metrics = []
+    for index, fold_scores in enumerate(per_candidate):
+        name_prefix = prefix if len(per_candidate) == 1 else f"{prefix}_c{index}"
+        for fold, scores in enumerate(fold_scores):
+            metrics.extend(Metric(f"{name_prefix}_{name}", float(value), timestamp, fold) for name, value in scores.items())
+        for name, (mean, std) in summarize(fold_scores).items():
+            metrics.append(Metric(f"{name_prefix}_{name}_mean", mean, timestamp, 0))
+            metrics.append(Metric(f"{name_prefix}_{name}_std", std, timestamp, 0))
+    return metrics
+
+
+def log_cv_metrics(run_id, metrics, client=None):
+    """Envia as métricas da validação cruzada com log_batch (até MAX_BATCH_SIZE por chamada)."""
+    client = client or MlflowClient()
+    for start in range(0, len(metrics), MAX_BATCH_SIZE):
+        client.log_batch(run_id, metrics=metrics[start:start + MAX_BATCH_SIZE])
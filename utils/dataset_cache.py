@@ -0,0 +1,766 @@
+# utils/dataset_cache.py
+import mlflow
+import os
+import json
+import time
+import shutil
+import hashlib
+from mlflow.tracking import MlflowClient
+from utils import zip_extract, dataset_manifest, tracking, instrumentation
+from utils.hashing import file_sha256, content_sha256, file_crc32
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, o cache funciona sem travas entre processos
+    fcntl = None
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mlflow_datasets")
+DEFAULT_MAX_GB = 50
+
+# Travas compartilhadas ("pins") mantidas abertas até o fim do processo. Enquanto
+# uma run estiver usando uma entrada do cache, a evicção não consegue removê-la.
+_PINNED_LOCKS = []
+_CACHES = {}
+
+
+class FileLock:
+    """
+    Trava de arquivo (flock) usada para que várias runs na mesma máquina
+    compartilhem uma única cópia de cada dataset.
+    """
+
+    def __init__(self, path, shared=False, blocking=True):
+        self.path = path
+        self.shared = shared
+        self.blocking = blocking
+        self.fd = None
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is None:
+            return True
+        flags = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+        if not self.blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(self.fd, flags)
+        except BlockingIOError:
+            os.close(self.fd)
+            self.fd = None
+            return False
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def _read_meta(entry_dir):
+    try:
+        with open(os.path.join(entry_dir, "meta.json"), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(entry_dir, meta):
+    tmp_path = os.path.join(entry_dir, "meta.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(entry_dir, "meta.json"))
+
+
+class DatasetCache:
+    """
+    Cache em disco, compartilhado entre runs, dos datasets baixados do MLflow.
+
+    Layout:
+        <root>/downloads/<chave>/   artefato baixado, chave = (run_id, artifact_path)
+        <root>/extracted/<sha256>/  conteúdo descompactado, endereçado pelo hash do .zip
+        <root>/manifests/<chave>/   versões de dataset reconstruídas a partir de manifestos
+        <root>/blobs/               arquivos dessas versões, endereçados pelo sha256
+        <root>/predecoded/<chave>/  imagens decodificadas e reduzidas, por (dataset, image_size)
+        <root>/roboflow/<chave>/    exportações do Roboflow, por (workspace, projeto, versão, formato)
+        <root>/locks/               travas por entrada
+
+    O tamanho total é limitado por `max_bytes` com evicção LRU.
+    """
+
+    def __init__(self, root=None, max_bytes=None, verify="size"):
+        self.root = root or os.environ.get("MLFLOW_DATASET_CACHE_DIR", DEFAULT_CACHE_DIR)
+        if max_bytes is None:
+            max_gb = float(os.environ.get("MLFLOW_DATASET_CACHE_MAX_GB", DEFAULT_MAX_GB))
+            max_bytes = int(max_gb * 1024 ** 3)
+        self.max_bytes = max_bytes
+        self.verify = verify
+        self.stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "bytes_downloaded": 0}
+        self._known_hashes = {}
+        self.last_extract_stats = None
+
+    # --- caminhos ---
+
+    def _entry_dir(self, kind, key):
+        return os.path.join(self.root, kind, key)
+
+    def _lock_path(self, kind, key, role):
+        return os.path.join(self.root, "locks", f"{kind}-{key}.{role}")
+
+    @staticmethod
+    def artifact_key(run_id, artifact_path):
+        return hashlib.sha256(f"{run_id}\0{artifact_path}".encode("utf-8")).hexdigest()[:32]
+
+    # --- integridade ---
+
+    def _is_valid(self, entry_dir, meta):
+        if meta is None or not meta.get("complete"):
+            return False
+        payload = os.path.join(entry_dir, meta["relpath"])
+        if not os.path.exists(payload):
+            return False
+        if path_size(payload) != meta["size"]:
+            return False
+        if self.verify == "hash" and content_sha256(payload) != meta["sha256"]:
+            return False
+        return True
+
+    def _extraction_is_valid(self, unzip_dir, meta, archive_path, prefixes=None):
+        """
+        Confere a extração contra a lista de membros do .zip (só o diretório central
+        é lido). Arquivos extras criados pelos trainers, como os `labels.cache` do
+        YOLO, não invalidam a entrada.
+        """
+        if meta is None or not meta.get("complete") or not os.path.isdir(unzip_dir):
+            return False
+        for info in zip_extract.select_members(archive_path, prefixes):
+            member_path = os.path.join(unzip_dir, info.filename)
+            try:
+                if os.path.getsize(member_path) != info.file_size:
+                    return False
+            except OSError:
+                return False
+            if self.verify == "hash" and file_crc32(member_path) != info.CRC:
+                return False
+        return True
+
+    def _touch(self, entry_dir, meta):
+        meta["last_access"] = time.time()
+        _write_meta(entry_dir, meta)
+
+    def _pin(self, kind, key):
+        """
+        Marca a entrada como em uso até o fim do processo. O pin é tomado antes
+        da trava de escrita para que a evicção nunca remova uma entrada entre
+        o download e o uso.
+        """
+        lock = FileLock(self._lock_path(kind, key, "pin"), shared=True)
+        lock.acquire()
+        _PINNED_LOCKS.append(lock)
+
+    # --- operações públicas ---
+
+    def fetch(self, run_id, artifact_path):
+        """
+        Retorna o caminho local do artefato `artifact_path` da run `run_id`,
+        baixando-o apenas se ainda não estiver no cache.
+        """
+        key = self.artifact_key(run_id, artifact_path)
+        entry_dir = self._entry_dir("downloads", key)
+        self._pin("downloads", key)
+        with FileLock(self._lock_path("downloads", key, "lock")):
+            meta = _read_meta(entry_dir)
+            if self._is_valid(entry_dir, meta):
+                print(f">>> Dataset encontrado no cache local: {entry_dir}")
+                self.stats["hits"] += 1
+                self.stats["bytes_saved"] += meta["size"]
+                self._touch(entry_dir, meta)
+                cached_path = os.path.join(entry_dir, meta["relpath"])
+                self._known_hashes[cached_path] = meta["sha256"]
+                return cached_path
+
+            self.stats["misses"] += 1
+            if os.path.exists(entry_dir):
+                print(f"Entrada de cache incompleta ou corrompida, baixando novamente: {entry_dir}")
+                shutil.rmtree(entry_dir)
+            payload_dir = os.path.join(entry_dir, "payload")
+            os.makedirs(payload_dir)
+
+            downloaded_path = mlflow.artifacts.download_artifacts(
+                run_id=run_id,
+                artifact_path=artifact_path,
+                dst_path=payload_dir,
+                tracking_uri=tracking.server_uri()
+            )
+            size = path_size(downloaded_path)
+            self.stats["bytes_downloaded"] += size
+            meta = {
+                "run_id": run_id,
+                "artifact_path": artifact_path,
+                "relpath": os.path.relpath(downloaded_path, entry_dir),
+                "sha256": content_sha256(downloaded_path),
+                "size": size,
+                "complete": True,
+                "created": time.time(),
+                "last_access": time.time(),
+            }
+            _write_meta(entry_dir, meta)
+            self._known_hashes[downloaded_path] = meta["sha256"]
+
+        self.evict()
+        return downloaded_path
+
+    def extract(self, archive_path, prefixes=None, workers=None, use_processes=False):
+        """
+        Descompacta `archive_path` numa pasta endereçada pelo hash do conteúdo
+        do .zip (e pela seleção de membros) e retorna essa pasta. Runs diferentes
+        que apontem para o mesmo .zip reutilizam a mesma extração.
+
+        Com `prefixes`, só as subárvores indicadas são extraídas. Uma extração
+        completa já existente no cache também atende a qualquer seleção.
+        """
+        sha256 = self._archive_sha256(archive_path)
+        candidates = [sha256]
+        if prefixes:
+            selection = hashlib.sha256("\0".join(sorted(prefixes)).encode("utf-8")).hexdigest()[:12]
+            candidates.insert(0, f"{sha256}-{selection}")
+
+        for key in reversed(candidates):
+            unzip_dir = self._lookup_extraction(key, archive_path, prefixes)
+            if unzip_dir:
+                return unzip_dir
+
+        key = candidates[0]
+        entry_dir = self._entry_dir("extracted", key)
+        unzip_dir = os.path.join(entry_dir, "data")
+        self._pin("extracted", key)
+        with FileLock(self._lock_path("extracted", key, "lock")):
+            meta = _read_meta(entry_dir)
+            if self._extraction_is_valid(unzip_dir, meta, archive_path, prefixes):
+                self._record_hit(entry_dir, meta, unzip_dir)
+                return unzip_dir
+
+            self.stats["misses"] += 1
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir)
+            tmp_dir = os.path.join(entry_dir, "data.partial")
+            os.makedirs(tmp_dir)
+            print(f"Descompactando para o cache: {unzip_dir}...")
+            self.last_extract_stats = zip_extract.extract_members(
+                archive_path, tmp_dir, prefixes=prefixes, workers=workers, use_processes=use_processes
+            )
+            os.rename(tmp_dir, unzip_dir)
+
+            meta = {
+                "archive_sha256": sha256,
+                "prefixes": prefixes,
+                "relpath": "data",
+                "size": path_size(unzip_dir),
+                "complete": True,
+                "created": time.time(),
+                "last_access": time.time(),
+            }
+            _write_meta(entry_dir, meta)
+
+        self.evict()
+        return unzip_dir
+
+    def _lookup_extraction(self, key, archive_path, prefixes):
+        entry_dir = self._entry_dir("extracted", key)
+        unzip_dir = os.path.join(entry_dir, "data")
+        if not os.path.isdir(unzip_dir):
+            return None
+        self._pin("extracted", key)
+        with FileLock(self._lock_path("extracted", key, "lock")):
+            meta = _read_meta(entry_dir)
+            if self._extraction_is_valid(unzip_dir, meta, archive_path, prefixes):
+                self._record_hit(entry_dir, meta, unzip_dir)
+                return unzip_dir
+        return None
+
+    def _record_hit(self, entry_dir, meta, unzip_dir):
+        print(f">>> Extração encontrada no cache local: {unzip_dir}")
+        self.stats["hits"] += 1
+        self.stats["bytes_saved"] += meta["size"]
+        self._touch(entry_dir, meta)
+
+    def is_manifest_dataset(self, run_id):
+        """
+        Indica se a run foi registrada no modo 'manifest'. A resposta fica
+        guardada no cache para não consultar o servidor a cada run.
+        """
+        marker = os.path.join(self.root, "formats", run_id)
+        if os.path.exists(marker):
+            with open(marker, "r") as f:
+                return f.read().strip() == "manifest"
+        tags = MlflowClient(tracking.server_uri()).get_run(run_id).data.tags
+        dataset_format = tags.get(dataset_manifest.FORMAT_TAG, "artifact")
+        os.makedirs(os.path.dirname(marker), exist_ok=True)
+        with open(marker, "w") as f:
+            f.write(dataset_format)
+        return dataset_format == "manifest"
+
+    def materialize(self, run_id, workers=8):
+        """
+        Reconstrói a versão de dataset da run `run_id` a partir do seu manifesto,
+        reaproveitando os arquivos que outras versões já trouxeram para o cache.
+        """
+        key = self.artifact_key(run_id, dataset_manifest.MANIFEST_ARTIFACT)
+        entry_dir = self._entry_dir("manifests", key)
+        data_dir = os.path.join(entry_dir, "data")
+        self._pin("manifests", key)
+        with FileLock(self._lock_path("manifests", key, "lock")):
+            meta = _read_meta(entry_dir)
+            if self._materialized_is_valid(entry_dir, data_dir, meta):
+                print(f">>> Versão do dataset encontrada no cache local: {data_dir}")
+                self.stats["hits"] += 1
+                self.stats["bytes_saved"] += meta["size"]
+                self._touch(entry_dir, meta)
+                return data_dir
+
+            self.stats["misses"] += 1
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir)
+            os.makedirs(entry_dir)
+            manifest = dataset_manifest.load_manifest(run_id)
+            with open(os.path.join(entry_dir, "manifest.json"), "w") as f:
+                json.dump(manifest, f)
+
+            tmp_dir = os.path.join(entry_dir, "data.partial")
+            # A trava compartilhada impede que a evicção apague blobs entre o
+            # download e a criação dos hardlinks.
+            with FileLock(self._lock_path("blobs", "store", "pin"), shared=True):
+                downloaded, reused = dataset_manifest.materialize(
+                    manifest, tmp_dir, os.path.join(self.root, "blobs"), workers=workers
+                )
+            os.rename(tmp_dir, data_dir)
+            self.stats["bytes_downloaded"] += downloaded
+            self.stats["bytes_saved"] += reused
+
+            meta = {
+                "run_id": run_id,
+                "relpath": "data",
+                "size": downloaded + reused,
+                "complete": True,
+                "created": time.time(),
+                "last_access": time.time(),
+            }
+            _write_meta(entry_dir, meta)
+
+        self.evict()
+        return data_dir
+
+    def _materialized_is_valid(self, entry_dir, data_dir, meta):
+        if meta is None or not meta.get("complete") or not os.path.isdir(data_dir):
+            return False
+        try:
+            with open(os.path.join(entry_dir, "manifest.json"), "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        for rel_path, entry in manifest["files"].items():
+            member_path = os.path.join(data_dir, rel_path)
+            try:
+                if os.path.getsize(member_path) != entry["size"]:
+                    return False
+            except OSError:
+                return False
+            if self.verify == "hash" and file_sha256(member_path) != entry["sha256"]:
+                return False
+        return True
+
+    def predecoded(self, key, source_dir, image_size, mode, prefixes=None, workers=None, restore=None):
+        """
+        Retorna a visão pré-decodificada `key` do dataset em `source_dir`: a
+        mesma árvore (hardlinks dos arquivos originais) com um .npy por imagem,
+        reduzido para `image_size`. Montada uma única vez por máquina; `restore`
+        (pasta_da_visão, imagens) -> bool tenta trazer os .npy prontos de fora
+        antes de decodificar tudo aqui.
+
+        Retorna (pasta_da_visão, estatísticas ou None se veio do cache, origem).
+        """
+        from utils import predecode
+
+        entry_dir = self._entry_dir("predecoded", key)
+        view_dir = os.path.join(entry_dir, "data")
+        self._pin("predecoded", key)
+        with FileLock(self._lock_path("predecoded", key, "lock")):
+            meta = _read_meta(entry_dir)
+            if meta and meta.get("complete") and os.path.isdir(view_dir) \
+                    and len(predecode.list_npy(view_dir)) == meta["images"]:
+                print(f">>> Imagens pré-decodificadas encontradas no cache local: {view_dir}")
+                self.stats["hits"] += 1
+                self.stats["bytes_saved"] += meta["size"]
+                self._touch(entry_dir, meta)
+                return view_dir, None, "cache"
+
+            self.stats["misses"] += 1
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir)
+            tmp_dir = os.path.join(entry_dir, "data.partial")
+            os.makedirs(tmp_dir)
+            start = time.perf_counter()
+            images = predecode.link_tree(source_dir, tmp_dir, prefixes)
+            if restore is not None and restore(tmp_dir, images):
+                source = "artifact"
+            else:
+                print(f"Pré-decodificando {len(images)} imagens ({mode}, image_size={image_size})...")
+                predecode.decode_images(images, image_size, mode, workers)
+                source = "built"
+            os.rename(tmp_dir, view_dir)
+
+            npy_files = predecode.list_npy(view_dir)
+            size = sum(os.path.getsize(path) for path in npy_files)
+            stats = {
+                "predecode_images": len(npy_files),
+                "predecode_mb": size / (1024 ** 2),
+                "predecode_seconds": time.perf_counter() - start,
+            }
+            # Só os .npy contam no tamanho: o resto são hardlinks da extração.
+            meta = {
+                "image_size": image_size,
+                "mode": mode,
+                "images": len(npy_files),
+                "relpath": "data",
+                "size": size,
+                "complete": True,
+                "created": time.time(),
+                "last_access": time.time(),
+            }
+            _write_meta(entry_dir, meta)
+
+        self.evict()
+        return view_dir, stats, source
+
+    def roboflow_export(self, key, folder_name, download, restore=None):
+        """
+        Retorna a pasta da exportação do Roboflow `key`, baixada uma única vez
+        por máquina. `download(pasta)` baixa a exportação do Roboflow para a
+        pasta; `restore(pasta)` -> bool tenta trazê-la de um snapshot antes.
+        A pasta se chama `folder_name` (ex: rock-paper-scissors-14).
+
+        Retorna (pasta_da_exportação, origem: "cache", "snapshot" ou "roboflow").
+        """
+        entry_dir = self._entry_dir("roboflow", key)
+        self._pin("roboflow", key)
+        with FileLock(self._lock_path("roboflow", key, "lock")):
+            meta = _read_meta(entry_dir)
+            if self._export_is_valid(entry_dir, meta):
+                export_dir = os.path.join(entry_dir, meta["relpath"])
+                print(f">>> Exportação do Roboflow encontrada no cache local: {export_dir}")
+                self.stats["hits"] += 1
+                self.stats["bytes_saved"] += meta["size"]
+                self._touch(entry_dir, meta)
+                return export_dir, "cache"
+
+            self.stats["misses"] += 1
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir)
+            # O SDK do Roboflow grava caminhos absolutos no data.yaml: a pasta é
+            # baixada já no lugar final e só o meta.json marca a entrada como pronta.
+            export_dir = os.path.join(entry_dir, folder_name)
+            os.makedirs(export_dir)
+            if restore is not None and restore(export_dir):
+                source = "snapshot"
+            else:
+                download(export_dir)
+                source = "roboflow"
+                self.stats["bytes_downloaded"] += path_size(export_dir)
+
+            files = {}
+            for root, _, names in os.walk(export_dir):
+                for name in names:
+                    full_path = os.path.join(root, name)
+                    files[os.path.relpath(full_path, export_dir)] = os.path.getsize(full_path)
+            meta = {
+                "key": key,
+                "relpath": folder_name,
+                "files": files,
+                "size": sum(files.values()),
+                "source": source,
+                "complete": True,
+                "created": time.time(),
+                "last_access": time.time(),
+            }
+            _write_meta(entry_dir, meta)
+
+        self.evict()
+        return export_dir, source
+
+    def _export_is_valid(self, entry_dir, meta):
+        # Como na extração, arquivos extras (ex: os labels.cache do YOLO) não invalidam a entrada.
+        if meta is None or not meta.get("complete"):
+            return False
+        export_dir = os.path.join(entry_dir, meta["relpath"])
+        for relpath, size in meta["files"].items():
+            try:
+                if os.path.getsize(os.path.join(export_dir, relpath)) != size:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def _archive_sha256(self, archive_path):
+        # Reaproveita o hash já calculado no download, evitando reler o .zip inteiro.
+        if archive_path in self._known_hashes:
+            return self._known_hashes[archive_path]
+        return file_sha256(archive_path)
+
+    def evict(self):
+        """Remove as entradas acessadas há mais tempo até o cache caber em `max_bytes`."""
+        entries = []
+        for kind in ("downloads", "extracted", "manifests", "predecoded", "roboflow"):
+            kind_dir = os.path.join(self.root, kind)
+            if not os.path.isdir(kind_dir):
+                continue
+            for key in os.listdir(kind_dir):
+                entry_dir = os.path.join(kind_dir, key)
+                meta = _read_meta(entry_dir) or {}
+                entries.append((meta.get("last_access", 0), meta.get("size", 0), kind, key, entry_dir))
+
+        total = sum(entry[1] for entry in entries)
+        removed_views = False
+        for last_access, size, kind, key, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            lock = FileLock(self._lock_path(kind, key, "pin"), blocking=False)
+            if not lock.acquire():
+                continue  # Em uso por alguma run (inclusive esta).
+            try:
+                print(f"Cache cheio, removendo entrada antiga: {entry_dir}")
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total -= size
+                removed_views |= kind == "manifests"
+            finally:
+                lock.release()
+
+        if removed_views:
+            self._prune_blobs()
+
+    def _prune_blobs(self):
+        """Remove os blobs que nenhuma versão reconstruída referencia mais (1 único link)."""
+        blob_dir = os.path.join(self.root, "blobs")
+        lock = FileLock(self._lock_path("blobs", "store", "pin"), blocking=False)
+        if not os.path.isdir(blob_dir) or not lock.acquire():
+            return
+        try:
+            for root, _, files in os.walk(blob_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if os.stat(path).st_nlink == 1:
+                        os.remove(path)
+        finally:
+            lock.release()
+
+    def log_stats(self):
+        """Registra hits, misses e bytes economizados na run ativa."""
+        if mlflow.active_run() is None:
+            return
+        mlflow.log_metrics({
+            "dataset_cache_hits": self.stats["hits"],
+            "dataset_cache_misses": self.stats["misses"],
+            "dataset_cache_bytes_saved": self.stats["bytes_saved"],
+            "dataset_cache_bytes_downloaded": self.stats["bytes_downloaded"],
+        })
+
+
+def reset_stats():
+    """
+    Zera as estatísticas dos caches do processo. Para processos que vivem além
+    de uma run (ex: o worker.py), chamado no início de cada job, para que cada
+    run registre só os próprios hits e misses.
+    """
+    for cache in _CACHES.values():
+        cache.stats = dict.fromkeys(cache.stats, 0)
+
+
+def release_pins():
+    """
+    Libera as entradas marcadas como em uso por este processo. Para processos
+    que vivem além de uma run (ex: o worker.py), chamado ao fim de cada job.
+    """
+    while _PINNED_LOCKS:
+        _PINNED_LOCKS.pop().release()
+
+
+def get_cache(data_config):
+    """
+    Retorna o cache configurado pelas chaves opcionais da seção 'data' da config.
+    A mesma instância é reaproveitada no processo para acumular as estatísticas
+    da run (veja reset_stats).
+    """
+    settings = (data_config.get('cache_dir'), data_config.get('cache_max_gb'), data_config.get('cache_verify', 'size'))
+    if settings not in _CACHES:
+        cache_dir, max_gb, verify = settings
+        _CACHES[settings] = DatasetCache(
+            root=cache_dir,
+            max_bytes=int(float(max_gb) * 1024 ** 3) if max_gb is not None else None,
+            verify=verify
+        )
+    return _CACHES[settings]
+
+
+@instrumentation.stage("dataset_download")
+def download_dataset(data_config, base_download_dir):
+    """
+    Baixa o artefato `dataset_artifact_path` da run `dataset_run_id`.
+    Com `use_cache` (padrão) o download é reaproveitado entre runs; sem cache,
+    o artefato vai para `base_download_dir`, como antes.
+    """
+    run_id = data_config['dataset_run_id']
+    use_cache = data_config.get('use_cache', True)
+
+    # Versões registradas no modo 'manifest' são reconstruídas arquivo a arquivo.
+    # Sem cache, a reconstrução acontece dentro do diretório temporário da run.
+    cache = get_cache(data_config) if use_cache else DatasetCache(
+        root=os.path.join(base_download_dir, "dataset_cache"), max_bytes=float("inf")
+    )
+    if data_config.get('dataset_format') == 'manifest' or cache.is_manifest_dataset(run_id):
+        return cache.materialize(run_id, workers=data_config.get('download_workers', 8))
+
+    artifact_path = data_config['dataset_artifact_path']
+    if not use_cache:
+        return mlflow.artifacts.download_artifacts(
+            run_id=run_id,
+            artifact_path=artifact_path,
+            dst_path=base_download_dir,
+            tracking_uri=tracking.server_uri()
+        )
+
+    return cache.fetch(run_id, artifact_path)
+
+
+@instrumentation.stage("dataset_unzip")
+def extract_dataset(archive_path, data_config, base_download_dir, prefixes=None):
+    """
+    Descompacta o .zip do dataset e retorna a pasta com o conteúdo. Com
+    `prefixes`, só as subárvores necessárias são extraídas, em paralelo.
+    """
+    if os.path.isdir(archive_path):
+        # Datasets registrados com --upload_mode walk já chegam descompactados.
+        return archive_path
+
+    workers = data_config.get('extract_workers')
+    use_processes = data_config.get('extract_executor', 'thread') == 'process'
+
+    if not data_config.get('use_cache', True):
+        unzip_dir = os.path.join(base_download_dir, "unzipped_data")
+        print(f"Descompactando para: {unzip_dir}...")
+        stats = zip_extract.extract_members(
+            archive_path, unzip_dir, prefixes=prefixes, workers=workers, use_processes=use_processes
+        )
+        zip_extract.log_throughput(stats)
+        return unzip_dir
+
+    cache = get_cache(data_config)
+    cache.last_extract_stats = None
+    unzip_dir = cache.extract(archive_path, prefixes=prefixes, workers=workers, use_processes=use_processes)
+    if cache.last_extract_stats:
+        zip_extract.log_throughput(cache.last_extract_stats)
+    return unzip_dir
+
+
+PREDECODED_ARTIFACT_DIR = "predecoded"
+
+
+def _predecoded_artifact(run_id, name, client):
+    """Caminho do pacote de .npy `name` na run do dataset, se já foi publicado."""
+    try:
+        infos = client.list_artifacts(run_id, PREDECODED_ARTIFACT_DIR)
+    except Exception as e:
+        print(f"AVISO: não foi possível consultar os artefatos pré-decodificados: {e}")
+        return None
+    artifact_path = f"{PREDECODED_ARTIFACT_DIR}/{name}"
+    return artifact_path if any(info.path == artifact_path for info in infos) else None
+
+
+@instrumentation.stage("dataset_predecode")
+def predecode_dataset(unzip_dir, data_config, prefixes, image_size, mode):
+    """
+    Com `predecode: true` na seção 'data', troca o dataset extraído por uma
+    visão com as imagens já decodificadas e reduzidas para `image_size`
+    (arquivos .npy que o Ultralytics lê no lugar dos JPEGs). A visão fica no
+    cache local, uma por (dataset, image_size), e é reaproveitada pelas runs
+    e trials seguintes. Com `predecode_upload`, o pacote de .npy também é
+    registrado na run do dataset, e outras máquinas o baixam em vez de decodificar.
+
+    Retorna a pasta equivalente a `unzip_dir` (a própria, sem `predecode`).
+    """
+    if not data_config.get('predecode'):
+        return unzip_dir
+    if not data_config.get('use_cache', True):
+        print("AVISO: 'predecode' requer o cache de datasets (use_cache: true); usando as imagens originais.")
+        return unzip_dir
+
+    from utils import predecode
+
+    run_id = data_config['dataset_run_id']
+    identity = json.dumps(
+        [run_id, data_config.get('dataset_artifact_path'), sorted(prefixes or []), image_size, mode]
+    )
+    key = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:32]
+    name = f"{mode}_{image_size}_{key[:12]}.zip"
+    client = MlflowClient(tracking.server_uri())
+
+    def restore(view_dir, images):
+        artifact_path = _predecoded_artifact(run_id, name, client)
+        if not artifact_path:
+            return False
+        print(f"Baixando as imagens pré-decodificadas da run do dataset ({artifact_path})...")
+        download_dir = os.path.join(os.path.dirname(view_dir), "download")
+        try:
+            archive_path = client.download_artifacts(run_id, artifact_path, download_dir)
+            return predecode.unpack_npy(archive_path, view_dir, images)
+        except Exception as e:
+            print(f"AVISO: falha ao restaurar as imagens pré-decodificadas ({e}); decodificando localmente.")
+            return False
+        finally:
+            shutil.rmtree(download_dir, ignore_errors=True)
+
+    cache = get_cache(data_config)
+    view_dir, stats, source = cache.predecoded(
+        key, unzip_dir, image_size, mode, prefixes=prefixes,
+        workers=data_config.get('predecode_workers'), restore=restore
+    )
+    if mlflow.active_run() is not None:
+        mlflow.log_param("predecode_source", source)
+        if stats:
+            mlflow.log_metrics(stats)
+
+    if source == "built" and data_config.get('predecode_upload') and not _predecoded_artifact(run_id, name, client):
+        archive_dir = os.path.join(os.path.dirname(view_dir), "upload")
+        os.makedirs(archive_dir, exist_ok=True)
+        try:
+            archive_path = predecode.pack_npy(view_dir, os.path.join(archive_dir, name))
+            print(f"Registrando as imagens pré-decodificadas na run do dataset ({PREDECODED_ARTIFACT_DIR}/{name})...")
+            client.log_artifact(run_id, archive_path, PREDECODED_ARTIFACT_DIR)
+        except Exception as e:
+            print(f"AVISO: não foi possível registrar as imagens pré-decodificadas na run do dataset: {e}")
+        finally:
+            shutil.rmtree(archive_dir, ignore_errors=True)
+    return view_dir
+
+
+def log_cache_stats(data_config):
+    """Registra na run ativa as estatísticas do cache usado por esta config."""
+    if data_config.get('use_cache', True):
+        get_cache(data_config).log_stats()
@@ -0,0 +1,145 @@
+# utils/dataset_manifest.py
+import mlflow
+import os
+import json
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from mlflow.tracking import MlflowClient
+from utils import hashing, tracking
+
+MANIFEST_ARTIFACT = "dataset_manifest.json"
+FORMAT_TAG = "dataset_format"
+MANIFEST_VERSION = 1
+
+
+def hash_files(files, workers=8):
+    """
+    Calcula o sha256 de cada arquivo de `files` (tuplas de list_files) em paralelo.
+    Retorna {caminho_relativo: {"sha256", "size"}}.
+    """
+    def hash_one(entry):
+        full_path, rel_path, size, _ = entry
+        return rel_path.replace(os.sep, "/"), {"sha256": hashing.file_sha256(full_path), "size": size}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(executor.map(hash_one, files))
+
+
+def load_manifest(run_id):
+    """Baixa o manifesto de uma versão de dataset registrada no modo 'manifest'."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        local_path = mlflow.artifacts.download_artifacts(
+            run_id=run_id, artifact_path=MANIFEST_ARTIFACT, dst_path=tmp_dir,
+            tracking_uri=tracking.server_uri()
+        )
+        with open(local_path, "r") as f:
+            return json.load(f)
+
+
+def plan_version(hashes, run_id, artifact_path, parent_manifest=None, parent_run_id=None):
+    """
+    Monta o manifesto da nova versão. Arquivos cujo conteúdo já existe na versão
+    pai (em qualquer caminho) apontam para o artefato já armazenado; os demais
+    apontam para esta run e entram na lista de upload.
+
+    Retorna (manifesto, caminhos_relativos_a_enviar).
+    """
+    known = {}
+    if parent_manifest:
+        for entry in parent_manifest["files"].values():
+            known.setdefault(entry["sha256"], entry)
+
+    files = {}
+    to_upload = []
+    for rel_path, info in sorted(hashes.items()):
+        existing = known.get(info["sha256"])
+        if existing is not None:
+            files[rel_path] = dict(info, run_id=existing["run_id"], artifact_path=existing["artifact_path"])
+        else:
+            location = "/".join(p for p in (artifact_path, rel_path) if p)
+            files[rel_path] = dict(info, run_id=run_id, artifact_path=location)
+            to_upload.append(rel_path)
+            known[info["sha256"]] = files[rel_path]
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "parent_run_id": parent_run_id,
+        "files": files,
+    }
+    return manifest, to_upload
+
+
+def manifest_stats(manifest, to_upload):
+    uploaded = set(to_upload)
+    sizes = {rel: entry["size"] for rel, entry in manifest["files"].items()}
+    return {
+        "manifest_files_total": len(sizes),
+        "manifest_files_uploaded": len(uploaded),
+        "manifest_bytes_uploaded": sum(sizes[rel] for rel in uploaded),
+        "manifest_bytes_reused": sum(size for rel, size in sizes.items() if rel not in uploaded),
+    }
+
+
+def blob_path(blob_dir, sha256):
+    return os.path.join(blob_dir, sha256[:2], sha256)
+
+
+def _link_or_copy(source, destination):
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def _download_blob(client, entry, blob_dir, staging_dir):
+    target = blob_path(blob_dir, entry["sha256"])
+    if os.path.exists(target):
+        return 0
+    os.makedirs(staging_dir, exist_ok=True)
+    local_path = client.download_artifacts(entry["run_id"], entry["artifact_path"], staging_dir)
+    if hashing.file_sha256(local_path) != entry["sha256"]:
+        raise ValueError(f"Hash inválido para {entry['artifact_path']} da run {entry['run_id']}")
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(local_path, target)
+    return entry["size"]
+
+
+def materialize(manifest, dest_dir, blob_dir, workers=8, client=None):
+    """
+    Reconstrói a versão completa do dataset em `dest_dir`. Cada conteúdo fica
+    uma única vez em `blob_dir` (endereçado pelo sha256) e aparece em
+    `dest_dir` como hardlink; só os conteúdos ausentes localmente são baixados.
+
+    Retorna (bytes_baixados, bytes_reaproveitados).
+    """
+    client = client or MlflowClient(tracking.server_uri())
+    unique = {}
+    for entry in manifest["files"].values():
+        unique.setdefault(entry["sha256"], entry)
+
+    missing = [e for sha, e in unique.items() if not os.path.exists(blob_path(blob_dir, sha))]
+    print(f"Reconstruindo dataset: {len(unique) - len(missing)} arquivos já no cache, {len(missing)} a baixar.")
+
+    downloaded = 0
+    if missing:
+        os.makedirs(blob_dir, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(prefix="staging_", dir=blob_dir)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Cada download vai para uma subpasta própria: artefatos de runs
+                # diferentes podem ter o mesmo caminho relativo.
+                futures = [
+                    executor.submit(_download_blob, client, entry, blob_dir, os.path.join(staging_dir, str(i)))
+                    for i, entry in enumerate(missing)
+                ]
+                downloaded = sum(f.result() for f in futures)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    for rel_path, entry in manifest["files"].items():
+        _link_or_copy(blob_path(blob_dir, entry["sha256"]), os.path.join(dest_dir, rel_path))
+
+    total = sum(e["size"] for e in manifest["files"].values())
+    return downloaded, total - downloaded
@@ -0,0 +1,182 @@
+# utils/dataset_upload.py
+import os
+import json
+import time
+import hashlib
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from mlflow.tracking import MlflowClient
+
+DEFAULT_STATE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mlflow_datasets", "uploads")
+
+
+class UploadManifest:
+    """
+    Checkpoint local do progresso de um registro de dataset, em JSON Lines.
+    A primeira linha guarda o run_id; cada linha seguinte marca um arquivo
+    já enviado. Linhas são só acrescentadas, então uma interrupção no meio
+    de uma escrita perde no máximo o último registro.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.run_id = None
+        self.done = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def path_for(local_path, run_name, artifact_path, experiment_name, mode, state_dir=None):
+        key_source = "\0".join([os.path.abspath(local_path), run_name, artifact_path, experiment_name, mode])
+        key = hashlib.sha256(key_source.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(state_dir or DEFAULT_STATE_DIR, f"{key}.jsonl")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Linha truncada por uma interrupção.
+                if "run_id" in record:
+                    self.run_id = record["run_id"]
+                elif "done" in record:
+                    self.done[record["done"]] = (record["size"], record["mtime"])
+
+    def _append(self, record):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self, run_id):
+        self.run_id = run_id
+        self._append({"run_id": run_id, "started": time.time()})
+
+    def is_done(self, rel_path, size, mtime):
+        return self.done.get(rel_path) == (size, mtime)
+
+    def mark_done(self, rel_path, size, mtime):
+        self._append({"done": rel_path, "size": size, "mtime": mtime})
+        self.done[rel_path] = (size, mtime)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def list_files(local_path):
+    """Lista (caminho_absoluto, caminho_relativo, tamanho, mtime) dos arquivos a enviar."""
+    if os.path.isfile(local_path):
+        stat = os.stat(local_path)
+        return [(local_path, os.path.basename(local_path), stat.st_size, stat.st_mtime)]
+    files = []
+    for root, dirs, names in os.walk(local_path):
+        dirs.sort()
+        for name in sorted(names):
+            full_path = os.path.join(root, name)
+            stat = os.stat(full_path)
+            files.append((full_path, os.path.relpath(full_path, local_path), stat.st_size, stat.st_mtime))
+    return files
+
+
+def pack_folder(local_path, archive_path):
+    """
+    Compacta a pasta num .zip contendo a própria pasta na raiz
+    (ex: rock-paper-scissors-14/data.yaml), o formato que os trainers esperam.
+    O .zip é gravado com outro nome e renomeado no fim, para que um .zip
+    incompleto nunca seja reaproveitado numa retomada.
+    """
+    parent = os.path.dirname(os.path.abspath(local_path))
+    partial_path = archive_path + ".partial"
+    os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+    with zipfile.ZipFile(partial_path, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+        for full_path, _, _, _ in list_files(local_path):
+            zip_ref.write(full_path, os.path.relpath(full_path, parent))
+    os.replace(partial_path, archive_path)
+    return archive_path
+
+
+class ThroughputReporter:
+    """Imprime o progresso e a vazão do upload em intervalos regulares."""
+
+    def __init__(self, total_files, total_bytes, interval=10.0):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.files = 0
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self._last_print = self.start
+        self._lock = threading.Lock()
+
+    def add(self, size):
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+            now = time.perf_counter()
+            if now - self._last_print >= self.interval:
+                self._last_print = now
+                self.report()
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return {
+            "upload_files": self.files,
+            "upload_bytes": self.bytes,
+            "upload_seconds": elapsed,
+            "upload_mb_per_s": self.bytes / (1024 ** 2) / elapsed,
+            "upload_files_per_s": self.files / elapsed,
+        }
+
+    def report(self):
+        s = self.summary()
+        print(
+            f"  {self.files}/{self.total_files} arquivos, "
+            f"{self.bytes / (1024 ** 2):.1f}/{self.total_bytes / (1024 ** 2):.1f} MB "
+            f"({s['upload_mb_per_s']:.1f} MB/s, {s['upload_files_per_s']:.1f} arquivos/s)"
+        )
+
+
+def upload_files(run_id, files, artifact_path, manifest, workers=8, client=None):
+    """
+    Envia os arquivos para a run com um pool limitado de threads, pulando os
+    que o manifesto já marca como enviados. Retorna as estatísticas de vazão.
+    """
+    client = client or MlflowClient()
+    pending = [f for f in files if not manifest.is_done(f[1], f[2], f[3])]
+    skipped = len(files) - len(pending)
+    if skipped:
+        print(f"Retomando upload: {skipped} de {len(files)} arquivos já enviados anteriormente.")
+
+    reporter = ThroughputReporter(len(pending), sum(f[2] for f in pending))
+
+    def send(full_path, rel_path, size, mtime):
+        rel_dir = os.path.dirname(rel_path)
+        destination = "/".join(p for p in (artifact_path, rel_dir.replace(os.sep, "/")) if p)
+        client.log_artifact(run_id, full_path, artifact_path=destination or None)
+        manifest.mark_done(rel_path, size, mtime)
+        reporter.add(size)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(send, *f) for f in pending]
+        for future in as_completed(futures):
+            future.result()
+
+    reporter.report()
+    return reporter.summary()
+
+
+def enable_multipart(chunk_size_mb):
+    """
+    Liga o upload multipart do MLflow (arquivos grandes enviados em partes
+    concorrentes). Só tem efeito com o proxy de artefatos do servidor
+    (mlflow-artifacts) sobre S3/GCS/Azure.
+    """
+    os.environ["MLFLOW_ENABLE_MULTIPART_UPLOAD"] = "true"
+    if chunk_size_mb:
+        os.environ["MLFLOW_MULTIPART_UPLOAD_CHUNK_SIZE"] = str(int(chunk_size_mb * 1024 ** 2))
@@ -0,0 +1,217 @@
+# utils/evaluation.py
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import yaml
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def decode_image(path, size=None, fit=False):
+    """
+    Abre a imagem como array BGR (a convenção do Ultralytics para arrays).
+    Com `size`, o JPEG já é decodificado reduzido (draft, sem ficar menor que
+    `size` nos dois lados); com `fit`, a imagem é encolhida até o lado maior
+    caber em `size`, como o letterbox da detecção faria.
+    """
+    from PIL import Image
+
+    with Image.open(path) as image:
+        if size:
+            image.draft("RGB", (size, size))
+        image = image.convert("RGB")
+        if size and fit and max(image.size) > size:
+            image.thumbnail((size, size), Image.BILINEAR)
+        return np.asarray(image)[:, :, ::-1]
+
+
+def prefetch_batches(items, load_fn, batch_size, workers=4, prefetch=2):
+    """
+    Gera lotes de (item, load_fn(item)) decodificados por um pool de threads.
+    Até `prefetch` lotes à frente ficam sendo decodificados enquanto o lote
+    atual está na inferência.
+    Produz (lote, segundos_esperando_a_decodificação).
+    """
+    items = list(items)
+    max_in_flight = batch_size * (prefetch + 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        next_index = 0
+        while next_index < len(items) or pending:
+            while next_index < len(items) and len(pending) < max_in_flight:
+                item = items[next_index]
+                pending.append((item, executor.submit(load_fn, item)))
+                next_index += 1
+            wait_start = time.perf_counter()
+            batch = []
+            while pending and len(batch) < batch_size:
+                item, future = pending.popleft()
+                batch.append((item, future.result()))
+            yield batch, time.perf_counter() - wait_start
+
+
+def latency_metrics(batch_seconds, batch_sizes, wall_seconds, unit="images"):
+    """Vazão (itens/s no tempo total) e latência p50/p95 por lote, em ms."""
+    total = int(sum(batch_sizes))
+    latencies_ms = np.asarray(batch_seconds) * 1000
+    return {
+        f"eval_{unit}": total,
+        f"eval_{unit}_per_second": total / max(wall_seconds, 1e-9),
+        "eval_latency_p50_ms": float(np.percentile(latencies_ms, 50)) if total else 0.0,
+        "eval_latency_p95_ms": float(np.percentile(latencies_ms, 95)) if total else 0.0,
+        "eval_wall_seconds": wall_seconds,
+    }
+
+
+def list_images(directory):
+    images = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        images.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(IMAGE_EXTENSIONS))
+    return images
+
+
+def classification_samples(data_root, split=None):
+    """
+    (caminho, classe) das imagens de um split de classificação
+    (<raiz>/<split>/<classe>/*.jpg). Sem `split`, usa 'test' ou, se não houver, 'val'.
+    """
+    if split is None:
+        split = 'test' if os.path.isdir(os.path.join(data_root, 'test')) else 'val'
+    split_dir = os.path.join(data_root, split)
+    if not os.path.isdir(split_dir):
+        raise FileNotFoundError(f"Split '{split}' não encontrado em: {data_root}")
+    samples = []
+    for class_name in sorted(os.listdir(split_dir)):
+        class_dir = os.path.join(split_dir, class_name)
+        if os.path.isdir(class_dir):
+            samples.extend((path, class_name) for path in list_images(class_dir))
+    return samples
+
+
+def _resolve_split_dir(data_yaml_path, entry):
+    """Resolve um caminho do data.yaml como o Ultralytics (relativo a `path` ou ao próprio yaml)."""
+    with open(data_yaml_path, "r") as f:
+        data = yaml.safe_load(f)
+    base = data.get('path') or os.path.dirname(os.path.abspath(data_yaml_path))
+    if not os.path.isabs(base):
+        base = os.path.join(os.path.dirname(os.path.abspath(data_yaml_path)), base)
+    candidate = os.path.normpath(os.path.join(base, entry))
+    if not os.path.exists(candidate) and entry.startswith("../"):
+        # Exportações do Roboflow usam '../test/images' mesmo com o yaml na raiz.
+        candidate = os.path.normpath(os.path.join(base, entry[3:]))
+    return candidate
+
+
+def detection_samples(data_yaml_path, split=None):
+    """
+    (caminho_da_imagem, caminho_do_label) de um split do data.yaml.
+    Sem `split`, usa 'test' ou, se o yaml não tiver, 'val'.
+    """
+    with open(data_yaml_path, "r") as f:
+        data = yaml.safe_load(f)
+    if split is None:
+        split = 'test' if data.get('test') else 'val'
+    if not data.get(split):
+        raise ValueError(f"O data.yaml não define o split '{split}'.")
+    image_dir = _resolve_split_dir(data_yaml_path, data[split])
+    if not os.path.isdir(image_dir):
+        raise FileNotFoundError(f"Pasta de imagens do split '{split}' não encontrada: {image_dir}")
+
+    samples = []
+    marker = f"{os.sep}images{os.sep}"
+    for image_path in list_images(image_dir):
+        head, sep, tail = image_path.rpartition(marker)
+        label_path = head + f"{os.sep}labels{os.sep}" + tail if sep else image_path
+        samples.append((image_path, os.path.splitext(label_path)[0] + ".txt"))
+    return samples
+
+
+def read_yolo_labels(label_path):
+    """Labels YOLO (classe cx cy w h, normalizados) -> (classes, caixas xyxy normalizadas)."""
+    if not os.path.exists(label_path):
+        return np.zeros(0, dtype=int), np.zeros((0, 4))
+    rows = np.loadtxt(label_path, ndmin=2)
+    if rows.size == 0:
+        return np.zeros(0, dtype=int), np.zeros((0, 4))
+    cx, cy, w, h = rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return rows[:, 0].astype(int), boxes
+
+
+def box_iou(boxes_a, boxes_b):
+    """Matriz de IoU entre dois conjuntos de caixas xyxy."""
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection + 1e-9)
+
+
+def match_detections(pred_boxes, pred_cls, pred_conf, gt_boxes, gt_cls, iou_thresholds=IOU_THRESHOLDS):
+    """
+    Marca cada predição como acerto (por limiar de IoU): em ordem de
+    confiança, cada caixa verdadeira da mesma classe é usada uma vez só.
+    Retorna uma matriz booleana (predições x limiares).
+    """
+    hits = np.zeros((len(pred_boxes), len(iou_thresholds)), dtype=bool)
+    if len(pred_boxes) == 0 or len(gt_boxes) == 0:
+        return hits
+    iou = box_iou(pred_boxes, gt_boxes) * (pred_cls[:, None] == gt_cls[None, :])
+    order = np.argsort(-pred_conf)
+    for t, threshold in enumerate(iou_thresholds):
+        used = np.zeros(len(gt_boxes), dtype=bool)
+        for i in order:
+            candidates = np.where((iou[i] >= threshold) & ~used)[0]
+            if len(candidates):
+                best = candidates[np.argmax(iou[i, candidates])]
+                used[best] = True
+                hits[i, t] = True
+    return hits
+
+
+def _average_precision(recall, precision):
+    """AP em 101 pontos de recall (COCO): a melhor precisão com recall >= cada ponto."""
+    precision = np.flip(np.maximum.accumulate(np.flip(precision)))
+    indices = np.searchsorted(recall, np.linspace(0, 1, 101), side="left")
+    found = indices < len(precision)
+    return float(np.sum(precision[indices[found]]) / 101)
+
+
+def detection_metrics(hits, conf, pred_cls, gt_cls, conf_threshold=0.25):
+    """
+    mAP@0.5 e mAP@0.5:0.95 (média por classe com caixas verdadeiras) e
+    precisão/recall/F1 das predições com confiança >= `conf_threshold`, com
+    os mesmos nomes das métricas do trainer de detecção.
+    """
+    classes = np.unique(gt_cls)
+    ap = np.zeros((len(classes), hits.shape[1]))
+    for c_index, c in enumerate(classes):
+        selected = pred_cls == c
+        num_gt = int(np.sum(gt_cls == c))
+        if not selected.any():
+            continue
+        order = np.argsort(-conf[selected])
+        class_hits = hits[selected][order]
+        true_positives = np.cumsum(class_hits, axis=0)
+        false_positives = np.cumsum(~class_hits, axis=0)
+        recall = true_positives / num_gt
+        precision = true_positives / (true_positives + false_positives)
+        for t in range(hits.shape[1]):
+            ap[c_index, t] = _average_precision(recall[:, t], precision[:, t])
+
+    confident = conf >= conf_threshold
+    true_positives = int(hits[confident, 0].sum())
+    precision = true_positives / max(int(confident.sum()), 1)
+    recall = true_positives / max(len(gt_cls), 1)
+    return {
+        "mAP_50": float(ap[:, 0].mean()) if len(classes) else 0.0,
+        "mAP_50_95": float(ap.mean()) if len(classes) else 0.0,
+        "Precision": precision,
+        "Recall": recall,
+        "F1-Score": 2 * precision * recall / max(precision + recall, 1e-9),
+    }
@@ -0,0 +1,114 @@
+# utils/fingerprint.py
+import os
+import sys
+import json
+import hashlib
+from importlib import metadata
+from mlflow.tracking import MlflowClient
+from utils import hashing, hpo
+
+FINGERPRINT_TAG = "run_fingerprint"
+REUSED_RUN_TAG = "reused_run_id"
+
+# Chaves que não mudam o resultado do treino (nome da run, infraestrutura,
+# segredos) e por isso ficam fora da impressão digital.
+# `queue` (horário de envio do worker.py) e `resources` (reserva de CPUs e
+# memória) mudam a cada envio, não o treino.
+IGNORED_KEYS = (
+    'run_name', 'tracking', 'stream_metrics', 'checkpoints', 'upload_workers', 'reuse', 'queue', 'resources'
+)
+IGNORED_DATA_KEYS = (
+    'use_cache', 'cache_dir', 'cache_max_gb', 'cache_verify', 'extract_workers',
+    'extract_executor', 'download_workers', 'stream_from_zip', 'roboflow_api_key',
+    'predecode_workers', 'predecode_upload', 'roboflow_register', 'roboflow_snapshot_experiment'
+)
+LIBRARIES = ('mlflow', 'ultralytics', 'torch', 'torchvision', 'scikit-learn', 'pandas', 'numpy')
+
+
+def normalize_config(config):
+    normalized = {k: v for k, v in config.items() if k not in IGNORED_KEYS}
+    if isinstance(normalized.get('data'), dict):
+        normalized['data'] = {k: v for k, v in normalized['data'].items() if k not in IGNORED_DATA_KEYS}
+    return normalized
+
+
+def _listing_digest(directory):
+    """Identidade barata de uma pasta local: caminhos, tamanhos e datas de modificação."""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            full_path = os.path.join(root, name)
+            stat = os.stat(full_path)
+            digest.update(f"{os.path.relpath(full_path, directory)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def dataset_identity(data_config):
+    """Identifica o dataset: artefatos do MLflow são imutáveis; fontes locais são lidas do disco."""
+    if 'dataset_run_id' in data_config:
+        return {"dataset_run_id": data_config['dataset_run_id'],
+                "dataset_artifact_path": data_config.get('dataset_artifact_path')}
+    if 'roboflow_workspace' in data_config:
+        return {key: data_config.get(key) for key in
+                ('roboflow_workspace', 'roboflow_project', 'roboflow_version', 'download_format')}
+    for key in ('local_data_yaml', 'data_root_path', 'path'):
+        if key in data_config:
+            path = data_config[key]
+            if os.path.isfile(path) and key == 'path':
+                return {key: path, "sha256": hashing.file_sha256(path)}
+            directory = os.path.dirname(path) if os.path.isfile(path) else path
+            if not os.path.isdir(directory):
+                return {key: path}
+            return {key: path, "listing": _listing_digest(directory)}
+    return {}
+
+
+def model_identity(params_config):
+    """Pesos locais entram pelo conteúdo; nomes (ex: 'yolov8n.pt') pela versão da biblioteca."""
+    model_name = (params_config or {}).get('model_name')
+    if model_name and os.path.isfile(model_name):
+        return {"model_name": model_name, "sha256": hashing.file_sha256(model_name)}
+    return {"model_name": model_name}
+
+
+def library_versions():
+    versions = {"python": f"{sys.version_info.major}.{sys.version_info.minor}"}
+    for name in LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            continue
+    return versions
+
+
+def compute(config):
+    """
+    Impressão digital determinística da run: config normalizada, identidade
+    do dataset, pesos iniciais e versões das bibliotecas.
+    Retorna (fingerprint, componentes).
+    """
+    components = {
+        "config": normalize_config(config),
+        "dataset": dataset_identity(config.get('data') or {}),
+        "model": model_identity(config.get('params')),
+        "libraries": library_versions(),
+    }
+    encoded = json.dumps(components, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest(), components
+
+
+def find_finished_run(experiment_id, fingerprint, client=None):
+    """
+    A run FINISHED mais recente com a mesma impressão digital, ou None.
+    Trials interrompidos pelo pruning do sweep.py também terminam como
+    FINISHED, mas pararam antes das épocas configuradas e não contam.
+    """
+    client = client or MlflowClient()
+    runs = client.search_runs(
+        [experiment_id],
+        filter_string=f"tags.{FINGERPRINT_TAG} = '{fingerprint}' and attributes.status = 'FINISHED'",
+        order_by=["attributes.start_time DESC"],
+    )
+    # O filtro "tags.x != 'true'" do MLflow também exclui as runs sem a tag.
+    return next((run for run in runs if run.data.tags.get(hpo.PRUNED_TAG) != "true"), None)
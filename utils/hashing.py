@@ -0,0 +1,37 @@
+# utils/hashing.py
+import os
+import zlib
+import hashlib
+
+# Arquivos são lidos em blocos deste tamanho (hash e leitura antecipada).
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_sha256(path):
+    """Hash do conteúdo de um arquivo ou de uma pasta inteira (caminhos + conteúdo)."""
+    if os.path.isfile(path):
+        return file_sha256(path)
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full_path = os.path.join(root, name)
+            digest.update(os.path.relpath(full_path, path).encode("utf-8"))
+            digest.update(file_sha256(full_path).encode("ascii"))
+    return digest.hexdigest()
+
+
+def file_crc32(path):
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
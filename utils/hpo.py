@@ -0,0 +1,123 @@
+# utils/hpo.py
+import copy
+import math
+import random
+import itertools
+
+# Tag das runs de trials interrompidos pelo pruning (não são treinos completos).
+PRUNED_TAG = "sweep_pruned"
+
+
+def _normalize_spec(spec):
+    """Aceita uma lista de valores ou um dicionário {values} / {min, max, type}."""
+    if isinstance(spec, list):
+        return {"values": spec}
+    return spec
+
+
+def sample_value(spec, rng):
+    spec = _normalize_spec(spec)
+    if "values" in spec:
+        return rng.choice(spec["values"])
+    low, high = spec["min"], spec["max"]
+    kind = spec.get("type", "uniform")
+    if kind == "loguniform":
+        return math.exp(rng.uniform(math.log(low), math.log(high)))
+    if kind == "int":
+        return rng.randint(int(low), int(high))
+    return rng.uniform(low, high)
+
+
+def expand_search_space(parameters, search="random", num_trials=10, seed=0):
+    """
+    Transforma o espaço de busca da config numa lista de combinações de
+    hiperparâmetros. `grid` gera o produto cartesiano (só listas de valores);
+    `random` sorteia `num_trials` combinações.
+    """
+    names = sorted(parameters)
+    if search == "grid":
+        specs = [_normalize_spec(parameters[name]) for name in names]
+        if any("values" not in spec for spec in specs):
+            raise ValueError("A busca 'grid' aceita apenas parâmetros com lista de 'values'.")
+        return [dict(zip(names, combo)) for combo in itertools.product(*(spec["values"] for spec in specs))]
+
+    if search != "random":
+        raise ValueError(f"Tipo de busca desconhecido: '{search}'. Use 'random' ou 'grid'.")
+    rng = random.Random(seed)
+    return [{name: sample_value(parameters[name], rng) for name in names} for _ in range(num_trials)]
+
+
+def trial_config(base_config, trial_params, trial_index):
+    """Cria a config de um trial: os hiperparâmetros sobrescrevem a seção 'params'."""
+    config = copy.deepcopy(base_config)
+    config.pop('sweep', None)
+    config.setdefault('params', {}).update(trial_params)
+    config['run_name'] = f"{base_config['run_name']}_trial_{trial_index:03d}"
+    return config
+
+
+class AshaPruner:
+    """
+    Successive halving assíncrono (ASHA). Os "degraus" ficam nas épocas
+    min_epochs * reduction_factor^k. Ao chegar num degrau, o trial só continua
+    se estiver entre o melhor 1/reduction_factor dos trials que já passaram
+    por ele; nenhum trial espera pelos outros.
+
+    `state` e `lock` podem ser um dict/Lock de multiprocessing.Manager, para
+    que trials em processos diferentes compartilhem os degraus.
+    """
+
+    def __init__(self, state, lock, min_epochs=1, reduction_factor=3, mode="max"):
+        self.state = state
+        self.lock = lock
+        self.min_epochs = min_epochs
+        self.reduction_factor = reduction_factor
+        self.mode = mode
+
+    def rung_for_epoch(self, epoch):
+        """Índice do degrau se `epoch` (a partir de 1) for um degrau; senão None."""
+        if epoch < self.min_epochs:
+            return None
+        ratio = epoch / self.min_epochs
+        rung = round(math.log(ratio, self.reduction_factor)) if ratio > 0 else 0
+        if self.min_epochs * self.reduction_factor ** rung == epoch:
+            return rung
+        return None
+
+    def should_prune(self, epoch, value):
+        rung = self.rung_for_epoch(epoch)
+        if rung is None or value is None:
+            return False
+        key = f"rung_{rung}"
+        with self.lock:
+            values = list(self.state.get(key, []))
+            values.append(value)
+            self.state[key] = values
+
+        ranked = sorted(values, reverse=(self.mode == "max"))
+        keep = max(len(ranked) // self.reduction_factor, 1)
+        threshold = ranked[keep - 1]
+        if self.mode == "max":
+            return value < threshold
+        return value > threshold
+
+
+def pruning_callbacks(pruner, metric, on_prune=None):
+    """
+    Callback do Ultralytics que consulta o pruner ao fim de cada época e
+    interrompe o treino (trainer.stop) quando o trial não deve continuar.
+    `metric` é uma chave de trainer.metrics ou 'fitness'.
+    """
+    def on_fit_epoch_end(trainer):
+        if metric == "fitness":
+            value = trainer.fitness
+        else:
+            value = (trainer.metrics or {}).get(metric)
+        epoch = trainer.epoch + 1
+        if value is not None and pruner.should_prune(epoch, float(value)):
+            print(f">>> Trial interrompido pelo ASHA na época {epoch} ({metric} = {float(value):.4f}).")
+            trainer.stop = True
+            if on_prune is not None:
+                on_prune(epoch, float(value))
+
+    return {"on_fit_epoch_end": [on_fit_epoch_end]}
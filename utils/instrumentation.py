@@ -0,0 +1,171 @@
+# utils/instrumentation.py
+import os
+import sys
+import time
+from contextlib import contextmanager
+from mlflow.entities import Metric
+from mlflow.tracking import MlflowClient
+from mlflow.utils.validation import MAX_METRICS_PER_BATCH
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, o pico de RSS não é medido
+    resource = None
+
+# Timeline da run em andamento; `stage` não faz nada fora de `recording`.
+_current = None
+
+# Medidas em que as etapas repetidas ficam com o maior valor (as demais são somadas).
+MAX_KEYS = ("process_peak_rss_mb", "rss_start_mb", "rss_end_mb")
+
+# Contadores acumulados do processo (/proc/self/io) e da rede (/proc/net/dev).
+# rchar/wchar contam toda leitura/escrita (disco, sockets, pipes);
+# read_bytes/write_bytes só o que de fato foi ao disco.
+# Os de rede são da máquina (ou do namespace do container) inteira: incluem o
+# tráfego de outros processos, daí o prefixo host_.
+IO_FIELDS = {"rchar": "io_read_mb", "wchar": "io_write_mb", "read_bytes": "disk_read_mb", "write_bytes": "disk_write_mb"}
+
+
+def peak_rss_mb():
+    """
+    Pico de memória residente do processo desde o início (ru_maxrss é KB no
+    Linux, bytes no macOS), ou None sem o módulo resource (Windows).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 ** 2) if sys.platform == "darwin" else peak / 1024
+
+
+def _read_rss_bytes():
+    """Memória residente atual do processo (/proc/self/statm, Linux), ou None."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _read_proc_io():
+    try:
+        with open("/proc/self/io", "r") as f:
+            values = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return {}
+    return {name: int(values[key]) for key, name in IO_FIELDS.items() if key in values}
+
+
+def _read_net_bytes():
+    """
+    Bytes recebidos/enviados por todas as interfaces de rede (exceto loopback)
+    da máquina ou container, não só pelo processo.
+    """
+    try:
+        with open("/proc/net/dev", "r") as f:
+            lines = f.readlines()[2:]
+    except OSError:
+        return {}
+    received, sent = 0, 0
+    for line in lines:
+        interface, data = line.split(":", 1)
+        if interface.strip() == "lo":
+            continue
+        fields = data.split()
+        received += int(fields[0])
+        sent += int(fields[8])
+    return {"host_net_recv_mb": received, "host_net_sent_mb": sent}
+
+
+def _snapshot():
+    # os.times inclui os subprocessos já finalizados (zero no Windows).
+    times = os.times()
+    snapshot = {
+        "wall": time.perf_counter(),
+        "cpu": times.user + times.system + times.children_user + times.children_system,
+        "rss": _read_rss_bytes(),
+    }
+    snapshot.update(_read_proc_io())
+    snapshot.update(_read_net_bytes())
+    return snapshot
+
+
+class Timeline:
+    """
+    Etapas de uma run com tempo de parede, tempo de CPU (processo + filhos),
+    RSS atual do processo na entrada e na saída da etapa, pico de RSS do
+    processo desde o início, bytes lidos/escritos pelo processo e o tráfego
+    de rede da máquina durante a etapa. Cada medição lê só alguns contadores
+    do kernel (custo de microssegundos); as que dependem do /proc ou do
+    módulo resource ficam de fora onde não existem.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        before = _snapshot()
+        try:
+            yield
+        finally:
+            after = _snapshot()
+            record = {
+                "stage": name,
+                "start_seconds": before["wall"] - self._start,
+                "wall_seconds": after["wall"] - before["wall"],
+                "cpu_seconds": after["cpu"] - before["cpu"],
+            }
+            if before["rss"] is not None and after["rss"] is not None:
+                record["rss_start_mb"] = before["rss"] / (1024 ** 2)
+                record["rss_end_mb"] = after["rss"] / (1024 ** 2)
+            process_peak = peak_rss_mb()
+            if process_peak is not None:
+                record["process_peak_rss_mb"] = process_peak
+            for key in after:
+                if key.endswith("_mb") and key in before:
+                    record[key] = (after[key] - before[key]) / (1024 ** 2)
+            self.stages.append(record)
+
+    def metrics(self):
+        """`stage_<etapa>_<medida>`, somando as etapas repetidas (as medidas de RSS ficam com a maior)."""
+        metrics = {}
+        for record in self.stages:
+            for key, value in record.items():
+                if key in ("stage", "start_seconds"):
+                    continue
+                name = f"stage_{record['stage']}_{key}"
+                metrics[name] = max(metrics.get(name, 0), value) if key in MAX_KEYS else metrics.get(name, 0) + value
+        return metrics
+
+    def log(self, run_id, client=None):
+        """Envia as métricas numa escrita em lote e a linha do tempo completa em timeline.json."""
+        client = client or MlflowClient()
+        timestamp = int(time.time() * 1000)
+        metrics = [Metric(key, float(value), timestamp, 0) for key, value in self.metrics().items()]
+        for start in range(0, len(metrics), MAX_METRICS_PER_BATCH):
+            client.log_batch(run_id, metrics=metrics[start:start + MAX_METRICS_PER_BATCH])
+        client.log_dict(run_id, {"started_at": self.started_at, "stages": self.stages}, "timeline.json")
+
+
+@contextmanager
+def recording():
+    """Ativa uma Timeline para as chamadas de `stage` (em qualquer módulo) até o fim do bloco."""
+    global _current
+    previous, _current = _current, Timeline()
+    try:
+        yield _current
+    finally:
+        _current = previous
+
+
+@contextmanager
+def stage(name):
+    """Mede o bloco como a etapa `name` da Timeline ativa (se houver)."""
+    if _current is None:
+        yield
+        return
+    with _current.stage(name):
+        yield
@@ -0,0 +1,18 @@
+# utils/joblib_pyfunc.py
+# Modelo pyfunc "from code": o MLflow executa este arquivo ao carregar o
+# modelo (não é importado pelo projeto). O estimador fica num arquivo
+# joblib comprimido, registrado como o artefato "model".
+import joblib
+import numpy as np
+import mlflow
+
+
+class JoblibModel(mlflow.pyfunc.PythonModel):
+    def load_context(self, context):
+        self.model = joblib.load(context.artifacts["model"])
+
+    def predict(self, context, model_input, params=None):
+        return self.model.predict(np.asarray(model_input, dtype=np.float32))
+
+
+mlflow.models.set_model(JoblibModel())
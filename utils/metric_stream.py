@@ -0,0 +1,153 @@
+# utils/metric_stream.py
+import time
+import queue
+import threading
+from mlflow.entities import Metric
+from mlflow.tracking import MlflowClient
+
+# Limite de métricas por chamada log_batch imposto pelo servidor MLflow.
+MAX_BATCH_SIZE = 1000
+_STOP = object()
+
+
+def sanitize_metric_name(name):
+    """O MLflow não aceita parênteses: 'metrics/mAP50(B)' vira 'metrics/mAP50B'."""
+    return name.replace("(", "").replace(")", "")
+
+
+class MetricStreamer:
+    """
+    Envia métricas para o MLflow a partir de uma thread em segundo plano.
+
+    `log` nunca bloqueia: os pontos entram numa fila limitada e a thread os
+    agrupa em chamadas `log_batch`. Se o servidor estiver lento e a fila
+    encher, os pontos novos são descartados (e contados) em vez de travar
+    o loop de treino.
+    """
+
+    def __init__(self, run_id, flush_interval=5.0, max_queue=100000, client=None):
+        self.run_id = run_id
+        self.flush_interval = flush_interval
+        self.client = client or MlflowClient()
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+        self.max_pending = max_queue
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._worker, name="mlflow-metric-stream", daemon=True)
+        self._thread.start()
+
+    def log(self, metrics, step):
+        timestamp = int(time.time() * 1000)
+        for key, value in metrics.items():
+            try:
+                self._queue.put_nowait(Metric(sanitize_metric_name(key), float(value), timestamp, step))
+            except queue.Full:
+                self.dropped += 1
+
+    def _worker(self):
+        pending = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                if item is _STOP:
+                    stopping = True
+                else:
+                    pending.append(item)
+            except queue.Empty:
+                pass
+
+            if stopping or time.monotonic() >= deadline:
+                # Drena o que já está na fila para aproveitar as mesmas chamadas.
+                while not stopping:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                    else:
+                        pending.append(item)
+                pending = self._send(pending, final=stopping)
+                # Com o servidor fora do ar, mantém só os pontos mais recentes.
+                if len(pending) > self.max_pending:
+                    self.dropped += len(pending) - self.max_pending
+                    pending = pending[-self.max_pending:]
+                deadline = time.monotonic() + self.flush_interval
+
+    def _send(self, pending, final=False):
+        """Envia em lotes de até MAX_BATCH_SIZE; devolve o que não pôde ser enviado."""
+        while pending:
+            batch = pending[:MAX_BATCH_SIZE]
+            try:
+                self.client.log_batch(self.run_id, metrics=batch)
+            except Exception as e:
+                print(f"Aviso: falha ao enviar {len(batch)} métricas ao MLflow ({e}).")
+                if final:
+                    self.failed += len(pending)
+                    return []
+                return pending
+            self.sent += len(batch)
+            pending = pending[MAX_BATCH_SIZE:]
+        return []
+
+    def close(self, timeout=60.0):
+        """Envia o que restar na fila e encerra a thread."""
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print("Aviso: o envio das métricas por época não terminou a tempo.")
+        if self.dropped or self.failed:
+            print(f"Aviso: {self.dropped} métricas descartadas (fila cheia) e {self.failed} não enviadas.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def yolo_callbacks(streamer, batch_interval=None):
+    """
+    Callbacks do Ultralytics que publicam no `streamer` as perdas, métricas de
+    validação e learning rates de cada época (step = época) e, opcionalmente,
+    a perda de treino a cada `batch_interval` batches (step = batch global).
+    Num treino retomado, os steps continuam de onde a execução anterior parou.
+    """
+    def on_fit_epoch_end(trainer):
+        metrics = dict(trainer.label_loss_items(trainer.tloss, prefix="train"))
+        metrics.update(trainer.metrics or {})
+        metrics.update(getattr(trainer, "lr", None) or {})
+        streamer.log(metrics, step=trainer.epoch)
+
+    callbacks = {"on_fit_epoch_end": [on_fit_epoch_end]}
+
+    if batch_interval:
+        batch_counter = {"step": 0}
+
+        def on_train_start(trainer):
+            # start_epoch > 0 quando o treino é retomado de um checkpoint.
+            batch_counter["step"] = getattr(trainer, "start_epoch", 0) * len(trainer.train_loader)
+
+        def on_train_batch_end(trainer):
+            batch_counter["step"] += 1
+            if batch_counter["step"] % batch_interval == 0:
+                losses = trainer.label_loss_items(trainer.tloss, prefix="batch")
+                streamer.log(losses, step=batch_counter["step"])
+
+        callbacks["on_train_start"] = [on_train_start]
+        callbacks["on_train_batch_end"] = [on_train_batch_end]
+
+    return callbacks
+
+
+def add_callbacks(model, callbacks):
+    """Registra no modelo YOLO os callbacks no formato {evento: [funções]}."""
+    for event, functions in (callbacks or {}).items():
+        for function in functions:
+            model.add_callback(event, function)
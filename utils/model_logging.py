@@ -0,0 +1,76 @@
+# utils/model_logging.py
+import os
+import time
+import joblib
+import mlflow
+import numpy as np
+from mlflow.models import infer_signature
+from mlflow.tracking import MlflowClient
+
+JOBLIB_PYFUNC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "joblib_pyfunc.py")
+
+
+def _logged_model_size(model_info):
+    """Soma dos arquivos do modelo registrado (None se o MLflow não expõe isso)."""
+    model_id = getattr(model_info, "model_id", None)
+    if not model_id:
+        return None
+    try:
+        files = MlflowClient().list_logged_model_artifacts(model_id)
+    except Exception:
+        return None
+    return sum(f.file_size or 0 for f in files if not f.is_dir)
+
+
+def log_sklearn_model(model, name, X_sample, logging_config=None, temp_dir=None):
+    """
+    Registra o estimador sem serializar a matriz de treino: a assinatura é
+    inferida de uma amostra de `signature_rows` linhas e o input_example
+    guarda só `example_rows` linhas. A amostra é um array float32, como o
+    usado no `fit` (o estimador não conhece nomes de colunas; eles ficam no
+    feature_encoding.json da run).
+
+    `format`: 'cloudpickle' (padrão, flavor sklearn) ou 'joblib' (pyfunc com
+    o estimador num arquivo joblib comprimido, bem menor para florestas
+    grandes; `compress` é o nível zlib ou um par como ["lzma", 6]).
+
+    Retorna as métricas de tamanho e tempo do registro.
+    """
+    logging_config = logging_config or {}
+    start = time.perf_counter()
+
+    sample = np.asarray(X_sample[:logging_config.get('signature_rows', 1000)], dtype=np.float32)
+    signature = infer_signature(sample, model.predict(sample))
+    input_example = sample[:logging_config.get('example_rows', 5)]
+
+    model_format = logging_config.get('format', 'cloudpickle')
+    if model_format == 'joblib':
+        compress = logging_config.get('compress', 3)
+        if isinstance(compress, list):
+            compress = tuple(compress)
+        model_path = os.path.join(temp_dir, "model.joblib")
+        joblib.dump(model, model_path, compress=compress)
+        model_info = mlflow.pyfunc.log_model(
+            name=name, python_model=JOBLIB_PYFUNC_PATH, artifacts={"model": model_path},
+            signature=signature, input_example=input_example
+        )
+        size = os.path.getsize(model_path)
+    elif model_format == 'cloudpickle':
+        # cloudpickle: o formato padrão das versões novas do MLflow (skops)
+        # recusa as árvores do RandomForest como "tipos não confiáveis".
+        model_info = mlflow.sklearn.log_model(
+            sk_model=model, name=name, signature=signature, input_example=input_example,
+            serialization_format=mlflow.sklearn.SERIALIZATION_FORMAT_CLOUDPICKLE
+        )
+        size = _logged_model_size(model_info)
+    else:
+        raise ValueError(f"Formato de modelo desconhecido: '{model_format}'. Use 'cloudpickle' ou 'joblib'.")
+
+    metrics = {"model_log_seconds": time.perf_counter() - start}
+    if size is not None:
+        metrics["model_serialized_mb"] = size / (1024 ** 2)
+    print(
+        f"Modelo registrado ({model_format}) em {metrics['model_log_seconds']:.2f}s"
+        + (f", {metrics['model_serialized_mb']:.1f} MB." if size is not None else ".")
+    )
+    return metrics
@@ -0,0 +1,228 @@
+# utils/offline_sync.py
+import os
+import sys
+import json
+import subprocess
+from mlflow.entities import Metric, Param, RunTag, ViewType
+from mlflow.tracking import MlflowClient
+from mlflow.utils.validation import MAX_METRICS_PER_BATCH, MAX_PARAMS_TAGS_PER_BATCH
+from utils import tracking
+from utils.artifact_uploader import ArtifactUploader
+from utils.dataset_cache import FileLock
+
+PARENT_RUN_TAG = "mlflow.parentRunId"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SyncLedger:
+    """
+    Registro append-only (JSONL) de quais runs do diário local já foram
+    enviadas, e para qual run do servidor. Permite interromper e repetir o
+    sync sem duplicar runs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.remote_ids = {}
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # linha truncada por uma interrupção
+                    self.remote_ids[entry["local_run_id"]] = entry["remote_run_id"]
+                    if entry["status"] == "done":
+                        self.done.add(entry["local_run_id"])
+
+    def record(self, local_run_id, remote_run_id, status):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"local_run_id": local_run_id, "remote_run_id": remote_run_id, "status": status}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.remote_ids[local_run_id] = remote_run_id
+        if status == "done":
+            self.done.add(local_run_id)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def local_runs(local):
+    """Runs finalizadas do diário local, na ordem em que começaram."""
+    experiment_ids = [e.experiment_id for e in local.search_experiments(view_type=ViewType.ACTIVE_ONLY)]
+    if not experiment_ids:
+        return []
+    runs = local.search_runs(experiment_ids, run_view_type=ViewType.ACTIVE_ONLY, order_by=["attributes.start_time ASC"])
+    return [run for run in runs if run.info.status != "RUNNING"]
+
+
+def _find_remote_run(remote, experiment_id, local_run_id):
+    """Procura no servidor uma run já criada para `local_run_id` (ex: ledger perdido)."""
+    found = remote.search_runs(
+        [experiment_id], filter_string=f"tags.{tracking.OFFLINE_RUN_TAG} = '{local_run_id}'", max_results=1
+    )
+    return found[0].info.run_id if found else None
+
+
+def _replay_data(local, remote, run, remote_run_id, tags):
+    params = [Param(key, value) for key, value in run.data.params.items()]
+    for batch in _chunks(params, MAX_PARAMS_TAGS_PER_BATCH):
+        remote.log_batch(remote_run_id, params=batch)
+
+    tag_list = [RunTag(key, value) for key, value in tags.items()]
+    for batch in _chunks(tag_list, MAX_PARAMS_TAGS_PER_BATCH):
+        remote.log_batch(remote_run_id, tags=batch)
+
+    # Histórico completo de cada métrica; o servidor ignora pontos repetidos
+    # (mesma chave, valor, step e timestamp), então repetir o envio é seguro.
+    metrics = []
+    for key in run.data.metrics:
+        metrics.extend(
+            Metric(m.key, m.value, m.timestamp, m.step) for m in local.get_metric_history(run.info.run_id, key)
+        )
+    for batch in _chunks(metrics, MAX_METRICS_PER_BATCH):
+        remote.log_batch(remote_run_id, metrics=batch)
+    return len(params), len(metrics)
+
+
+def _local_path(artifact_uri):
+    return artifact_uri[len("file://"):] if artifact_uri.startswith("file://") else artifact_uri
+
+
+def _replay_artifacts(run, remote_run_id, remote, workers):
+    artifact_dir = _local_path(run.info.artifact_uri)
+    if not os.path.isdir(artifact_dir):
+        return 0
+    uploader = ArtifactUploader(remote_run_id, workers=workers, client=remote)
+    for root, _, files in os.walk(artifact_dir):
+        rel_dir = os.path.relpath(root, artifact_dir)
+        for name in files:
+            uploader.submit(os.path.join(root, name), None if rel_dir == "." else rel_dir.replace(os.sep, "/"))
+    summary = uploader.close()
+    if summary["artifact_upload_failed"]:
+        raise RuntimeError(f"{summary['artifact_upload_failed']} artefatos não foram enviados.")
+    return summary["artifact_upload_files"]
+
+
+def _replay_logged_models(local, remote, run, remote_experiment_id, remote_run_id):
+    """Modelos registrados com log_model(name=...) (MLflow 3) ficam fora dos artefatos da run."""
+    if not hasattr(local, "search_logged_models"):
+        return 0
+    models = local.search_logged_models(
+        [run.info.experiment_id], filter_string=f"source_run_id = '{run.info.run_id}'"
+    )
+    existing = {
+        m.name for m in remote.search_logged_models(
+            [remote_experiment_id], filter_string=f"source_run_id = '{remote_run_id}'"
+        )
+    }
+    sent = 0
+    for model in models:
+        if model.name in existing:
+            continue
+        remote_model = remote.create_logged_model(
+            remote_experiment_id, name=model.name, source_run_id=remote_run_id,
+            tags=model.tags, params=model.params, model_type=model.model_type
+        )
+        remote.log_model_artifacts(remote_model.model_id, _local_path(model.artifact_location))
+        remote.finalize_logged_model(remote_model.model_id, "READY")
+        sent += 1
+    return sent
+
+
+def sync_run(local, remote, run, ledger, workers=8):
+    """Envia uma run do diário ao servidor. Retorna o run_id remoto."""
+    local_run_id = run.info.run_id
+    experiment_name = local.get_experiment(run.info.experiment_id).name
+    remote_experiment_id = tracking.prepare_experiment(experiment_name, tracking_uri=tracking.server_uri())
+    if remote_experiment_id is None:
+        raise RuntimeError(f"O experimento '{experiment_name}' está na lixeira do servidor.")
+
+    tags = {k: v for k, v in run.data.tags.items() if not k.startswith("mlflow.") or k == PARENT_RUN_TAG}
+    tags[tracking.OFFLINE_RUN_TAG] = local_run_id
+    if PARENT_RUN_TAG in tags:
+        tags[PARENT_RUN_TAG] = ledger.remote_ids[tags[PARENT_RUN_TAG]]
+    for key in ("mlflow.source.name", "mlflow.source.type", "mlflow.user"):
+        if key in run.data.tags:
+            tags[key] = run.data.tags[key]
+
+    remote_run_id = ledger.remote_ids.get(local_run_id) or _find_remote_run(remote, remote_experiment_id, local_run_id)
+    if remote_run_id is None:
+        remote_run = remote.create_run(
+            remote_experiment_id, start_time=run.info.start_time,
+            tags={tracking.OFFLINE_RUN_TAG: local_run_id}, run_name=run.info.run_name
+        )
+        remote_run_id = remote_run.info.run_id
+    ledger.record(local_run_id, remote_run_id, "started")
+
+    num_params, num_metrics = _replay_data(local, remote, run, remote_run_id, tags)
+    num_artifacts = _replay_artifacts(run, remote_run_id, remote, workers)
+    num_models = _replay_logged_models(local, remote, run, remote_experiment_id, remote_run_id)
+    remote.set_terminated(remote_run_id, status=run.info.status, end_time=run.info.end_time)
+    ledger.record(local_run_id, remote_run_id, "done")
+
+    print(
+        f"  {run.info.run_name} ({local_run_id}) -> {remote_run_id}: {num_params} parâmetros, "
+        f"{num_metrics} pontos de métricas, {num_artifacts} artefatos, {num_models} modelos."
+    )
+    return remote_run_id
+
+
+def sync_all(workers=8):
+    """
+    Envia ao servidor, em ordem de início, as runs finalizadas do diário
+    local que ainda não foram sincronizadas. Runs filhas esperam a run pai.
+    Retorna (enviadas, pendentes, com_erro).
+    """
+    lock = FileLock(os.path.join(tracking.offline_dir(), "sync.lock"), blocking=False)
+    if not lock.acquire():
+        print("Já existe um sync em andamento; nada a fazer.")
+        return 0, 0, 0
+
+    try:
+        local = MlflowClient(tracking.offline_uri())
+        remote = MlflowClient(tracking.server_uri())
+        ledger = SyncLedger(os.path.join(tracking.offline_dir(), "sync_ledger.jsonl"))
+
+        pending = [run for run in local_runs(local) if run.info.run_id not in ledger.done]
+        print(f"Sincronizando {len(pending)} runs com {tracking.server_uri()}...")
+        sent, deferred, failed = 0, 0, 0
+        for run in pending:
+            parent = run.data.tags.get(PARENT_RUN_TAG)
+            if parent and parent not in ledger.remote_ids:
+                deferred += 1
+                continue
+            try:
+                sync_run(local, remote, run, ledger, workers=workers)
+                sent += 1
+            except Exception as e:
+                print(f"ERRO ao sincronizar a run {run.info.run_id}: {e}")
+                failed += 1
+
+        print(f"Sync concluído: {sent} enviadas, {deferred} aguardando a run pai, {failed} com erro.")
+        return sent, deferred, failed
+    finally:
+        lock.release()
+
+
+def start_background_sync():
+    """Dispara o sync.py num processo separado, que continua após o fim do treino."""
+    os.makedirs(tracking.offline_dir(), exist_ok=True)
+    log_path = os.path.join(tracking.offline_dir(), "sync.log")
+    with open(log_path, "a") as log_file:
+        subprocess.Popen(
+            [sys.executable, os.path.join(REPO_ROOT, "sync.py")],
+            cwd=REPO_ROOT, stdout=log_file, stderr=subprocess.STDOUT, start_new_session=True
+        )
+    print(f"Sync com o servidor iniciado em segundo plano (log: {log_path}).")
+
+
+def maybe_start_background_sync(config, mode):
+    """Com `tracking: {mode: offline, sync: background}`, dispara o sync ao fim da run."""
+    if mode == 'offline' and ((config.get('tracking') or {}).get('sync') == 'background'):
+        start_background_sync()
@@ -0,0 +1,126 @@
+# utils/predecode.py
+import math
+import os
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from utils.evaluation import IMAGE_EXTENSIONS
+
+# Lado da imagem limitado a `image_size` em cada modo: o maior na detecção
+# (como o load_image do Ultralytics) e o menor na classificação (o Resize +
+# CenterCrop da validação do YOLO-CLS).
+MODES = ("detection", "classification")
+
+
+def decode_resized(path, image_size, mode):
+    """
+    Decodifica a imagem já reduzida (draft do JPEG + resize bilinear) e
+    retorna o array BGR uint8, o formato dos .npy do cache='disk' do Ultralytics.
+    Imagens menores que `image_size` não são ampliadas.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as image:
+        image.draft("RGB", (image_size, image_size))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    width, height = image.size
+    side = max(width, height) if mode == "detection" else min(width, height)
+    if side > image_size:
+        ratio = image_size / side
+        if mode == "detection":
+            size = (min(math.ceil(width * ratio), image_size), min(math.ceil(height * ratio), image_size))
+        else:
+            size = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+        image = image.resize(size, Image.BILINEAR)
+    return np.ascontiguousarray(np.asarray(image)[:, :, ::-1])
+
+
+def npy_path(image_path):
+    """Onde o Ultralytics procura a imagem decodificada (Path.with_suffix('.npy'))."""
+    return os.path.splitext(image_path)[0] + ".npy"
+
+
+def _link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def link_tree(source_dir, dest_dir, prefixes=None):
+    """
+    Espelha `source_dir` (ou só as subárvores de `prefixes`) em `dest_dir`
+    com pastas reais e hardlinks dos arquivos, sem copiar o conteúdo.
+    .npy já existentes na origem não são espelhados. Retorna as imagens espelhadas.
+    """
+    roots = [p.strip("/") for p in prefixes] if prefixes else [""]
+    images = []
+    for root_rel in roots:
+        source_root = os.path.join(source_dir, root_rel)
+        for root, dirs, files in os.walk(source_root):
+            dirs.sort()
+            target_root = os.path.join(dest_dir, os.path.relpath(root, source_dir))
+            os.makedirs(target_root, exist_ok=True)
+            for name in sorted(files):
+                if name.lower().endswith(".npy"):
+                    continue
+                target = os.path.join(target_root, name)
+                _link_or_copy(os.path.join(root, name), target)
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    images.append(target)
+    return images
+
+
+def decode_images(images, image_size, mode, workers=None):
+    """
+    Grava o .npy reduzido ao lado de cada imagem, num pool de threads (o PIL
+    libera o GIL na decodificação). Imagens que o PIL não abre ficam sem .npy
+    (o Ultralytics as trata como antes). Retorna o total de bytes gravados.
+    """
+    def decode_one(path):
+        try:
+            array = decode_resized(path, image_size, mode)
+        except Exception as e:
+            print(f"AVISO: não foi possível pré-decodificar {path}: {e}")
+            return 0
+        target = npy_path(path)
+        partial_path = target + ".partial.npy"
+        np.save(partial_path, array, allow_pickle=False)
+        os.replace(partial_path, target)
+        return os.path.getsize(target)
+
+    workers = workers or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(decode_one, images))
+
+
+def list_npy(view_dir):
+    files = []
+    for root, _, names in os.walk(view_dir):
+        files.extend(os.path.join(root, name) for name in names if name.endswith(".npy"))
+    return files
+
+
+def pack_npy(view_dir, archive_path):
+    """Compacta só os .npy da visão (o resto são os arquivos originais do dataset)."""
+    partial_path = archive_path + ".partial"
+    with zipfile.ZipFile(partial_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zip_ref:
+        for path in list_npy(view_dir):
+            zip_ref.write(path, os.path.relpath(path, view_dir))
+    os.replace(partial_path, archive_path)
+    return archive_path
+
+
+def unpack_npy(archive_path, view_dir, images):
+    """
+    Restaura os .npy de um pacote gerado por `pack_npy` numa visão já espelhada.
+    Retorna False (sem restaurar nada) se o pacote não corresponder às imagens.
+    """
+    expected = {os.path.relpath(npy_path(path), view_dir) for path in images}
+    with zipfile.ZipFile(archive_path, "r") as zip_ref:
+        names = set(zip_ref.namelist())
+        if not names or not names <= expected:
+            return False
+        zip_ref.extractall(view_dir)
+    return True
@@ -0,0 +1,42 @@
+# utils/process_tree.py
+import os
+import signal
+
+
+def process_tree(pid):
+    """O processo e os seus descendentes (ex: workers do dataloader), lidos do /proc."""
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children", "r") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def tree_rss_mb(pid):
+    """Memória residente do processo e dos seus descendentes (0 sem /proc)."""
+    if not os.path.isdir("/proc"):
+        return 0.0
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for current in process_tree(pid):
+        try:
+            with open(f"/proc/{current}/statm", "r") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            pass
+    return total / (1024 ** 2)
+
+
+def kill_tree(pid):
+    """SIGKILL nos descendentes e depois no processo."""
+    for current in reversed(process_tree(pid)):
+        try:
+            os.kill(current, getattr(signal, "SIGKILL", signal.SIGTERM))
+        except OSError:
+            pass
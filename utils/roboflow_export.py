@@ -0,0 +1,199 @@
+# utils/roboflow_export.py
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import mlflow
+import yaml
+from mlflow.tracking import MlflowClient
+from utils import dataset_cache, dataset_upload, zip_extract, tracking, instrumentation
+
+# Tag das runs de snapshot: a chave da exportação (workspace, projeto, versão, formato).
+EXPORT_TAG = "roboflow_export"
+SNAPSHOT_ARTIFACT_DIR = "dataset"
+DEFAULT_SNAPSHOT_EXPERIMENT = "Datasets"
+# "modulo:funcao" que recebe a api_key e retorna um cliente com a interface do
+# SDK (workspace().project().version().download()), ex: o tests/fake_roboflow.py.
+CLIENT_ENV_VAR = "MLFLOW_ROBOFLOW_CLIENT"
+DATA_SPLIT_KEYS = ("train", "val", "test")
+
+
+def export_identity(data_config):
+    return {
+        "workspace": data_config['roboflow_workspace'],
+        "project": data_config['roboflow_project'],
+        "version": str(data_config['roboflow_version']),
+        "format": data_config.get('download_format', 'yolov8'),
+    }
+
+
+def export_key(identity):
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+def default_client(api_key):
+    # Import tardio: o SDK do Roboflow só é necessário quando a exportação é baixada.
+    from roboflow import Roboflow
+    return Roboflow(api_key=api_key)
+
+
+def resolve_client_factory(client_factory=None):
+    """`client_factory` explícito, o de MLFLOW_ROBOFLOW_CLIENT ou o SDK do Roboflow."""
+    if client_factory is not None:
+        return client_factory
+    spec = os.environ.get(CLIENT_ENV_VAR)
+    if not spec:
+        return default_client
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def download_export(data_config, identity, location, client_factory=None):
+    """Baixa a exportação do Roboflow em `location` e deixa o data.yaml com caminhos relativos."""
+    print(f">>> Baixando o dataset do Roboflow ({identity['workspace']}/{identity['project']}/{identity['version']})...")
+    client = resolve_client_factory(client_factory)(data_config.get('roboflow_api_key'))
+    version = client.workspace(identity['workspace']).project(identity['project']).version(identity['version'])
+    dataset = version.download(identity['format'], location=location, overwrite=True)
+    relativize_data_yaml(os.path.join(dataset.location, "data.yaml"))
+    return dataset.location
+
+
+def relativize_data_yaml(data_yaml_path):
+    """
+    O SDK grava os caminhos absolutos do download no data.yaml. Relativos à
+    pasta do data.yaml (onde o Ultralytics os procura), a exportação continua
+    válida em outra pasta ou máquina, inclusive dentro de um snapshot.
+    """
+    if not os.path.exists(data_yaml_path):
+        return
+    with open(data_yaml_path, "r") as f:
+        content = yaml.safe_load(f) or {}
+    base_dir = os.path.dirname(os.path.abspath(data_yaml_path))
+    changed = False
+    for key in DATA_SPLIT_KEYS:
+        value = content.get(key)
+        if isinstance(value, str) and os.path.isabs(value) and value.startswith(base_dir + os.sep):
+            content[key] = os.path.relpath(value, base_dir)
+            changed = True
+    if changed:
+        with open(data_yaml_path, "w") as f:
+            yaml.safe_dump(content, f, sort_keys=False, allow_unicode=True)
+
+
+def find_snapshot(key, client, experiment_name=DEFAULT_SNAPSHOT_EXPERIMENT):
+    """Run finalizada com o snapshot da exportação `key` no servidor, ou None."""
+    try:
+        experiment = client.get_experiment_by_name(experiment_name)
+        if experiment is None:
+            return None
+        runs = client.search_runs(
+            [experiment.experiment_id],
+            filter_string=f"tags.{EXPORT_TAG} = '{key}' and attributes.status = 'FINISHED'",
+            order_by=["attributes.start_time ASC"],
+            max_results=1,
+        )
+    except Exception as e:
+        print(f"AVISO: não foi possível procurar snapshots do Roboflow no servidor: {e}")
+        return None
+    return runs[0] if runs else None
+
+
+def restore_snapshot(run, export_dir, client):
+    """Baixa o .zip do snapshot e o extrai em `export_dir`. Retorna False se falhar."""
+    folder_name = os.path.basename(export_dir)
+    artifact_path = f"{SNAPSHOT_ARTIFACT_DIR}/{folder_name}.zip"
+    print(f">>> Baixando o snapshot da exportação do servidor MLflow (Run ID: {run.info.run_id})...")
+    download_dir = os.path.join(os.path.dirname(export_dir), "download")
+    try:
+        archive_path = client.download_artifacts(run.info.run_id, artifact_path, download_dir)
+        zip_extract.extract_members(archive_path, os.path.dirname(export_dir), prefixes=[folder_name])
+        return os.path.exists(os.path.join(export_dir, "data.yaml"))
+    except Exception as e:
+        print(f"AVISO: falha ao restaurar o snapshot ({e}); baixando do Roboflow.")
+        shutil.rmtree(export_dir, ignore_errors=True)
+        os.makedirs(export_dir)
+        return False
+    finally:
+        shutil.rmtree(download_dir, ignore_errors=True)
+
+
+def register_snapshot(export_dir, identity, key, client, experiment_name=DEFAULT_SNAPSHOT_EXPERIMENT):
+    """
+    Registra a exportação como um dataset do MLflow (o mesmo formato do
+    `register_dataset.py --upload_mode pack`), numa run própria do experimento
+    de datasets. Retorna o run_id do snapshot, ou None se o registro falhar.
+    """
+    folder_name = os.path.basename(export_dir)
+    pack_dir = os.path.join(os.path.dirname(export_dir), "upload")
+    run_id = None
+    try:
+        experiment_id = tracking.prepare_experiment(experiment_name, tracking_uri=tracking.server_uri())
+        if experiment_id is None:
+            return None
+        archive_path = dataset_upload.pack_folder(export_dir, os.path.join(pack_dir, f"{folder_name}.zip"))
+        tags = {EXPORT_TAG: key, "description": "Snapshot de exportação do Roboflow"}
+        tags.update({f"roboflow_{name}": value for name, value in identity.items()})
+        run = client.create_run(experiment_id, run_name=f"roboflow-{folder_name}-{identity['format']}", tags=tags)
+        run_id = run.info.run_id
+        print(f"Registrando o snapshot da exportação no MLflow (Run ID: {run_id})...")
+        for name, value in identity.items():
+            client.log_param(run_id, f"roboflow_{name}", value)
+        client.log_artifact(run_id, archive_path, SNAPSHOT_ARTIFACT_DIR)
+        client.set_terminated(run_id)
+    except Exception as e:
+        print(f"AVISO: não foi possível registrar o snapshot do Roboflow no MLflow: {e}")
+        if run_id is not None:
+            client.set_terminated(run_id, status="FAILED")
+        return None
+    finally:
+        shutil.rmtree(pack_dir, ignore_errors=True)
+    print(f"  dataset_run_id: \"{run_id}\"")
+    print(f"  dataset_artifact_path: \"{SNAPSHOT_ARTIFACT_DIR}/{folder_name}.zip\"")
+    print(f"  data_yaml_relative_path: \"{folder_name}/data.yaml\"")
+    return run_id
+
+
+@instrumentation.stage("dataset_download")
+def get_data_yaml_path(data_config, base_download_dir, client_factory=None):
+    """
+    Retorna o data.yaml da exportação do Roboflow da config. Com `use_cache`
+    (padrão), a exportação fica no cache local, uma por (workspace, projeto,
+    versão, formato), e é reaproveitada pelas runs seguintes sem chamar a API.
+    Com `roboflow_register: true`, a primeira exportação baixada do Roboflow
+    é registrada no MLflow como um snapshot, e máquinas sem a exportação no
+    cache baixam esse snapshot em vez de chamar o Roboflow.
+    """
+    identity = export_identity(data_config)
+    folder_name = f"{identity['project']}-{identity['version']}"
+
+    if not data_config.get('use_cache', True):
+        # Sem cache, a exportação vai para o diretório temporário da run (não para o diretório atual).
+        location = os.path.join(base_download_dir, "roboflow", folder_name)
+        return os.path.join(download_export(data_config, identity, location, client_factory), "data.yaml")
+
+    key = export_key(identity)
+    experiment_name = data_config.get('roboflow_snapshot_experiment', DEFAULT_SNAPSHOT_EXPERIMENT)
+    client = MlflowClient(tracking.server_uri())
+    snapshot = {}
+
+    register = data_config.get('roboflow_register', False)
+
+    def restore(export_dir):
+        snapshot["run"] = find_snapshot(key, client, experiment_name)
+        return snapshot["run"] is not None and restore_snapshot(snapshot["run"], export_dir, client)
+
+    def download(export_dir):
+        download_export(data_config, identity, export_dir, client_factory)
+
+    cache = dataset_cache.get_cache(data_config)
+    export_dir, source = cache.roboflow_export(key, folder_name, download, restore=restore if register else None)
+
+    snapshot_run_id = snapshot["run"].info.run_id if snapshot.get("run") else None
+    if source == "roboflow" and register:
+        snapshot_run_id = register_snapshot(export_dir, identity, key, client, experiment_name)
+    if mlflow.active_run() is not None:
+        mlflow.log_param("roboflow_source", source)
+        if snapshot_run_id:
+            mlflow.set_tag("roboflow_snapshot_run_id", snapshot_run_id)
+    return os.path.join(export_dir, "data.yaml")
@@ -0,0 +1,199 @@
+# utils/tabular.py
+import time
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from utils import zip_extract
+from utils.instrumentation import peak_rss_mb
+
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+FEATHER_EXTENSIONS = (".feather", ".arrow")
+
+
+def _is_text(series):
+    return not (
+        pd.api.types.is_numeric_dtype(series)
+        or pd.api.types.is_bool_dtype(series)
+        or isinstance(series.dtype, pd.CategoricalDtype)
+    )
+
+
+def compact_frame(df, category_columns=None, category_max_ratio=0.5):
+    """
+    Reduz os tipos no próprio DataFrame: inteiros e floats para o menor tipo
+    que comporta os valores (floats viram float32, o tipo usado pelas árvores
+    do scikit-learn) e textos repetitivos para 'category'. `category_columns`
+    força as colunas categóricas (ex: as escolhidas no primeiro bloco do CSV).
+    """
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            df[col] = pd.to_numeric(series, downcast="float")
+        elif _is_text(series):
+            if category_columns is not None:
+                if col in category_columns:
+                    df[col] = series.astype("category")
+            elif series.nunique(dropna=True) <= category_max_ratio * max(len(series), 1):
+                df[col] = series.astype("category")
+    return df
+
+
+def _concat_chunks(chunks):
+    """Junta os blocos sem perder os tipos compactos das colunas categóricas."""
+    if len(chunks) == 1:
+        return chunks[0]
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            columns[col] = pd.Series(union_categoricals(parts, ignore_order=True))
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def _compact_chunks(frames, category_max_ratio=0.5):
+    """Compacta cada bloco assim que é lido; as colunas categóricas são decididas no primeiro."""
+    chunks = []
+    category_columns = None
+    for chunk in frames:
+        chunk = compact_frame(chunk.reset_index(drop=True), category_columns, category_max_ratio)
+        if category_columns is None:
+            category_columns = {c for c in chunk.columns if isinstance(chunk[c].dtype, pd.CategoricalDtype)}
+        chunks.append(chunk)
+    return _concat_chunks(chunks)
+
+
+def _read_arrow_columns(source, is_parquet, category_max_ratio=0.5):
+    """
+    Lê Parquet/Feather uma coluna por vez (via pyarrow, o mesmo motor do
+    pandas), compactando cada uma antes de ler a próxima.
+    """
+    import pyarrow as pa
+    from pyarrow import feather, ipc
+    import pyarrow.parquet as pq
+
+    if is_parquet:
+        parquet_file = pq.ParquetFile(source)
+        names = parquet_file.schema_arrow.names
+        read_column = lambda name: parquet_file.read(columns=[name])
+    elif isinstance(source, str):
+        names = ipc.open_file(pa.memory_map(source)).schema.names
+        read_column = lambda name: feather.read_table(source, columns=[name], memory_map=True)
+    else:
+        # Dentro do .zip não dá para pular até cada coluna sem descompactar
+        # tudo de novo: lê a tabela Arrow uma vez e converte coluna a coluna.
+        table = feather.read_table(source)
+        names = table.column_names
+        read_column = lambda name: table.select([name])
+
+    columns = {}
+    for name in names:
+        column = compact_frame(read_column(name).to_pandas(), category_max_ratio=category_max_ratio)
+        columns[name] = column[name]
+    return pd.DataFrame(columns)
+
+
+def read_table(data_path, zip_member=None, compact=True, chunksize=100000, category_max_ratio=0.5):
+    """
+    Lê uma tabela .csv, .parquet ou .feather, do disco ou direto de dentro do
+    .zip. Com `compact`, o CSV é lido em blocos de `chunksize` linhas e os
+    formatos colunares uma coluna por vez, já compactados, então o pico de
+    memória fica perto do tamanho final da tabela e não do tamanho com os
+    tipos padrão (int64/float64/texto).
+    """
+    name = (zip_member or data_path).lower()
+    is_parquet = name.endswith(PARQUET_EXTENSIONS)
+    is_arrow = is_parquet or name.endswith(FEATHER_EXTENSIONS)
+    source = zip_extract.open_member(data_path, zip_member) if zip_member is not None else data_path
+    try:
+        if not compact:
+            if is_parquet:
+                return pd.read_parquet(source)
+            return pd.read_feather(source) if is_arrow else pd.read_csv(source)
+        if is_arrow:
+            return _read_arrow_columns(source, is_parquet, category_max_ratio)
+        return _compact_chunks(pd.read_csv(source, chunksize=chunksize), category_max_ratio)
+    finally:
+        if zip_member is not None:
+            source.close()
+
+
+def to_memmap(df, target_column, path, seed=None):
+    """
+    Grava as features num array float32 em disco (np.memmap), com as linhas
+    já embaralhadas: a divisão treino/teste passa a ser um corte contíguo
+    (sem cópia) e o modelo lê as features direto do arquivo mapeado.
+    Colunas categóricas viram os seus códigos inteiros.
+
+    Retorna (X, y, nomes_das_features, categorias_por_coluna).
+    """
+    feature_names = [c for c in df.columns if c != target_column]
+    order = np.random.default_rng(seed).permutation(len(df))
+
+    X = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(len(df), len(feature_names)))
+    categories = {}
+    # Coluna a coluna: só uma coluna temporária por vez fica na memória.
+    for j, col in enumerate(feature_names):
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories[col] = [str(c) for c in series.cat.categories]
+            values = series.cat.codes.to_numpy()
+        elif _is_text(series):
+            raise ValueError(f"A coluna '{col}' não é numérica nem categórica; aumente 'category_max_ratio' ou remova-a.")
+        else:
+            values = series.to_numpy(dtype=np.float32, na_value=np.nan)
+        X[:, j] = values[order]
+    X.flush()
+
+    y = df[target_column].to_numpy()[order]
+    return X, y, feature_names, categories
+
+
+def encode_features(df, feature_names, categories):
+    """
+    Codifica uma tabela nova como o to_memmap codificou a de treino (float32;
+    colunas categóricas pelos códigos de `categories`, valores novos viram -1).
+    """
+    missing = [col for col in feature_names if col not in df.columns]
+    if missing:
+        raise ValueError(f"Colunas ausentes na tabela: {missing}")
+    X = np.empty((len(df), len(feature_names)), dtype=np.float32)
+    for j, col in enumerate(feature_names):
+        series = df[col]
+        if col in categories:
+            X[:, j] = pd.Categorical(series.astype(str), categories=categories[col]).codes
+        else:
+            X[:, j] = series.to_numpy(dtype=np.float32, na_value=np.nan)
+    return X
+
+
+def split_views(X, y, test_size=0.2):
+    """Divide arrays já embaralhados em treino/teste por fatias (views, sem cópia)."""
+    n_test = int(np.ceil(len(X) * test_size))
+    n_train = len(X) - n_test
+    return X[:n_train], X[n_train:], y[:n_train], y[n_train:]
+
+
+def load_stats(df, seconds):
+    stats = {
+        "data_rows": len(df),
+        "data_columns": df.shape[1],
+        "data_memory_mb": df.memory_usage(deep=True).sum() / (1024 ** 2),
+        "data_load_seconds": seconds,
+    }
+    peak = peak_rss_mb()
+    if peak is not None:
+        stats["data_peak_rss_mb"] = peak
+    return stats
+
+
+def timed_read(data_path, zip_member=None, **kwargs):
+    """read_table + estatísticas de carga (tempo, memória da tabela e pico de RSS)."""
+    start = time.perf_counter()
+    df = read_table(data_path, zip_member, **kwargs)
+    return df, load_stats(df, time.perf_counter() - start)
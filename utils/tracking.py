@@ -0,0 +1,158 @@
+# utils/tracking.py
+import mlflow
+import os
+import json
+import time
+from mlflow.tracking import MlflowClient
+
+DEFAULT_TRACKING_URI = "http://172.100.11.45:5000"
+DEFAULT_ARTIFACT_ROOT = "s3://mlflow"
+DEFAULT_OFFLINE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mlflow_offline")
+EXPERIMENT_CACHE_TTL = 3600
+OFFLINE_RUN_TAG = "offline_run_id"
+
+
+def server_uri():
+    """
+    Endereço do servidor MLflow. No modo offline o MLflow troca a variável
+    MLFLOW_TRACKING_URI pelo diário local, então o endereço original fica
+    guardado em MLFLOW_SERVER_URI (herdado pelos subprocessos).
+    """
+    return os.environ.get("MLFLOW_SERVER_URI") or os.environ.get("MLFLOW_TRACKING_URI", DEFAULT_TRACKING_URI)
+
+
+def offline_dir():
+    return os.environ.get("MLFLOW_OFFLINE_DIR", DEFAULT_OFFLINE_DIR)
+
+
+def offline_uri():
+    """O diário local é um store SQLite do próprio MLflow (escrita em disco local)."""
+    return f"sqlite:///{os.path.abspath(os.path.join(offline_dir(), 'journal.db'))}"
+
+
+def tracking_mode(config=None):
+    """'online' (padrão) ou 'offline'; a variável MLFLOW_TRACKING_MODE tem prioridade sobre a config."""
+    tracking_config = (config or {}).get('tracking') or {}
+    return os.environ.get("MLFLOW_TRACKING_MODE", tracking_config.get('mode', 'online'))
+
+
+def configure(config=None):
+    """
+    Define para onde vão as chamadas de rastreamento da run. No modo offline
+    tudo é gravado no diário local e enviado ao servidor depois pelo sync.py.
+    Com `tracking: {http_pool_size}`, ajusta o pool de conexões HTTP que o
+    MLflow reaproveita entre as chamadas (deve ser definido antes da primeira).
+    Retorna o modo em uso.
+    """
+    tracking_config = (config or {}).get('tracking') or {}
+    if tracking_config.get('http_pool_size'):
+        os.environ.setdefault("MLFLOW_HTTP_POOL_MAXSIZE", str(tracking_config['http_pool_size']))
+
+    mode = tracking_mode(config)
+    if mode == 'offline':
+        os.environ["MLFLOW_SERVER_URI"] = server_uri()
+        os.makedirs(offline_dir(), exist_ok=True)
+        mlflow.set_tracking_uri(offline_uri())
+        print(f"Modo offline: rastreamento gravado em {offline_dir()}. Envie ao servidor com 'python sync.py'.")
+    elif mode == 'online':
+        mlflow.set_tracking_uri(server_uri())
+    else:
+        raise ValueError(f"Modo de rastreamento desconhecido: '{mode}'. Use 'online' ou 'offline'.")
+    return mode
+
+
+def artifact_location(experiment_name, tracking_uri):
+    if tracking_uri == offline_uri():
+        return os.path.join(offline_dir(), "artifacts", experiment_name)
+    root = os.environ.get("MLFLOW_ARTIFACT_ROOT", DEFAULT_ARTIFACT_ROOT)
+    return f"{root.rstrip('/')}/{experiment_name}"
+
+
+def _experiment_cache_path():
+    return os.path.join(offline_dir(), "experiments.json")
+
+
+def _read_experiment_cache():
+    try:
+        with open(_experiment_cache_path(), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_experiment_cache(cache):
+    path = _experiment_cache_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+
+def forget_experiment(experiment_name, tracking_uri=None):
+    """Remove o experimento do cache de IDs. Retorna True se ele estava lá."""
+    key = f"{tracking_uri or mlflow.get_tracking_uri()}|{experiment_name}"
+    cache = _read_experiment_cache()
+    if cache.pop(key, None) is None:
+        return False
+    _write_experiment_cache(cache)
+    return True
+
+
+def prepare_experiment(experiment_name, tracking_uri=None):
+    """
+    Garante que o experimento existe e está ativo e retorna o seu ID, ou None
+    se ele estiver na lixeira. O ID fica em cache em disco por
+    EXPERIMENT_CACHE_TTL segundos, evitando consultar o servidor a cada run.
+    """
+    tracking_uri = tracking_uri or mlflow.get_tracking_uri()
+    key = f"{tracking_uri}|{experiment_name}"
+    cache = _read_experiment_cache()
+    cached = cache.get(key)
+    if cached and time.time() - cached["time"] < EXPERIMENT_CACHE_TTL:
+        return cached["id"]
+
+    client = MlflowClient(tracking_uri)
+    experiment = client.get_experiment_by_name(experiment_name)
+
+    if experiment is None:
+        # Se NÃO existe, criamos com um caminho de artefato legível
+        print(f"Experimento '{experiment_name}' não encontrado. Criando um novo...")
+        location = artifact_location(experiment_name, tracking_uri)
+        try:
+            experiment_id = client.create_experiment(experiment_name, artifact_location=location)
+            print(f"Novo experimento criado com local de artefato: {location}")
+        except mlflow.exceptions.MlflowException as e:
+            print(f"Erro ao criar experimento (pode já existir): {e}")
+            experiment_id = client.get_experiment_by_name(experiment_name).experiment_id
+
+    elif experiment.lifecycle_stage == 'deleted':
+        # SE EXISTIR, MAS ESTIVER DELETADO
+        print(f"ERRO: O experimento '{experiment_name}' existe, mas está na lixeira.")
+        print("Por favor, acesse a UI do MLflow, vá para a aba 'Experiments',")
+        print("e 'Restaure' o experimento ou 'Delete Permanentemente' para recriá-lo.")
+        return None
+
+    else:
+        experiment_id = experiment.experiment_id
+
+    cache = _read_experiment_cache()
+    cache[key] = {"id": experiment_id, "time": time.time()}
+    _write_experiment_cache(cache)
+    return experiment_id
+
+
+def start_run(experiment_name, experiment_id, **kwargs):
+    """
+    mlflow.start_run no experimento `experiment_id`. Se o ID veio do cache e
+    não vale mais (experimento apagado e recriado), consulta o servidor de novo.
+    """
+    try:
+        return mlflow.start_run(experiment_id=experiment_id, **kwargs)
+    except mlflow.exceptions.MlflowException:
+        if not forget_experiment(experiment_name):
+            raise
+        experiment_id = prepare_experiment(experiment_name)
+        if experiment_id is None:
+            raise
+        return mlflow.start_run(experiment_id=experiment_id, **kwargs)
@@ -0,0 +1,147 @@
+# utils/zip_extract.py
+import mlflow
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+def select_members(archive_path, prefixes=None):
+    """
+    Lista os membros do .zip que começam com algum dos `prefixes`
+    (ex: "rock-paper-scissors-14/"). Sem prefixos, seleciona todos.
+    Só o diretório central do .zip é lido.
+    """
+    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+        infos = [info for info in zip_ref.infolist() if not info.is_dir()]
+    if not prefixes:
+        return infos
+    normalized = [p.strip("/") for p in prefixes]
+    return [
+        info for info in infos
+        if any(info.filename == p or info.filename.startswith(p + "/") for p in normalized)
+    ]
+
+
+def _split_balanced(infos, n_parts):
+    """Distribui os membros entre os workers equilibrando o tamanho comprimido."""
+    parts = [[] for _ in range(n_parts)]
+    loads = [0] * n_parts
+    for info in sorted(infos, key=lambda i: i.compress_size, reverse=True):
+        idx = loads.index(min(loads))
+        parts[idx].append(info.filename)
+        loads[idx] += info.compress_size
+    return [p for p in parts if p]
+
+
+def _member_dir(dest_dir, name):
+    """Pasta onde o ZipFile.extract grava o membro (com a mesma limpeza de '..' e '.')."""
+    parts = [p for p in name.split("/")[:-1] if p not in ("", ".", "..")]
+    return os.path.join(dest_dir, *parts)
+
+
+def _make_parent_dirs(dest_dir, names):
+    # O ZipFile.extract cria a pasta do membro sem exist_ok: dois workers
+    # extraindo arquivos da mesma pasta nova disputariam a criação e um deles
+    # falharia com FileExistsError. As pastas são criadas antes, numa só thread.
+    for directory in {_member_dir(dest_dir, name) for name in names}:
+        os.makedirs(directory, exist_ok=True)
+
+
+def _extract_names(archive_path, dest_dir, names):
+    # Cada worker abre o próprio handle do .zip: ZipFile não é seguro para leitura
+    # concorrente no mesmo objeto, mas handles separados são independentes.
+    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+        for name in names:
+            zip_ref.extract(name, dest_dir)
+    return len(names)
+
+
+def extract_members(archive_path, dest_dir, prefixes=None, workers=None, use_processes=False):
+    """
+    Extrai do .zip apenas os membros necessários, espalhando a descompressão
+    por um pool de threads (padrão; o zlib libera o GIL) ou de processos.
+
+    Retorna um dicionário com as estatísticas da extração.
+    """
+    infos = select_members(archive_path, prefixes)
+    if prefixes and not infos:
+        raise FileNotFoundError(f"Nenhum membro do .zip corresponde a {prefixes} em {archive_path}")
+
+    workers = workers or min(8, os.cpu_count() or 1)
+    parts = _split_balanced(infos, workers)
+    total_bytes = sum(info.file_size for info in infos)
+
+    start = time.perf_counter()
+    _make_parent_dirs(dest_dir, [info.filename for info in infos])
+    if len(parts) <= 1:
+        for names in parts:
+            _extract_names(archive_path, dest_dir, names)
+    else:
+        executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with executor_cls(max_workers=len(parts)) as executor:
+            futures = [executor.submit(_extract_names, archive_path, dest_dir, names) for names in parts]
+            for future in futures:
+                future.result()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    stats = {
+        "extract_files": len(infos),
+        "extract_bytes": total_bytes,
+        "extract_seconds": elapsed,
+        "extract_mb_per_s": total_bytes / (1024 ** 2) / elapsed,
+        "extract_files_per_s": len(infos) / elapsed,
+    }
+    print(
+        f"Extraídos {stats['extract_files']} arquivos ({total_bytes / (1024 ** 2):.1f} MB) "
+        f"em {elapsed:.2f}s: {stats['extract_mb_per_s']:.1f} MB/s, "
+        f"{stats['extract_files_per_s']:.0f} arquivos/s ({len(parts)} workers)."
+    )
+    return stats
+
+
+def open_member(archive_path, member):
+    """
+    Abre um membro do .zip para leitura em streaming, sem gravá-lo no disco.
+    O objeto retornado fecha também o .zip ao ser fechado.
+    """
+    zip_ref = zipfile.ZipFile(archive_path, 'r')
+    try:
+        member_file = zip_ref.open(member.strip("/"))
+    except KeyError:
+        zip_ref.close()
+        raise FileNotFoundError(f"Membro '{member}' não encontrado em {archive_path}")
+
+    original_close = member_file.close
+
+    def close():
+        original_close()
+        zip_ref.close()
+
+    member_file.close = close
+    return member_file
+
+
+def member_size(archive_path, member):
+    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+        return zip_ref.getinfo(member.strip("/")).file_size
+
+
+def required_prefixes(data_config, relative_key, is_dir=False):
+    """
+    Deduz qual subárvore do .zip a config realmente usa. `extract_members` na
+    config tem precedência; senão usa a pasta de `relative_key`
+    (ex: a pasta do data.yaml ou a `data_root_relative_path`).
+    """
+    if 'extract_members' in data_config:
+        return data_config['extract_members'] or None
+    relative = data_config.get(relative_key)
+    if not relative:
+        return None
+    root = relative.strip("/") if is_dir else os.path.dirname(relative.strip("/"))
+    return [root] if root else None
+
+
+def log_throughput(stats):
+    if mlflow.active_run() is not None:
+        mlflow.log_metrics(stats)
@@ -0,0 +1,596 @@
+import yaml
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import sys
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
+from utils import dataset_cache, hashing, process_tree, tracking
+
+DEFAULT_QUEUE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mlflow_queue")
+QUEUE_STATES = ("pending", "running", "done", "failed")
+CONFIG_EXTENSIONS = (".yaml", ".yml")
+
+# Valores padrão do worker (a linha de comando tem prioridade).
+WORKER_DEFAULTS = {
+    'max_parallel': 1,             # runs simultâneas (um processo "quente" por run)
+    'cpus': None,                  # CPUs do worker (padrão: as disponíveis ao processo)
+    'memory_gb': None,             # memória reservável (padrão: a RAM da máquina)
+    'job_cpus': None,              # reserva padrão de um job (padrão: cpus / max_parallel)
+    'job_memory_gb': None,         # idem para a memória
+    'poll_interval': 2.0,          # segundos entre as leituras da fila
+    'status_interval': 30.0,       # segundos entre os envios de status ao MLflow
+    'max_jobs_per_process': 20,    # o processo é recriado após N jobs (libera memória acumulada)
+    'preload': [],                 # trainer_types importados ao criar cada processo
+    'prefetch': True,              # baixa datasets e lê os pesos dos jobs que ainda esperam na fila
+    'enforce_memory': True,        # encerra o job cujo processo (e filhos) passa da memória reservada
+    'experiment_name': "Workers",  # experimento das runs de status dos workers
+}
+
+
+def queue_paths(queue_dir):
+    paths = {state: os.path.join(queue_dir, state) for state in QUEUE_STATES}
+    for path in paths.values():
+        os.makedirs(path, exist_ok=True)
+    return paths
+
+
+def submit(queue_dir, config_path, force=False):
+    """
+    Coloca uma config na fila. O nome do arquivo começa pelo horário de envio,
+    então a ordem alfabética de `pending/` é a ordem de chegada.
+    """
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+    submitted_at = time.time()
+    config['queue'] = dict(config.get('queue') or {}, submitted_at=submitted_at, force=force)
+
+    pending_dir = queue_paths(queue_dir)['pending']
+    base_name = os.path.splitext(os.path.basename(config_path))[0]
+    name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(submitted_at))}_{uuid.uuid4().hex[:8]}_{base_name}.yaml"
+    partial_path = os.path.join(pending_dir, f".{name}.partial")
+    with open(partial_path, "w") as f:
+        yaml.safe_dump(config, f, sort_keys=False, allow_unicode=True)
+    os.replace(partial_path, os.path.join(pending_dir, name))
+    print(f"Job '{name}' colocado na fila {queue_dir}.")
+    return name
+
+
+def pending_jobs(pending_dir):
+    """Configs esperando na fila, na ordem de chegada (configs copiadas à mão contam pelo mtime)."""
+    jobs = []
+    for name in os.listdir(pending_dir):
+        if name.startswith(".") or not name.endswith(CONFIG_EXTENSIONS):
+            continue
+        try:
+            jobs.append((os.path.getmtime(os.path.join(pending_dir, name)), name))
+        except OSError:
+            continue  # pego por outro worker
+    return [name for _, name in sorted(jobs)]
+
+
+def load_job(path):
+    with open(path, "r") as f:
+        config = yaml.safe_load(f)
+    if not isinstance(config, dict) or 'trainer_type' not in config:
+        raise ValueError("O arquivo não é uma config de treino (falta 'trainer_type').")
+    return config
+
+
+def job_resources(config, options):
+    """Reserva do job: `resources: {cpus, memory_gb}` na config ou o padrão do worker."""
+    resources = config.get('resources') or {}
+    return int(resources.get('cpus', options['job_cpus'])), float(resources.get('memory_gb', options['job_memory_gb']))
+
+
+def write_status(path, status):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(status, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def requeue_orphans(paths):
+    """Devolve à fila os jobs de workers desta máquina que morreram no meio da run."""
+    host = socket.gethostname()
+    for name in os.listdir(paths['running']):
+        if not name.endswith(".claim.json"):
+            continue
+        claim_path = os.path.join(paths['running'], name)
+        try:
+            with open(claim_path, "r") as f:
+                claim = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if claim.get('host') != host or _pid_alive(claim.get('pid', 0)):
+            continue
+        job_name = name[:-len(".claim.json")]
+        try:
+            os.replace(os.path.join(paths['running'], job_name), os.path.join(paths['pending'], job_name))
+            print(f"Job '{job_name}' do worker {claim.get('worker_id')} (encerrado) devolvido à fila.")
+        except FileNotFoundError:
+            pass
+        os.remove(claim_path)
+
+
+# --- processos "quentes" que executam os jobs ---
+
+def _process_loop(tasks, results, preload, max_jobs):
+    """
+    Processo "quente" que executa os jobs: os imports pesados (MLflow,
+    trainers, Ultralytics/torch, sklearn) ficam carregados entre os jobs. Não
+    é daemon, então os trainers podem criar os próprios processos (dataloaders
+    do torch, joblib). Termina após `max_jobs` jobs e o worker cria outro.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import train  # noqa: F401
+    from trainers import registry
+
+    for trainer_type in preload:
+        registry.load_trainer(trainer_type)
+    for _ in range(max_jobs):
+        task = tasks.get()
+        if task is None:
+            return
+        name, job_args = task
+        try:
+            results.put((name, run_job(*job_args), None))
+        except Exception as e:
+            traceback.print_exc()
+            results.put((name, None, f"{type(e).__name__}: {e}"))
+
+
+def _limit_threads(cores):
+    """Prende o processo às CPUs reservadas ao job e ajusta as threads do torch."""
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    if cores and "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(len(cores))
+
+
+def run_job(job_path, config, cores, submitted_at, worker_id):
+    """
+    Executa um job da fila num processo quente. Os tempos de fila vão para a
+    run criada (métricas `queue_*`). Retorna o resumo do job.
+    """
+    import train
+
+    started_at = time.time()
+    all_cores = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+    _limit_threads(cores)
+    # O processo é reaproveitado entre jobs: as estatísticas do cache são por run.
+    dataset_cache.reset_stats()
+    job_name = os.path.basename(job_path)
+    run_tags = {"queue_job": job_name, "queue_worker": worker_id}
+    try:
+        run_id = train.run_experiment(config, run_tags=run_tags, force=bool((config.get('queue') or {}).get('force')))
+    finally:
+        if all_cores:
+            _limit_threads(all_cores)
+        dataset_cache.release_pins()
+    finished_at = time.time()
+
+    summary = {
+        "run_id": run_id,
+        "pid": os.getpid(),
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "queue_wait_seconds": started_at - submitted_at,
+        "run_seconds": finished_at - started_at,
+    }
+    if run_id:
+        # Runs reaproveitadas (reuse: skip) não são deste job: só a run nova recebe os tempos de fila.
+        client = MlflowClient()
+        if client.get_run(run_id).data.tags.get("queue_job") == job_name:
+            timestamp = int(finished_at * 1000)
+            client.log_batch(run_id, metrics=[
+                Metric("queue_wait_seconds", summary["queue_wait_seconds"], timestamp, 0),
+                Metric("queue_cpus_reserved", len(cores) if cores else 0, timestamp, 0),
+            ])
+    return summary
+
+
+def _prefetch(config):
+    """
+    Enquanto o job espera, baixa o dataset para o cache local e lê os pesos
+    base (que ficam no cache de páginas do sistema operacional).
+    """
+    data_config = config.get('data') or {}
+    try:
+        if 'dataset_run_id' in data_config and data_config.get('use_cache', True):
+            dataset_cache.download_dataset(data_config, None)
+        model_path = (config.get('params') or {}).get('model_name')
+        if model_path and os.path.isfile(model_path):
+            with open(model_path, "rb") as f:
+                while f.read(hashing.HASH_CHUNK_SIZE):
+                    pass
+    except Exception as e:
+        print(f"AVISO: falha ao antecipar o dataset/pesos de '{config.get('run_name')}': {e}")
+    finally:
+        # O processo do worker não usa o dataset: não impede a evicção.
+        dataset_cache.release_pins()
+
+
+class JobProcess:
+    """Um processo quente (veja _process_loop) e a sua fila de tarefas."""
+
+    def __init__(self, context, results, options):
+        self.tasks = context.Queue()
+        self.process = context.Process(
+            target=_process_loop,
+            args=(self.tasks, results, options['preload'], options['max_jobs_per_process'])
+        )
+        self.process.start()
+        self.max_jobs = options['max_jobs_per_process']
+        self.jobs = 0
+        self.job = None
+
+    def available(self):
+        return self.job is None and self.jobs < self.max_jobs and self.process.is_alive()
+
+    def start(self, name, job_args):
+        self.job = name
+        self.jobs += 1
+        self.tasks.put((name, job_args))
+
+
+class Worker:
+    """
+    Consome a fila de configs de treino: um job começa quando há um processo
+    livre (`max_parallel`) e a sua reserva de CPUs e memória cabe no que o
+    worker ainda tem livre. A fila é atendida em ordem de chegada.
+    """
+
+    def __init__(self, queue_dir, options):
+        self.paths = queue_paths(queue_dir)
+        self.options = options
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.cores = available[:options['cpus']]
+        self.free_cores = list(self.cores)
+        self.memory_free = options['memory_gb']
+        self.running = {}
+        self.processes = []
+        self.results = None
+        self.finished = []
+        self.prefetched = set()
+        self.memory_errors = {}
+        self.stopping = False
+        self.status_run_id = None
+        self.status_step = 0
+        self.client = None
+
+    # --- status no MLflow ---
+
+    def start_status_run(self):
+        try:
+            self.client = MlflowClient(tracking.server_uri())
+            experiment_id = tracking.prepare_experiment(self.options['experiment_name'], tracking.server_uri())
+            if experiment_id is None:
+                return
+            run = self.client.create_run(experiment_id, run_name=f"worker_{self.worker_id}", tags={"queue_worker": self.worker_id})
+            self.status_run_id = run.info.run_id
+            self.client.log_batch(self.status_run_id, params=[
+                Param(key, str(value)) for key, value in self.options.items()
+            ])
+        except Exception as e:
+            print(f"AVISO: status do worker não será enviado ao MLflow: {e}")
+
+    def log_status(self, extra=None):
+        if self.status_run_id is None:
+            return
+        counts = {state: len(pending_jobs(self.paths[state])) for state in ("pending", "done", "failed")}
+        metrics = {
+            "worker_pending_jobs": counts["pending"],
+            "worker_running_jobs": len(self.running),
+            "worker_done_jobs": counts["done"],
+            "worker_failed_jobs": counts["failed"],
+            "worker_cpus_reserved": len(self.cores) - len(self.free_cores),
+            "worker_memory_gb_reserved": self.options['memory_gb'] - self.memory_free,
+        }
+        metrics.update(extra or {})
+        timestamp = int(time.time() * 1000)
+        try:
+            self.client.log_batch(self.status_run_id, metrics=[
+                Metric(key, float(value), timestamp, self.status_step) for key, value in metrics.items()
+            ])
+            self.status_step += 1
+        except Exception as e:
+            print(f"AVISO: falha ao enviar o status do worker: {e}")
+
+    def finish_status_run(self):
+        if self.status_run_id is None:
+            return
+        try:
+            self.log_status()
+            self.client.log_dict(self.status_run_id, {"jobs": self.finished}, "worker_jobs.json")
+            self.client.set_terminated(self.status_run_id)
+        except Exception as e:
+            print(f"AVISO: falha ao finalizar a run de status do worker: {e}")
+
+    # --- agendamento ---
+
+    def claim(self, name):
+        """Move o job para `running/` (rename atômico: só um worker consegue). Retorna o caminho ou None."""
+        running_path = os.path.join(self.paths['running'], name)
+        try:
+            os.replace(os.path.join(self.paths['pending'], name), running_path)
+        except FileNotFoundError:
+            return None
+        write_status(f"{running_path}.claim.json", {
+            "worker_id": self.worker_id, "host": socket.gethostname(), "pid": os.getpid(), "claimed_at": time.time()
+        })
+        return running_path
+
+    def finish(self, name, status):
+        """Move o job para `done/` ou `failed/` com o resumo ao lado (<job>.status.json)."""
+        state = "done" if status.get("error") is None else "failed"
+        running_path = os.path.join(self.paths['running'], name)
+        target = os.path.join(self.paths[state], name)
+        if os.path.exists(running_path):
+            os.replace(running_path, target)
+        if os.path.exists(f"{running_path}.claim.json"):
+            os.remove(f"{running_path}.claim.json")
+        status = dict(status, job=name, state=state, worker_id=self.worker_id)
+        write_status(f"{target}.status.json", status)
+        self.finished.append(status)
+        return state
+
+    def fail_unclaimed(self, name, error):
+        if self.claim(name):
+            self.finish(name, {"error": error})
+            print(f"Job '{name}' rejeitado: {error}")
+
+    def process_for_job(self, context):
+        """Um processo quente livre ou, se não houver, um novo (os esgotados são encerrados)."""
+        for job_process in self.processes:
+            if job_process.available():
+                return job_process
+        for job_process in [p for p in self.processes if p.job is None]:
+            job_process.tasks.put(None)
+            job_process.process.join(timeout=10)
+            self.processes.remove(job_process)
+        job_process = JobProcess(context, self.results, self.options)
+        self.processes.append(job_process)
+        return job_process
+
+    def schedule(self, context, prefetcher):
+        """Inicia os jobs da frente da fila enquanto houver processo livre e recursos."""
+        for name in pending_jobs(self.paths['pending']):
+            if self.stopping or len(self.running) >= self.options['max_parallel']:
+                return
+            path = os.path.join(self.paths['pending'], name)
+            try:
+                config = load_job(path)
+                cpus, memory_gb = job_resources(config, self.options)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                self.fail_unclaimed(name, f"Config inválida: {e}")
+                continue
+            if cpus > len(self.cores) or memory_gb > self.options['memory_gb']:
+                self.fail_unclaimed(
+                    name, f"Reserva de {cpus} CPUs / {memory_gb:.1f} GB maior que o worker "
+                          f"({len(self.cores)} CPUs / {self.options['memory_gb']:.1f} GB)."
+                )
+                continue
+            if cpus > len(self.free_cores) or memory_gb > self.memory_free + 1e-9:
+                # Ordem de chegada: o job da frente espera os recursos e os próximos
+                # só adiantam o download do dataset.
+                if prefetcher is not None:
+                    self.prefetch_pending(prefetcher)
+                return
+
+            running_path = self.claim(name)
+            if running_path is None:
+                continue
+            cores, self.free_cores = self.free_cores[:cpus], self.free_cores[cpus:]
+            self.memory_free -= memory_gb
+            submitted_at = (config.get('queue') or {}).get('submitted_at') or os.path.getmtime(running_path)
+            print(f"Iniciando job '{name}' ({cpus} CPUs, {memory_gb:.1f} GB; {time.time() - submitted_at:.1f}s na fila).")
+            job_process = self.process_for_job(context)
+            job_process.start(name, (running_path, config, cores, submitted_at, self.worker_id))
+            self.running[name] = (job_process, cores, memory_gb)
+        if prefetcher is not None:
+            self.prefetch_pending(prefetcher)
+
+    def prefetch_pending(self, prefetcher):
+        for name in pending_jobs(self.paths['pending']):
+            if name in self.prefetched:
+                continue
+            self.prefetched.add(name)
+            try:
+                config = load_job(os.path.join(self.paths['pending'], name))
+            except Exception:
+                continue
+            prefetcher.submit(_prefetch, config)
+
+    def enforce_memory(self):
+        """
+        Encerra os jobs cuja memória residente (processo quente + filhos, ex:
+        workers do dataloader) passou da reserva, para não levar os outros
+        jobs da máquina a falta de memória. A medição é feita a cada leitura
+        da fila, então picos mais curtos que o `poll_interval` escapam.
+        """
+        for name, (job_process, _, memory_gb) in self.running.items():
+            if name in self.memory_errors or not job_process.process.is_alive():
+                continue
+            rss_mb = process_tree.tree_rss_mb(job_process.process.pid)
+            if rss_mb > memory_gb * 1024:
+                print(f"Job '{name}' usa {rss_mb:.0f} MB, acima da reserva de {memory_gb:.1f} GB: encerrando.")
+                self.memory_errors[name] = (
+                    f"Memória acima da reserva ({rss_mb:.0f} MB > {memory_gb * 1024:.0f} MB); "
+                    "aumente resources.memory_gb."
+                )
+                process_tree.kill_tree(job_process.process.pid)
+
+    def _drain_results(self):
+        results = {}
+        while True:
+            try:
+                name, summary, error = self.results.get_nowait()
+            except queue.Empty:
+                return results
+            results[name] = dict(summary or {}, error=error)
+
+    def collect(self):
+        """Recolhe os jobs terminados (ou cujo processo morreu) e devolve as suas reservas."""
+        results = self._drain_results()
+        dead = [n for n, (p, _, _) in self.running.items() if n not in results and not p.process.is_alive()]
+        if dead:
+            # O resultado pode ter chegado entre a leitura da fila e o fim do processo.
+            results.update(self._drain_results())
+        for name in dead:
+            if name not in results:
+                exit_code = self.running[name][0].process.exitcode
+                error = self.memory_errors.get(name) or f"O processo do job terminou inesperadamente (código {exit_code})."
+                results[name] = {"error": error}
+
+        for name, status in results.items():
+            if name not in self.running:
+                continue
+            job_process, cores, memory_gb = self.running.pop(name)
+            self.memory_errors.pop(name, None)
+            job_process.job = None
+            self.free_cores = sorted(self.free_cores + cores)
+            self.memory_free += memory_gb
+            if status["error"] is None and not status.get("run_id"):
+                status["error"] = "A run não pôde ser iniciada (experimento na lixeira?)."
+            state = self.finish(name, status)
+            print(f"Job '{name}' terminou: {state}" + (f" ({status['error']})" if status["error"] else f" (Run ID: {status['run_id']})."))
+            if "queue_wait_seconds" in status:
+                self.log_status({"job_queue_wait_seconds": status["queue_wait_seconds"], "job_run_seconds": status["run_seconds"]})
+
+    def stop(self, *_):
+        if self.stopping:
+            raise KeyboardInterrupt
+        print("Encerrando: nenhum job novo será iniciado; aguardando os que estão em execução (Ctrl+C de novo para abortar).")
+        self.stopping = True
+
+    def serve(self, once=False):
+        """
+        Laço principal. Com `once`, termina quando a fila esvazia; senão,
+        até receber SIGINT/SIGTERM (os jobs em execução terminam antes).
+        """
+        requeue_orphans(self.paths)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        self.start_status_run()
+        print(f"Worker {self.worker_id}: {self.options['max_parallel']} runs simultâneas, "
+              f"{len(self.cores)} CPUs, {self.options['memory_gb']:.1f} GB. Fila: {os.path.dirname(self.paths['pending'])}")
+
+        # "spawn", como no sweep.py: os processos não herdam o estado do torch/CUDA.
+        context = multiprocessing.get_context("spawn")
+        self.results = context.Queue()
+        prefetcher = ThreadPoolExecutor(max_workers=1) if self.options['prefetch'] else None
+        last_status = 0.0
+        try:
+            while True:
+                if self.options['enforce_memory']:
+                    self.enforce_memory()
+                self.collect()
+                if not self.stopping:
+                    self.schedule(context, prefetcher)
+                if not self.running and (self.stopping or (once and not pending_jobs(self.paths['pending']))):
+                    break
+                if time.time() - last_status >= self.options['status_interval']:
+                    self.log_status()
+                    last_status = time.time()
+                time.sleep(self.options['poll_interval'])
+        except KeyboardInterrupt:
+            print("Abortando os jobs em execução...")
+            for job_process in self.processes:
+                job_process.process.terminate()
+            for name in list(self.running):
+                self.running.pop(name)
+                self.finish(name, {"error": "Interrompido pelo encerramento do worker."})
+        finally:
+            for job_process in self.processes:
+                if job_process.process.is_alive():
+                    job_process.tasks.put(None)
+                job_process.process.join()
+            if prefetcher is not None:
+                prefetcher.shutdown(wait=False, cancel_futures=True)
+            self.finish_status_run()
+        print(f"Worker encerrado: {len(self.finished)} jobs processados.")
+
+
+def resolve_options(args):
+    options = dict(WORKER_DEFAULTS)
+    if args.config:
+        with open(args.config, "r") as f:
+            options.update((yaml.safe_load(f) or {}).get('worker') or {})
+    for key in ('max_parallel', 'cpus', 'memory_gb', 'job_cpus', 'job_memory_gb', 'poll_interval', 'preload'):
+        if getattr(args, key) is not None:
+            options[key] = getattr(args, key)
+
+    available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    options['cpus'] = min(int(options['cpus'] or available), available)
+    if not options['memory_gb']:
+        options['memory_gb'] = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / (1024 ** 3)
+    options['job_cpus'] = int(options['job_cpus'] or max(1, options['cpus'] // options['max_parallel']))
+    options['job_memory_gb'] = float(options['job_memory_gb'] or options['memory_gb'] / options['max_parallel'])
+    return options
+
+
+def print_queue(queue_dir):
+    paths = queue_paths(queue_dir)
+    for state in QUEUE_STATES:
+        jobs = pending_jobs(paths[state])
+        print(f"{state}: {len(jobs)}")
+        if state in ("pending", "running"):
+            for name in jobs:
+                print(f"  {name}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Worker de longa duração que executa as configs de treino de uma fila em disco."
+    )
+    parser.add_argument("--queue-dir", default=os.environ.get("MLFLOW_QUEUE_DIR", DEFAULT_QUEUE_DIR),
+                        help="Pasta da fila (pending/, running/, done/, failed/). Padrão: ~/.cache/mlflow_queue.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Consome a fila.")
+    serve_parser.add_argument("--config", help="YAML com a seção 'worker' (opções do worker).")
+    serve_parser.add_argument("--max-parallel", dest="max_parallel", type=int, help="Runs simultâneas.")
+    serve_parser.add_argument("--cpus", type=int, help="CPUs que o worker pode reservar.")
+    serve_parser.add_argument("--memory-gb", dest="memory_gb", type=float, help="Memória que o worker pode reservar.")
+    serve_parser.add_argument("--job-cpus", dest="job_cpus", type=int, help="Reserva padrão de CPUs por job.")
+    serve_parser.add_argument("--job-memory-gb", dest="job_memory_gb", type=float, help="Reserva padrão de memória por job.")
+    serve_parser.add_argument("--poll-interval", dest="poll_interval", type=float, help="Segundos entre as leituras da fila.")
+    serve_parser.add_argument("--preload", nargs="+", help="trainer_types importados ao iniciar os processos.")
+    serve_parser.add_argument("--once", action="store_true", help="Termina quando a fila esvaziar.")
+
+    submit_parser = commands.add_parser("submit", help="Coloca configs na fila.")
+    submit_parser.add_argument("configs", nargs="+", help="Arquivos de configuração YAML.")
+    submit_parser.add_argument("--force", action="store_true", help="Treina mesmo se já houver uma run finalizada idêntica.")
+
+    commands.add_parser("status", help="Mostra os jobs da fila.")
+    args = parser.parse_args()
+
+    if args.command == "submit":
+        for config_path in args.configs:
+            submit(args.queue_dir, config_path, force=args.force)
+    elif args.command == "status":
+        print_queue(args.queue_dir)
+    else:
+        Worker(args.queue_dir, resolve_options(args)).serve(once=args.once)